@@ -0,0 +1,224 @@
+#***********************************************************************
+#    Local JSON API for canton and energy-type aggregates              #
+#    Usage: python api.py [--host 127.0.0.1] [--port 8502]             #
+#***********************************************************************
+#
+#  GET /cantons?energy=All                 sources, capacity, production per canton
+#  GET /energy?canton=All                  sources, capacity, production per energy type
+#  GET /summary?canton=All&energy=All      totals of a selection
+#  GET /installations?canton=All&energy=All&page=1&per_page=100
+#  GET /timeseries?canton=All&energy=All&freq=year   cumulative growth
+#
+#  Every response carries an ETag, requests with a matching If-None-Match
+#  header (a list of ETags, compared weakly, or *) are answered with
+#  304 Not Modified.
+
+import argparse
+import functools
+import hashlib
+import json
+import re
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import pandas as pd
+
+import utils as utl
+import figures as figs_
+
+DATA_PATH = './data/swiss_clean_energy.csv'
+GEOJSON_PATH = './data/georef-switzerland-kanton.geojson'
+# Columns of an installation in /installations
+INSTALLATION_COLUMNS = ['canton_name', 'municipality', 'energy_source_level_2', 'technology', 'company',
+                        'address', 'lat', 'lon', 'commissioning_date', 'electrical_capacity', 'production']
+MAX_PER_PAGE = 1000
+FREQS = {'year': 'YS', 'month': 'MS'}
+
+#---------------------------- give_body ------------------------------
+# This function returns the JSON body of a response and its ETag
+def give_body(content):
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False).encode('utf-8')
+    return body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+#---------------------------- give_etag_matches ------------------------------
+# This function returns whether an If-None-Match header matches an ETag:
+# the header is '*' or a list of ETags, compared weakly (RFC 9110), so a
+# tag matches with or without its W/ prefix
+def give_etag_matches(header, etag):
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = re.findall(r'(?:W/)?"[^"]*"', header)
+    return any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in tags)
+
+#---------------------------- give_records ------------------------------
+# This function returns the rows of a DataFrame as JSON ready records
+def give_records(df):
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+#---------------------------- give_installation_rows ------------------------------
+# This function returns the installation columns of a DataFrame with
+# the coordinates at their original precision and dates without time
+def give_installation_rows(df):
+    rows = df[INSTALLATION_COLUMNS].copy()
+    rows['lat'] = rows['lat'].astype('float64').round(4)
+    rows['lon'] = rows['lon'].astype('float64').round(4)
+    rows['commissioning_date'] = pd.to_datetime(rows['commissioning_date']).dt.strftime('%Y-%m-%d')
+    return rows
+
+#---------------------------- give_energy_summary ------------------------------
+# This function returns the number of sources, the electrical capacity
+# and the production per energy type of a selection
+def give_energy_summary(df):
+    grouped = df.groupby('energy_source_level_2', observed=True)
+    summary = grouped.size().reset_index(name='count')
+    summary['electrical_capacity'] = grouped['electrical_capacity'].sum().values
+    summary['production'] = grouped['production'].sum().values
+    return summary
+
+#---------------------------- give_timeseries ------------------------------
+# This function returns the cumulative number of sources, capacity and
+# production of a selection per commissioning period
+def give_timeseries(df, freq):
+    dates = pd.to_datetime(df['commissioning_date'])
+    grouped = df.assign(count=1).groupby(dates.dt.to_period(freq[0]).dt.start_time)
+    series = grouped[['count', 'electrical_capacity', 'production']].sum().cumsum()
+    series.index = series.index.strftime('%Y-%m-%d')
+    return series.rename_axis('period').reset_index()
+
+#---------------------------- Aggregates ------------------------------
+# This class holds the precomputed responses of the API
+class Aggregates:
+    def __init__(self, energy_df):
+        self.energy_df = energy_df
+        self.energy_catags = figs_.give_energy_catags(energy_df)
+        self.canton_names = figs_.give_canton_names(energy_df)
+        self.bodies = {}
+        for energy_catg in self.energy_catags:
+            summary = utl.give_canton_summary(energy_df, energy_catg)
+            self.bodies[('cantons', energy_catg)] = give_body(give_records(summary))
+        for canton_name in self.canton_names:
+            selection = utl.give_selection(energy_df, canton_name, 'All')
+            self.bodies[('energy', canton_name)] = give_body(give_records(give_energy_summary(selection)))
+            for energy_catg in self.energy_catags:
+                selection = utl.give_selection(energy_df, canton_name, energy_catg)
+                self.bodies[('summary', canton_name, energy_catg)] = give_body({
+                    'canton': canton_name,
+                    'energy': energy_catg,
+                    'count': len(selection),
+                    'electrical_capacity': round(selection['electrical_capacity'].sum(), 2),
+                    'production': round(selection['production'].sum(), 2),
+                })
+                for freq_name, freq in FREQS.items():
+                    self.bodies[('timeseries', canton_name, energy_catg, freq_name)] = give_body(
+                        give_records(give_timeseries(selection, freq)))
+
+    #---------------------------- give_installations ------------------------------
+    # This method returns a page of the installations of a selection
+    @functools.lru_cache(maxsize=512)
+    def give_installations(self, canton_name, energy_catg, page, per_page):
+        selection = utl.give_selection(self.energy_df, canton_name, energy_catg)
+        rows = selection.iloc[(page - 1) * per_page:page * per_page]
+        return give_body({
+            'total': len(selection),
+            'page': page,
+            'per_page': per_page,
+            'pages': max(1, -(-len(selection) // per_page)),
+            'items': give_records(give_installation_rows(rows)),
+        })
+
+#---------------------------- ApiError ------------------------------
+# This exception is answered with an error status and message
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+#---------------------------- make_handler ------------------------------
+# This function returns the request handler serving the aggregates
+def make_handler(aggregates):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately, keep-alive responses
+        # would otherwise wait for delayed ACKs
+        disable_nagle_algorithm = True
+
+        def give_param(self, query, name, choices=None, default='All'):
+            value = query.get(name, [default])[0]
+            if choices is not None and value not in choices:
+                raise ApiError(400, f"unknown {name} '{value}'")
+            return value
+
+        def give_int(self, query, name, default, maximum):
+            try:
+                value = int(query.get(name, [default])[0])
+            except ValueError:
+                raise ApiError(400, f"{name} must be an integer")
+            if value < 1 or value > maximum:
+                raise ApiError(400, f"{name} must be between 1 and {maximum}")
+            return value
+
+        def give_response(self, url):
+            query = parse_qs(url.query)
+            endpoint = url.path.strip('/')
+            if endpoint == 'cantons':
+                return aggregates.bodies[('cantons', self.give_param(query, 'energy', aggregates.energy_catags))]
+            if endpoint == 'energy':
+                return aggregates.bodies[('energy', self.give_param(query, 'canton', aggregates.canton_names))]
+            canton_name = self.give_param(query, 'canton', aggregates.canton_names)
+            energy_catg = self.give_param(query, 'energy', aggregates.energy_catags)
+            if endpoint == 'summary':
+                return aggregates.bodies[('summary', canton_name, energy_catg)]
+            if endpoint == 'timeseries':
+                freq = self.give_param(query, 'freq', FREQS, default='year')
+                return aggregates.bodies[('timeseries', canton_name, energy_catg, freq)]
+            if endpoint == 'installations':
+                page = self.give_int(query, 'page', 1, 10**9)
+                per_page = self.give_int(query, 'per_page', 100, MAX_PER_PAGE)
+                return aggregates.give_installations(canton_name, energy_catg, page, per_page)
+            raise ApiError(404, f"unknown endpoint '/{endpoint}'")
+
+        def do_GET(self):
+            try:
+                body, etag = self.give_response(urlsplit(self.path))
+                status = 200
+            except ApiError as error:
+                body, etag = give_body({'error': error.message})
+                status = error.status
+            if status == 200 and give_etag_matches(self.headers.get('If-None-Match'), etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard aggregates as a JSON API.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8502, help="port to listen on (default: 8502)")
+    args = parser.parse_args()
+    aggregates = Aggregates(utl.load_checked_data(DATA_PATH, GEOJSON_PATH))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(aggregates))
+    print(f"Serving on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,23 +5,19 @@
 #***********************************************************************
 
 import streamlit as st
-import pandas as pd
-from copy import deepcopy
 
 import utils as utl
-import plotting as pltg
+import figures as figs_
+import snapshot as snp
+import grid as grd
 
 #-------------------------------------------------------------------------
 #------------------------------ load all data files ----------------------
-energy_df_raw = utl.load_data(path='./data/swiss_clean_energy.csv')
-energy_df_raw.rename(columns={'canton_name':'kan_name'})
-energy_df = deepcopy(energy_df_raw)
-
-geojsn_data_raw = utl.load_geojsn_data('./data/georef-switzerland-kanton.geojson')
-geojsn_data = deepcopy(geojsn_data_raw)
-
-geopd_raw = utl.load_geopanda_data('./data/georef-switzerland-kanton.geojson')
-geopd_data = deepcopy(geopd_raw)
+# The dataset is loaded once per process and shared read-only by all sessions
+data = utl.load_shared_dataset('./data/swiss_clean_energy.csv', './data/georef-switzerland-kanton.geojson')
+energy_df = data['energy_df']
+geojsn_data = data['geojsn_data']
+utl.log_session_memory(st.session_state)
 #------------------------------------------------------------------------------
 #------------------------- Setting the page config ----------------------------
 st.set_page_config(layout="wide")
@@ -34,8 +30,17 @@ st.markdown(
     unsafe_allow_html=True
 )
 #------------------------------------------------------------------------------
+#------------------------- Setting the period ---------------------------------
+# The period of commissioning applies to all tabs
+date_bounds = utl.give_date_bounds(data['filter_index'])
+col1, col2 = st.columns([2, 3])
+with col1:
+    date_range = st.slider('Commissioning date', min_value=date_bounds[0], max_value=date_bounds[1],
+                           value=date_bounds, format="MMM YYYY", key="slider_period")
+period = utl.give_period_value(date_range, date_bounds)
+#------------------------------------------------------------------------------
 #------------------------- Setting the tabs -----------------------------------
-tab1, tab2, tab3 = st.tabs(["🌐 Overviewiew", "📍 Source location", "📊 Summary statistics"])
+tab1, tab2, tab3, tab4 = st.tabs(["🌐 Overviewiew", "📍 Source location", "📊 Summary statistics", "⚖️ Compare cantons"])
 #-------------------------------------------------------------------------------------------------------------------------
 #************************************************* Begin Tab1 ************************************************************
 #-------------------------------------------------------------------------------------------------------------------------
@@ -54,20 +59,14 @@ with tab1:
         unsafe_allow_html=True
     )
     #------------------------- Setting the energy category ------------------------
-    energy_catags = ['All'] + sorted(pd.unique(energy_df["energy_source_level_2"]))
+    energy_catags = figs_.give_energy_catags(energy_df)
     col1, col2 = st.columns([1, 4])
     with col1:
-        energy_catg = st.selectbox('Select an Energy Categoy', energy_catags)
+        energy_catg = utl.give_filter_value(st.multiselect('Select Energy Categories', energy_catags[1:], key="select_energy1",
+                                                           placeholder="All"), energy_catags[1:])
     #------------------------------------------------------------------------------
-    if energy_catg=='All':
-        sources_per_canton=energy_df.groupby('canton_name').size().reset_index(name='count')
-        sources_per_canton['electrical_capacity']=energy_df.groupby('canton_name')['electrical_capacity'].sum().reset_index(name='electrical_capacity').electrical_capacity
-        sources_per_canton['production']=energy_df.groupby('canton_name')['production'].sum().reset_index(name='production').production
-    else:
-        energy_df_tmp=energy_df[energy_df["energy_source_level_2"]==energy_catg]
-        sources_per_canton=energy_df_tmp.groupby('canton_name').size().reset_index(name='count')
-        sources_per_canton['electrical_capacity']=energy_df_tmp.groupby('canton_name')['electrical_capacity'].sum().reset_index(name='electrical_capacity').electrical_capacity
-        sources_per_canton['production']=energy_df_tmp.groupby('canton_name')['production'].sum().reset_index(name='production').production
+    sources_per_canton = utl.give_canton_summary(energy_df, energy_catg, data['filter_index'], period)
+    figs = snp.give_figs(data, snp.give_key('overview', energy_catg, period=period))
 
     custom_names = {
         "All": "Total Renewable",
@@ -77,18 +76,19 @@ with tab1:
         "Bioenergy": "Bio"
     }
     # Replace only if found in the dictionary
-    display_catg = custom_names.get(energy_catg, energy_catg)
+    display_catg = figs_.give_display_name(energy_catg, custom_names)
     #------------------------------- Setting Maps for tab1 ----------------------------------------
+    with col2:
+        map_norm = st.radio('Show the totals', ['', '_per_capita', '_per_km2'], horizontal=True,
+                            format_func={'': 'Per canton', '_per_capita': 'Per inhabitant', '_per_km2': 'Per km²'}.get,
+                            key="radio_norm")
     col1, col2, col3 = st.columns([2, 2, 2])
     with col1:
-        fig=pltg.give_fig(sources_per_canton,geojsn_data,"count",display_catg)
-        st.plotly_chart(fig,use_container_width=True)
+        utl.show_fig(figs['map_count' + map_norm],use_container_width=True)
     with col2:
-        fig=pltg.give_fig(sources_per_canton,geojsn_data,"electrical_capacity")
-        st.plotly_chart(fig,use_container_width=True)
+        utl.show_fig(figs['map_capacity' + map_norm],use_container_width=True)
     with col3:
-        fig=pltg.give_fig(sources_per_canton,geojsn_data,"production")
-        st.plotly_chart(fig,use_container_width=True)
+        utl.show_fig(figs['map_production' + map_norm],use_container_width=True)
 
     st.write("")  #spacing
     st.write("")  #spacing
@@ -100,65 +100,83 @@ with tab1:
             In the maps above, cantons are color-coded based on the number of energy sources, installed electrical capacity in Mega Watt (MW),
             and energy production per year in Mega-Watt-hour (MWh) for the selected energy category. Lightercolors indicate higher values,
             while darker colors represent lower values. This visual representation allows users to quickly identify cantons
-            leading in renewable energy initiatives and those with potential for growth.
+            leading in renewable energy initiatives and those with potential for growth. The totals can also be shown per
+            inhabitant (population of 2018) or per km² of the canton, so that large cantons do not stand out by their size alone.
         </p>
         """,
         unsafe_allow_html=True
     )
-    #------------------------- Highlight Top Cantons -----------------------------
-    top_sources = sources_per_canton.loc[
-        sources_per_canton["count"].idxmax(), "canton_name"
-    ]
-    top_sources_num = sources_per_canton.loc[
-        sources_per_canton["count"].idxmax(), "count"
-    ]
-    top_capacity = sources_per_canton.loc[
-        sources_per_canton["electrical_capacity"].idxmax(), "canton_name"
-    ]
-    top_capacity_number = round(sources_per_canton.loc[
-        sources_per_canton["electrical_capacity"].idxmax(), "electrical_capacity"
-    ], 2)
-    top_production = sources_per_canton.loc[
-        sources_per_canton["production"].idxmax(), "canton_name"
-    ]
-    top_production_number = round(sources_per_canton.loc[
-        sources_per_canton["production"].idxmax(), "production"
-    ], 2)
-    st.write("")  #spacing
+    #------------------------- Grid heatmap --------------------------------------
     st.write("")  #spacing
+    col1, col2, col3 = st.columns([2, 2, 2])
+    with col1:
+        grid_precision = st.select_slider('Grid resolution', options=list(grd.GRID_PRECISIONS),
+                                          value=5, format_func=grd.GRID_PRECISIONS.get, key="slider_grid")
+    with col2:
+        grid_variable = st.radio('Color by', ['count', 'electrical_capacity', 'production'], horizontal=True,
+                                 format_func={'count': 'Number of Sources', 'electrical_capacity': 'Capacity',
+                                              'production': 'Production'}.get, key="radio_grid")
+    grid_figs = snp.give_figs(data, snp.give_key('grid', energy_catg, str(grid_precision), period=period))
+    utl.show_fig(grid_figs[grid_variable], use_container_width=True)
     st.markdown(
-        f"""
-        <p style='font-size:20px; font-weight:bold; color:black; text-align:left'>
-            Top Canton(s) in {display_catg} Energy category
-        </p>
-        """,
-        unsafe_allow_html=True
-    )
-    st.markdown(
-        f"""
-        <p style='font-size:16px; font-weight:normal; color:black; text-align:left'>
-            Most Energy Sources: 
-            <span style='color:#E74C3C'>{top_sources}</span> (Total number of energy sources: <span style='color:#E74C3C'>{top_sources_num})</span><br>
-            Highest Electrical Capacity:
-            <span style='color:#E74C3C'>{top_capacity}</span> (Total capacity: <span style='color:#E74C3C'>{top_capacity_number} MW)</span><br>
-            Highest Production:
-            <span style='color:#E74C3C'>{top_production}</span> (Total production: <span style='color:#E74C3C'>{top_production_number} MWh)</span>
+        """
+        <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
+            The heatmap above shows the same quantities on a grid of geohash cells finer than the cantons. The
+            resolution can be switched between regional, municipal and local cells; the cell totals are
+            precomputed at the finest resolution and summed up into the coarser cells.
         </p>
         """,
         unsafe_allow_html=True
     )
+    #------------------------- Highlight Top Cantons -----------------------------
+    if len(sources_per_canton)==0:
+        st.write(f"There are no {display_catg} energy sources commissioned in the selected period.")
+    else:
+        top_sources = sources_per_canton.loc[
+            sources_per_canton["count"].idxmax(), "canton_name"
+        ]
+        top_sources_num = sources_per_canton.loc[
+            sources_per_canton["count"].idxmax(), "count"
+        ]
+        top_capacity = sources_per_canton.loc[
+            sources_per_canton["electrical_capacity"].idxmax(), "canton_name"
+        ]
+        top_capacity_number = round(sources_per_canton.loc[
+            sources_per_canton["electrical_capacity"].idxmax(), "electrical_capacity"
+        ], 2)
+        top_production = sources_per_canton.loc[
+            sources_per_canton["production"].idxmax(), "canton_name"
+        ]
+        top_production_number = round(sources_per_canton.loc[
+            sources_per_canton["production"].idxmax(), "production"
+        ], 2)
+        st.write("")  #spacing
+        st.write("")  #spacing
+        st.markdown(
+            f"""
+            <p style='font-size:20px; font-weight:bold; color:black; text-align:left'>
+                Top Canton(s) in {display_catg} Energy category
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
+        st.markdown(
+            f"""
+            <p style='font-size:16px; font-weight:normal; color:black; text-align:left'>
+                Most Energy Sources: 
+                <span style='color:#E74C3C'>{top_sources}</span> (Total number of energy sources: <span style='color:#E74C3C'>{top_sources_num})</span><br>
+                Highest Electrical Capacity:
+                <span style='color:#E74C3C'>{top_capacity}</span> (Total capacity: <span style='color:#E74C3C'>{top_capacity_number} MW)</span><br>
+                Highest Production:
+                <span style='color:#E74C3C'>{top_production}</span> (Total production: <span style='color:#E74C3C'>{top_production_number} MWh)</span>
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
     #------------------------- Bar Plots for the Cantons -----------------------------
-    sources_per_canton_sorted = sources_per_canton.sort_values(by='count', ascending=False)
-    fig = pltg.give_bar_fig(sources_per_canton_sorted,'count','electrical_capacity','Number of Sources', "Electrical capacity<br>(in MW)")
-    st.plotly_chart(fig,use_container_width=True)
-
-    sources_per_canton_sorted = sources_per_canton.sort_values(by='electrical_capacity', ascending=False)
-    fig = pltg.give_bar_fig(sources_per_canton_sorted,'electrical_capacity','production','Electrical Capacity (in MW)', "Production<br>(in MWh)")
-    st.plotly_chart(fig,use_container_width=True)
-
-    sources_per_canton_sorted = sources_per_canton.sort_values(by='production', ascending=False)
-    fig = pltg.give_bar_fig(sources_per_canton_sorted,'production','count','Production (in MWh)', "Number of<br>Sources")
-    st.plotly_chart(fig,use_container_width=True)
+    utl.show_fig(figs['bar_count'],use_container_width=True)
+    utl.show_fig(figs['bar_capacity'],use_container_width=True)
+    utl.show_fig(figs['bar_production'],use_container_width=True)
 
     st.markdown(
         """
@@ -177,54 +195,16 @@ with tab1:
         unsafe_allow_html=True
     )
     st.write("Data Source: https://data.open-power-system-data.org/renewable_power_plants/2020-08-25")
-#-------------------------------------------------------------------------------------------------------------------------
-#************************************************* Begin Tab2 ************************************************************
-#-------------------------------------------------------------------------------------------------------------------------
-with tab2:
-    st.markdown(
-        """
-        <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
-            This tab provides an interactive map displaying the approximate locations of various renewable energy sources across Switzerland.
-            Users can filter the data by selecting specific cantons and energy categories to visualize the distribution
-            of energy sources.<span style='font-size:14px; font-style:italic; font-weight:400; color:gray'> (Remark: The locations are approximate and meant for visualization purposes only.
-            And the pie charts represent the percentage of different energy types among only Renewable energies considered here while
-            excluding other energy types like Nuclear, Fossil etc.)</span>
-        </p>
-        """,
-        unsafe_allow_html=True
-    )
-    #------------------------- Set Canton and energy category -----------------------------
-    canton_names = ['All'] + sorted(pd.unique(energy_df["canton_name"]))
-    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
-    with col1:
-        canton_name = st.selectbox('Select a Canton', canton_names, key="select_canton")
-    with col3:
-        energy_catg = st.selectbox('Select an Energy Categoy', energy_catags, key="select_energy") 
-
-    custom_names = {
-        "All": "Total Renewable",
-        "Hydro": "Hydropower",
-        "Solar": "Solar Power",
-        "Wind": "Wind Power"
-        ,"Bioenergy": "Bio"
-    }
-    # Replace only if found in the dictionary
-    display_catg = custom_names.get(energy_catg, energy_catg)
+#---------------------------- show_location ------------------------------
+# This function shows the map, summary and side charts of tab2. It runs
+# as a fragment: a box or lasso selection on the map reruns only this
+# function, and the side charts are summed over the selected rows alone
+@st.fragment
+def show_location(canton_name, energy_catg, display_catg, period):
     #--------------------------------- set the data ---------------------------------------
-    if energy_catg=='All':
-        if canton_name=='All':
-            df_temp=energy_df
-            df_temp2=energy_df
-        else:
-            df_temp=energy_df[energy_df['canton_name']==canton_name]
-            df_temp2=energy_df[energy_df['canton_name']==canton_name]
-    else:
-        if canton_name=='All':
-            df_temp=energy_df[energy_df["energy_source_level_2"]==energy_catg]
-            df_temp2=energy_df
-        else:
-            df_temp=energy_df[(energy_df['canton_name']==canton_name)&(energy_df["energy_source_level_2"]==energy_catg)]
-            df_temp2=energy_df[energy_df['canton_name']==canton_name]
+    df_temp = utl.give_selection(energy_df, canton_name, energy_catg, data['filter_index'], period)
+    figs = snp.give_figs(data, snp.give_key('location', canton_name, energy_catg, period=period))
+    selected_rows = None
     #--------------------------------------------------------------------------------------
     col1, col2 = st.columns([1.2, 1])
     #---------------------------- Set the Map in Tab2 -------------------------------------
@@ -243,31 +223,21 @@ with tab2:
             st.markdown(
                 f"""
                 <p style='font-size:24px; font-weight:600; color:black; text-align:left'>
-                    {display_catg} Energy Sources in the canton of {canton_name}</span>
+                    {display_catg} Energy Sources in {figs_.give_canton_label(canton_name)}</span>
                 </p>
                 """,
                 unsafe_allow_html=True
             )
         #---------------------------- the map ----------------------------------
-        if energy_catg=='All':
-            if canton_name=='All':
-                fig=pltg.give_swiss_fig(df_temp,geojsn_data,46.8,8.3,6.4)
-                st.plotly_chart(fig)
-            else:
-                lat_cntr, lon_cntr, zoom = utl.give_cntr_zoom(geopd_data,'kan_name',canton_name)
-                fig=pltg.give_canton_fig(df_temp,geojsn_data,lat_cntr,lon_cntr,zoom)
-                st.plotly_chart(fig)
+        if figs['map'] is None:
+            st.write(f"There are no energy sources available for {display_catg} energy in {figs_.give_canton_label(canton_name)}.")
         else:
-            if canton_name=='All':
-                fig=pltg.give_swiss_fig(df_temp,geojsn_data,46.8,8.3,6.4)
-                st.plotly_chart(fig)
-            else:
-                if len(df_temp)==0:
-                    st.write(f"There are no energy sources available for {energy_catg} energy in the canton of {canton_name}.")
-                else:
-                    lat_cntr, lon_cntr, zoom = utl.give_cntr_zoom(geopd_data,'kan_name',canton_name)
-                    fig=pltg.give_canton_fig(df_temp,geojsn_data,lat_cntr,lon_cntr,zoom)
-                    st.plotly_chart(fig)
+            event = utl.show_fig(figs['map'], on_select="rerun", selection_mode=("box", "lasso"),
+                                    key=f"location_map_{utl.give_slug(canton_name)}_{utl.give_slug(energy_catg)}_{utl.give_slug(period)}")
+            if event and event.selection.points:
+                # Side charts of the selected sources, from their row positions only
+                map_rows = figs_.give_map_rows(figs['map'], energy_df, data['filter_index'], canton_name, energy_catg, period)
+                selected_rows = figs_.give_selected_rows(event.selection.points, map_rows)
 
         st.markdown(
             """
@@ -281,14 +251,24 @@ with tab2:
         )
     #---------------------------- Set the stat and info in tab2 -------------------------------------
     with col2:
-        total_sources = len(df_temp)
-        total_capacity = round(df_temp['electrical_capacity'].sum(), 2)
-        total_production = round(df_temp['production'].sum(), 2)
+        if selected_rows is None:
+            total_sources = len(df_temp)
+            total_capacity = round(df_temp['electrical_capacity'].sum(), 2)
+            total_production = round(df_temp['production'].sum(), 2)
+            summary_title = f"Summary in {display_catg} Energy category"
+            overview_title = "Overview in All Energy category"
+        else:
+            figs, totals = figs_.give_selection_figs(energy_df, selected_rows)
+            total_sources = totals['count']
+            total_capacity = totals['electrical_capacity']
+            total_production = totals['production']
+            summary_title = "Summary of the Sources selected on the map"
+            overview_title = "Overview of the selected Sources"
         st.write("")  #spacing
         st.markdown(
             f"""
             <p style='font-size:22px; font-weight:600; color:black; text-align:center'>
-                Summary in {display_catg} Energy category</span>
+                {summary_title}</span>
             </p>
             """,
             unsafe_allow_html=True
@@ -308,15 +288,13 @@ with tab2:
         st.markdown(
             f"""
             <p style='font-size:22px; font-weight:600; color:black; text-align:center'>
-                Overview in All Energy category</span>
+                {overview_title}</span>
             </p>
             """,
             unsafe_allow_html=True
         )
         #---------------------------- histogram -------------------------------
-        df_sources = df_temp2.groupby('energy_source_level_2').size().reset_index(name='Number of Sources')
-        fig = pltg.give_bar_fig2(df_temp2, 'Number of Sources')
-        st.plotly_chart(fig,use_container_width=False)
+        utl.show_fig(figs['bar_sources'],use_container_width=False)
         #---------------------------- Pie chart -------------------------------
         col2_2, col2_3 = st.columns([1, 1])
         with col2_2:
@@ -328,8 +306,7 @@ with tab2:
                 """,
                 unsafe_allow_html=True
             )
-            fig = pltg.give_pie_fig2(df_temp2,'electrical_capacity')
-            st.plotly_chart(fig)
+            utl.show_fig(figs['pie_capacity'])
         with col2_3:
             st.markdown(
                 f"""
@@ -339,8 +316,157 @@ with tab2:
                 """,
                 unsafe_allow_html=True
             )
-            fig = pltg.give_pie_fig2(df_temp2,'production')
-            st.plotly_chart(fig)
+            utl.show_fig(figs['pie_production'])
+#-------------------------------------------------------------------------------------------------------------------------
+#************************************************* Begin Tab2 ************************************************************
+#-------------------------------------------------------------------------------------------------------------------------
+with tab2:
+    st.markdown(
+        """
+        <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
+            This tab provides an interactive map displaying the approximate locations of various renewable energy sources across Switzerland.
+            Users can filter the data by selecting specific cantons and energy categories to visualize the distribution
+            of energy sources.<span style='font-size:14px; font-style:italic; font-weight:400; color:gray'> (Remark: The locations are approximate and meant for visualization purposes only.
+            And the pie charts represent the percentage of different energy types among only Renewable energies considered here while
+            excluding other energy types like Nuclear, Fossil etc.)</span>
+        </p>
+        """,
+        unsafe_allow_html=True
+    )
+    #------------------------- Set Canton and energy category -----------------------------
+    canton_names = figs_.give_canton_names(energy_df)
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+    with col1:
+        canton_name = utl.give_filter_value(st.multiselect('Select Cantons', canton_names[1:], key="select_canton",
+                                                           placeholder="All"), canton_names[1:])
+    with col3:
+        energy_catg = utl.give_filter_value(st.multiselect('Select Energy Categories', energy_catags[1:], key="select_energy",
+                                                           placeholder="All"), energy_catags[1:])
+
+    custom_names = {
+        "All": "Total Renewable",
+        "Hydro": "Hydropower",
+        "Solar": "Solar Power",
+        "Wind": "Wind Power"
+        ,"Bioenergy": "Bio"
+    }
+    # Replace only if found in the dictionary
+    display_catg = figs_.give_display_name(energy_catg, custom_names)
+    show_location(canton_name, energy_catg, display_catg, period)
+    #---------------------------- Sources near a place -------------------------------------
+    st.write("")  #spacing
+    st.markdown(
+        f"""
+        <p style='font-size:24px; font-weight:600; color:black; text-align:left'>
+            {display_catg} Energy Sources near a place</span>
+        </p>
+        """,
+        unsafe_allow_html=True
+    )
+    municipality_points = data['municipality_points']
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+    with col1:
+        place_mode = st.radio('Place', ['Municipality', 'Coordinates'], horizontal=True, key="radio_place")
+    with col2:
+        if place_mode == 'Municipality':
+            place = st.selectbox('Select a Municipality', list(municipality_points.index), key="select_municipality")
+            lat_near = float(municipality_points.loc[place, 'lat'])
+            lon_near = float(municipality_points.loc[place, 'lon'])
+        else:
+            lat_near = st.number_input('Latitude', min_value=45.8, max_value=47.9, value=46.948, step=0.001, format="%.4f", key="input_lat")
+            lon_near = st.number_input('Longitude', min_value=5.9, max_value=10.5, value=7.4474, step=0.001, format="%.4f", key="input_lon")
+            place = f"{lat_near:.4f}, {lon_near:.4f}"
+    with col3:
+        near_mode = st.radio('Search', ['Nearest', 'Within radius'], horizontal=True, key="radio_near")
+    with col4:
+        if near_mode == 'Nearest':
+            near_k = st.slider('Number of sources', 1, 100, 10, key="slider_near_k")
+            df_near, near_fig = figs_.give_near_view(energy_df, data['near_index'], energy_catg, lat_near, lon_near, place, k=near_k,
+                                                    filter_index=data['filter_index'], period=period)
+        else:
+            near_radius = st.slider('Radius (in km)', 1, 50, 5, key="slider_near_radius")
+            df_near, near_fig = figs_.give_near_view(energy_df, data['near_index'], energy_catg, lat_near, lon_near, place, radius_km=near_radius,
+                                                    filter_index=data['filter_index'], period=period)
+    col1, col2 = st.columns([1.2, 1])
+    with col1:
+        st.plotly_chart(near_fig, key="near_map")
+    with col2:
+        st.markdown(
+            f"""
+            <p style='font-size:16px; font-weight:500; color:blue; text-align:center'>
+                Number of Energy Sources: <span style='color:#E74C3C'>{len(df_near)}</span><br>
+                Electrical Capacity (in MW): <span style='color:#E74C3C'>{round(df_near['electrical_capacity'].sum(), 2)}</span><br>
+                Production (in MWh): <span style='color:#E74C3C'>{round(df_near['production'].sum(), 2)}</span>
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
+        st.dataframe(df_near.drop(columns=['lat', 'lon']), hide_index=True, height=400,
+                     column_config={'distance_km': st.column_config.NumberColumn('Distance (km)', format="%.2f")})
+    #---------------------------- Leaderboard -------------------------------------
+    st.write("")  #spacing
+    st.markdown(
+        f"""
+        <p style='font-size:24px; font-weight:600; color:black; text-align:left'>
+            Largest {display_catg} Installations and Companies in {figs_.give_canton_label(canton_name)}</span>
+        </p>
+        """,
+        unsafe_allow_html=True
+    )
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        top_variable = st.radio('Rank by', utl.TOP_VARIABLES, horizontal=True,
+                                format_func={'electrical_capacity': 'Capacity', 'production': 'Production'}.get,
+                                key="radio_leaderboard")
+    with col2:
+        top_n = st.slider('Number of entries', 5, utl.TOP_K, 10, step=5, key="slider_top_n")
+    df_top = figs_.give_top_installations(energy_df, data['top_lists'], canton_name, energy_catg, top_variable, top_n,
+                                          data['filter_index'], period)
+    df_companies = figs_.give_top_companies(energy_df, data['company_totals'], canton_name, energy_catg, top_variable, top_n,
+                                            data['filter_index'], period)
+    col1, col2 = st.columns([1.6, 1])
+    with col1:
+        st.write("**Installations**")
+        st.dataframe(df_top, height=400,
+                     column_config={'Commissioning Date': st.column_config.DateColumn('Commissioning Date', format="YYYY-MM-DD")})
+    with col2:
+        st.write("**Companies**")
+        st.dataframe(df_companies, height=400)
+    #---------------------------- Energy hierarchy -------------------------------------
+    st.write("")  #spacing
+    st.markdown(
+        f"""
+        <p style='font-size:24px; font-weight:600; color:black; text-align:left'>
+            {display_catg} Energy Sources by Subcategory and Technology</span>
+        </p>
+        <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
+            The chart breaks the selected sources down by energy category, subcategory and technology (e.g. run-of-river
+            hydro); click on a category to drill down into it. The table gives the same breakdown per canton for the
+            category and subcategory chosen.
+        </p>
+        """,
+        unsafe_allow_html=True
+    )
+    hierarchy = figs_.give_hierarchy_data(data['canton_cube'], canton_name, energy_catg, period)
+    hierarchy_figs = snp.give_figs(data, snp.give_key('hierarchy', canton_name, energy_catg, period=period))
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        hierarchy_variable = st.radio('Size by', ['count', 'electrical_capacity', 'production'], horizontal=True,
+                                      format_func={'count': 'Number of Sources', 'electrical_capacity': 'Capacity',
+                                                   'production': 'Production'}.get, key="radio_hierarchy")
+    with col2:
+        level2 = st.selectbox('Energy Category', figs_.give_hierarchy_options(hierarchy), key="select_level2")
+    with col3:
+        level3 = st.selectbox('Subcategory', figs_.give_hierarchy_options(hierarchy, level2), key="select_level3",
+                              disabled=level2=='All')
+    if hierarchy_figs[hierarchy_variable] is None:
+        st.write(f"There are no {display_catg} energy sources in {figs_.give_canton_label(canton_name)}.")
+    else:
+        col1, col2 = st.columns([1, 1.2])
+        with col1:
+            utl.show_fig(hierarchy_figs[hierarchy_variable], use_container_width=True)
+        with col2:
+            st.dataframe(figs_.give_hierarchy_table(hierarchy, level2, level3), hide_index=True, height=450)
     st.write("Data Source: https://data.open-power-system-data.org/renewable_power_plants/2020-08-25")
 #-------------------------------------------------------------------------------------------------------------------------
 #************************************************* Begin Tab3 ************************************************************
@@ -380,9 +506,11 @@ with tab3:
     #------------------------- Set Canton and energy category -----------------------------
     col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
     with col1:
-        canton_name = st.selectbox('Select a Canton', canton_names, key="select_canton2")
+        canton_name = utl.give_filter_value(st.multiselect('Select Cantons', canton_names[1:], key="select_canton2",
+                                                           placeholder="All"), canton_names[1:])
     with col2:
-        energy_catg = st.selectbox('Select an Energy Catagoy', energy_catags, key="select_energy2")
+        energy_catg = utl.give_filter_value(st.multiselect('Select Energy Categories', energy_catags[1:], key="select_energy2",
+                                                           placeholder="All"), energy_catags[1:])
     with col3:    
         outlier_zoom = st.radio('Outliers removed:', ['No', 'Yes'], key='radio_view')
     #--------------------------------------------------------------------------------------
@@ -394,28 +522,15 @@ with tab3:
         ,"Bioenergy": "Bio"
     }
     # Replace only if found in the dictionary
-    display_catg = custom_names.get(energy_catg, energy_catg)
+    display_catg = figs_.give_display_name(energy_catg, custom_names)
     custom_names_cant = {
         "All": "Switzerland"
     }
     # Replace only if found in the dictionary
-    display_catg_cant = custom_names_cant.get(canton_name, canton_name)
-    energy_arr = [x for x in energy_catags if x != energy_catg]
-    #----------------------------- set the data frame ----------------------------------------
-    if energy_catg=='All':
-        if canton_name=='All':
-            df_temp=energy_df
-            df_temp1=df_temp
-        else:
-            df_temp=energy_df[energy_df['canton_name']==canton_name]
-            df_temp1=df_temp
-    else:
-        if canton_name=='All':
-            df_temp=energy_df[energy_df["energy_source_level_2"]==energy_catg]
-            df_temp1=energy_df
-        else:
-            df_temp=energy_df[(energy_df['canton_name']==canton_name)&(energy_df["energy_source_level_2"]==energy_catg)]
-            df_temp1=energy_df[energy_df['canton_name']==canton_name]
+    display_catg_cant = figs_.give_display_name(canton_name, custom_names_cant, sep=', ')
+    energy_arr = figs_.give_other_catags(energy_catags, energy_catg)
+    #----------------------------- set the figures ----------------------------------------
+    figs = snp.give_figs(data, snp.give_key('distribution', canton_name, energy_catg, outlier_zoom, period=period))
     #----------------------------- production violin plot ---------------------------
     #----------------------------- main plot ----------------------------------------
     col1, col0, col2 = st.columns([1.1, 0.2, 1])
@@ -430,13 +545,10 @@ with tab3:
             """,
             unsafe_allow_html=True
         )
-        if len(df_temp)==0:
-            st.write(f"There are no energy sources available for {energy_catg} energy in the canton of {canton_name}.")
+        if figs['production'] is None:
+            st.write(f"There are no energy sources available for {display_catg} energy in {figs_.give_canton_label(canton_name)}.")
         else:
-            fig=pltg.give_violin_fig(df_temp, 'production', 300, energy_catg, outlier_zoom)
-            st.plotly_chart(fig)
-            #fig=pltg.give_violin_fig(df_temp, 'production', 8, energy_catg, outlier_zoom)
-            #st.pyplot(fig)
+            utl.show_fig(figs['production'])
     #----------------------------- supplementary plot --------------------------------
     with col2:
         st.markdown(
@@ -448,53 +560,15 @@ with tab3:
             """,
             unsafe_allow_html=True
         )
-        col2_1, col2_2 = st.columns([1, 1])
-        #-----------------------------------------------------
-        with col2_1:
-            if energy_arr[0]== 'All':
-                df_temp21=df_temp1
-            else:
-                df_temp21=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[0]]
-            if len(df_temp21)==0:
-                st.write(f"There are no energy sources available for {energy_arr[0]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp21, 'production', 150, energy_arr[0], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp21, 'production', 8.1, energy_arr[0], outlier_zoom)
-                # st.pyplot(fig)
-        #-----------------------------------------------------
-        with col2_2:
-            df_temp22=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[1]]
-            if len(df_temp22)==0:
-                st.write(f"There are no energy sources available for {energy_arr[1]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp22, 'production', 150, energy_arr[1], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp22, 'production', 8.1, energy_arr[1], outlier_zoom)
-                # st.pyplot(fig)
-        #-----------------------------------------------------
-        col2_1, col2_2 = st.columns([1, 1])
-        #-----------------------------------------------------
-        with col2_1:
-            df_temp23=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[2]]
-            if len(df_temp23)==0:
-                st.write(f"There are no energy sources available for {energy_arr[2]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp23, 'production', 150, energy_arr[2], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp23, 'production', 8.1, energy_arr[2], outlier_zoom)
-                # st.pyplot(fig)
-        #-----------------------------------------------------
-        with col2_2:
-            df_temp24=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[3]]
-            if len(df_temp24)==0:
-                st.write(f"There are no energy sources available for {energy_arr[3]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp24, 'production', 150, energy_arr[3], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp24, 'production', 8.1, energy_arr[3], outlier_zoom)
-                # st.pyplot(fig)
-    #----------------------------- production violin plot ---------------------------
+        for row in [energy_arr[0:2], energy_arr[2:4]]:
+            col2_1, col2_2 = st.columns([1, 1])
+            for col, energy in zip([col2_1, col2_2], row):
+                with col:
+                    if figs[('production', energy)] is None:
+                        st.write(f"There are no energy sources available for {energy} energy in {figs_.give_canton_label(canton_name)}.")
+                    else:
+                        utl.show_fig(figs[('production', energy)])
+    #----------------------------- capacity violin plot ---------------------------
     #----------------------------- main plot ----------------------------------------
     st.write("")  #spacing
     col1, col0, col2 = st.columns([1.1, 0.2, 1])
@@ -509,13 +583,10 @@ with tab3:
             """,
             unsafe_allow_html=True
         )
-        if len(df_temp)==0:
-            st.write(f"There are no energy sources available for {energy_catg} energy in the canton of {canton_name}.")
+        if figs['electrical_capacity'] is None:
+            st.write(f"There are no energy sources available for {display_catg} energy in {figs_.give_canton_label(canton_name)}.")
         else:
-            fig=pltg.give_violin_fig(df_temp, 'electrical_capacity', 300, energy_catg, outlier_zoom)
-            st.plotly_chart(fig)
-            # fig=pltg.give_violin_fig(df_temp, 'electrical_capacity', 8, energy_catg, outlier_zoom)
-            # st.pyplot(fig)
+            utl.show_fig(figs['electrical_capacity'])
     #----------------------------- supplementary plot --------------------------------
     with col2:
         st.markdown(
@@ -527,53 +598,14 @@ with tab3:
             """,
             unsafe_allow_html=True
         )
-        col2_1, col2_2 = st.columns([1, 1])
-        #-----------------------------------------------------
-        with col2_1:
-            # if energy_arr[0]== 'All':
-            #     df_temp21=df_temp1
-            # else:
-            #     df_temp21=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[0]]
-            if len(df_temp21)==0:
-                st.write(f"There are no energy sources available for {energy_arr[0]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp21, 'electrical_capacity', 150, energy_arr[0], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp21, 'electrical_capacity', 8.1, energy_arr[0], outlier_zoom)
-                # st.pyplot(fig)
-        #-----------------------------------------------------
-        with col2_2:
-            #df_temp22=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[1]]
-            if len(df_temp22)==0:
-                st.write(f"There are no energy sources available for {energy_arr[1]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp22, 'electrical_capacity', 150, energy_arr[1], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp22, 'electrical_capacity', 8.1, energy_arr[1], outlier_zoom)
-                # st.pyplot(fig)
-        #-----------------------------------------------------
-        col2_1, col2_2 = st.columns([1, 1])
-        #-----------------------------------------------------
-        with col2_1:
-            #df_temp23=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[2]]
-            if len(df_temp23)==0:
-                st.write(f"There are no energy sources available for {energy_arr[2]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp23, 'electrical_capacity', 150, energy_arr[2], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp23, 'electrical_capacity', 8.1, energy_arr[2], outlier_zoom)
-                # st.pyplot(fig)
-        #-----------------------------------------------------
-        with col2_2:
-            #df_temp24=df_temp1[df_temp1["energy_source_level_2"]==energy_arr[3]]
-            if len(df_temp24)==0:
-                st.write(f"There are no energy sources available for {energy_arr[3]} energy in the canton of {canton_name}.")
-            else:
-                fig=pltg.give_violin_fig(df_temp24, 'electrical_capacity', 150, energy_arr[3], outlier_zoom)
-                st.plotly_chart(fig)
-                # fig=pltg.give_violin_fig(df_temp24, 'electrical_capacity', 8.1, energy_arr[3], outlier_zoom)
-                # st.pyplot(fig)
-
+        for row in [energy_arr[0:2], energy_arr[2:4]]:
+            col2_1, col2_2 = st.columns([1, 1])
+            for col, energy in zip([col2_1, col2_2], row):
+                with col:
+                    if figs[('electrical_capacity', energy)] is None:
+                        st.write(f"There are no energy sources available for {energy} energy in {figs_.give_canton_label(canton_name)}.")
+                    else:
+                        utl.show_fig(figs[('electrical_capacity', energy)])
     st.write("")
     st.write("")
     #---------------------------------------- Scatter Plot and Histogram ----------------------------------------
@@ -601,28 +633,16 @@ with tab3:
     #------------------------- Set Canton and energy category -----------------------------
     col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
     with col1:
-        canton_name = st.selectbox('Select a Canton', canton_names, key="select_canton3")
+        canton_name = utl.give_filter_value(st.multiselect('Select Cantons', canton_names[1:], key="select_canton3",
+                                                           placeholder="All"), canton_names[1:])
     with col2:
-        energy_catg = st.selectbox('Select an Energy Catagoy', energy_catags, key="select_energy3")
+        energy_catg = utl.give_filter_value(st.multiselect('Select Energy Categories', energy_catags[1:], key="select_energy3",
+                                                           placeholder="All"), energy_catags[1:])
     with col3:    
         outlier_zoom = st.radio('Outliers removed:', ['No', 'Yes'], key='radio_view3')
-     #-------------------------------------- set the data -------------------------------------------
-    df_temp = energy_df
-    df_temp["ratio"] = df_temp.apply(lambda row: row["production"]/row["electrical_capacity"], axis=1)
-    if energy_catg=='All':
-        if canton_name=='All':
-            df_temp1=df_temp
-            #df_temp1=df_temp
-        else:
-            df_temp1=df_temp[df_temp['canton_name']==canton_name]
-            #df_temp1=df_temp
-    else:
-        if canton_name=='All':
-            df_temp1=df_temp[df_temp["energy_source_level_2"]==energy_catg]
-            #df_temp1=energy_df
-        else:
-            df_temp1=df_temp[(df_temp['canton_name']==canton_name)&(df_temp["energy_source_level_2"]==energy_catg)]
-            #df_temp1=energy_df[energy_df['canton_name']==canton_name]
+     #-------------------------------------- set the figures -------------------------------------------
+    figs = snp.give_figs(data, snp.give_key('efficiency', canton_name, energy_catg, outlier_zoom, period=period))
+    hist_figs = snp.give_figs(data, snp.give_key('hist', period=period))
     #-------------------------------------------------------------------------------------
     col1, col0, col2 = st.columns([1.0, 0.2, 0.9])
     #---------------------------------------- Scatter Plot ----------------------------------------
@@ -636,8 +656,7 @@ with tab3:
             """,
             unsafe_allow_html=True
         )
-        fig=pltg.give_scatter_fig(df_temp1,df_temp,energy_catg,outlier_zoom)
-        st.pyplot(fig)
+        utl.show_fig(figs['scatter'])
         st.markdown(
             """
             <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
@@ -661,9 +680,7 @@ with tab3:
             """,
             unsafe_allow_html=True
         )
-        fig=pltg.give_hist_fig(df_temp)
-        #st.plotly_chart(fig)
-        st.pyplot(fig)
+        utl.show_fig(hist_figs['hist'])
         st.markdown(
             """
             <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
@@ -704,41 +721,89 @@ with tab3:
     #------------------------- Set Canton and energy category -----------------------------
     col1, col2, col3, col4 = st.columns([1, 0.2, 1, 3])
     with col1:
-        canton_name = st.selectbox('Select a Canton', canton_names, key="select_canton4")
+        canton_name = utl.give_filter_value(st.multiselect('Select Cantons', canton_names[1:], key="select_canton4",
+                                                           placeholder="All"), canton_names[1:])
     with col3:
-        energy_catg = st.selectbox('Select an Energy Catagoy', energy_catags, key="select_energy4")
-    #------------------------------------ Set the data ------------------------------------
-    df_temp = energy_df
-    df_temp['count']=int(1)
-    if energy_catg=='All':
-        if canton_name=='All':
-            df_temp1=df_temp
-        else:
-            df_temp1=df_temp[df_temp['canton_name']==canton_name]
-    else:
-        if canton_name=='All':
-            df_temp1=df_temp[df_temp["energy_source_level_2"]==energy_catg]
-        else:
-            df_temp1=df_temp[(df_temp['canton_name']==canton_name)&(df_temp["energy_source_level_2"]==energy_catg)]
+        energy_catg = utl.give_filter_value(st.multiselect('Select Energy Categories', energy_catags[1:], key="select_energy4",
+                                                           placeholder="All"), energy_catags[1:])
+    #------------------------------------ Set the figures ------------------------------------
+    figs = snp.give_figs(data, snp.give_key('growth', canton_name, energy_catg, period=period))
     #------------------------------------ plots ------------------------------------
     col1, col2, col3 = st.columns([1, 1, 1])
+    for col, variable in zip([col1, col2, col3], ['count', 'electrical_capacity', 'production']):
+        with col:
+            if figs[variable] is None:
+                st.write(f"There are no energy sources available for {figs_.give_display_name(energy_catg, {})} energy in {figs_.give_canton_label(canton_name)}.")
+            else:
+                utl.show_fig(figs[variable])
+    #---------------------------------------- Yearly map ----------------------------------------
+    st.write("")
+    st.markdown(
+            """
+            <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
+                The animated map below shows where the growth took place: press play or move the slider to follow the
+                cantons and the energy sources year by year, for the canton and energy type selected above.
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
+    col1, col2 = st.columns([2, 3])
     with col1:
-        if len(df_temp1)==0:
-                st.write(f"There are no energy sources available for {energy_catg} energy in the canton of {canton_name}.")
-        else:
-            fig=pltg.give_time_fig(df_temp1,'count',energy_catg)
-            st.pyplot(fig)
-    with col2:
-        if len(df_temp1)==0:
-                st.write(f"There are no energy sources available for {energy_catg} energy in the canton of {canton_name}.")
-        else:
-            fig=pltg.give_time_fig(df_temp1,'electrical_capacity',energy_catg)
-            st.pyplot(fig)
+        animation_variable = st.radio('Color by', ['count', 'electrical_capacity', 'production'], horizontal=True,
+                                      format_func={'count': 'Number of Sources', 'electrical_capacity': 'Capacity',
+                                                   'production': 'Production'}.get, key="radio_animation")
+    animation_figs = snp.give_figs(data, snp.give_key('animation', canton_name, energy_catg, period=period))
+    if animation_figs[animation_variable] is None:
+        st.write(f"There are no energy sources available for {figs_.give_display_name(energy_catg, {})} energy in {figs_.give_canton_label(canton_name)}.")
+    else:
+        utl.show_fig(animation_figs[animation_variable], use_container_width=True)
+    st.write("Data Source: https://data.open-power-system-data.org/renewable_power_plants/2020-08-25")
+#-------------------------------------------------------------------------------------------------------------------------
+#************************************************* Begin Tab4 ************************************************************
+#-------------------------------------------------------------------------------------------------------------------------
+with tab4:
+    st.markdown(
+            """
+            <p style='font-size:15px; font-weight:400; color:black; text-align:justify; text-align-last:left; width:100%;'>
+                This tab compares cantons side by side: their number of sources, capacity and production, how they grew
+                over the years and the energy mix of their capacity. The table gives the difference to the first selected
+                canton and the ratio to it.
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
+    st.write("")
+    #------------------------- Set Cantons and energy category -----------------------------
+    col1, col2, col3, col4 = st.columns([2, 0.2, 1, 2])
+    with col1:
+        compare_cantons = tuple(st.multiselect('Select Cantons to compare', canton_names[1:], default=['Bern', 'Zürich'],
+                                               key="select_compare"))
     with col3:
-        if len(df_temp1)==0:
-                st.write(f"There are no energy sources available for {energy_catg} energy in the canton of {canton_name}.")
-        else:
-            fig=pltg.give_time_fig(df_temp1,'production',energy_catg)
-            st.pyplot(fig)
+        energy_catg = utl.give_filter_value(st.multiselect('Select Energy Categories', energy_catags[1:], key="select_energy5",
+                                                           placeholder="All"), energy_catags[1:])
+    if len(compare_cantons) < 2:
+        st.info("Select at least two cantons to compare them.")
+    else:
+        #------------------------------------ Table ------------------------------------
+        compare = figs_.give_compare_data(data['canton_cube'], compare_cantons, energy_catg, period)
+        st.dataframe(figs_.give_compare_table(compare['totals']), hide_index=True, use_container_width=True)
+        figs = snp.give_figs(data, snp.give_key('compare', compare_cantons, energy_catg, period=period))
+        #------------------------------------ plots ------------------------------------
+        for variable in ['count', 'electrical_capacity', 'production']:
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                utl.show_fig(figs[('bar', variable)])
+            with col2:
+                utl.show_fig(figs[('growth', variable)])
+        st.write("**Energy mix of the electrical capacity**")
+        for i in range(0, len(compare_cantons), 4):
+            cols = st.columns(4)
+            for col, canton in zip(cols, compare_cantons[i:i+4]):
+                with col:
+                    st.write(f"**{canton}**")
+                    if figs[('pie', canton)] is None:
+                        st.write(f"There are no {figs_.give_display_name(energy_catg, {})} energy sources in {figs_.give_canton_label(canton)}.")
+                    else:
+                        utl.show_fig(figs[('pie', canton)])
     st.write("Data Source: https://data.open-power-system-data.org/renewable_power_plants/2020-08-25")
 #------------------------------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,142 @@
+#***********************************************************************
+#    Offline build of the dashboard data artifacts                     #
+#    Build: python build.py [--out artifacts] [--stage NAME] [--force] #
+#***********************************************************************
+
+import argparse
+import json
+import os
+import pickle
+import time
+
+import utils as utl
+import grid as grd
+import sketch as skt
+import topology as topo
+
+DATA_PATHS = ['./data/swiss_clean_energy.csv', './data/georef-switzerland-kanton.geojson']
+
+#---------------------------- write_artifact ------------------------------
+# This function writes an artifact atomically and returns its content hash
+def write_artifact(artifacts_dir, name, content):
+    path = os.path.join(artifacts_dir, name)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(content)
+    os.replace(temp_path, path)
+    return utl.give_files_hash([path])
+
+#---------------------------- build_dataset ------------------------------
+# This function writes the typed dataset: the compact csv data with the
+# dates parsed and the missing cantons assigned from the coordinates
+def build_dataset(artifacts_dir):
+    energy_df = utl.load_checked_data(*DATA_PATHS)
+    return {'dataset.pkl': write_artifact(artifacts_dir, 'dataset.pkl', pickle.dumps(energy_df, pickle.HIGHEST_PROTOCOL))}
+
+#---------------------------- build_geometry ------------------------------
+# This function writes the canton geometry shown on the maps, simplified
+# on its topology so that neighbouring cantons keep a common border
+def build_geometry(artifacts_dir):
+    with open(DATA_PATHS[1]) as file:
+        topology = topo.give_topology(json.load(file))
+    geojson = topo.give_features(topo.give_simplified(topology, topo.SIMPLIFY_TOLERANCE))
+    content = json.dumps(geojson, separators=(',', ':')).encode()
+    return {'geometry.json': write_artifact(artifacts_dir, 'geometry.json', content)}
+
+#---------------------------- build_bounds ------------------------------
+# This function writes the bounds, the area and the population of every
+# canton, from the full geometry and the population file
+def build_bounds(artifacts_dir):
+    geopd_data = utl.load_geopanda_data(DATA_PATHS[1])
+    canton_bounds = utl.give_canton_bounds(geopd_data)
+    canton_metrics = utl.give_canton_metrics(geopd_data)
+    return {
+        'bounds.json': write_artifact(artifacts_dir, 'bounds.json', json.dumps(canton_bounds, ensure_ascii=False, indent=1).encode()),
+        'metrics.json': write_artifact(artifacts_dir, 'metrics.json', json.dumps(canton_metrics, ensure_ascii=False, indent=1).encode()),
+    }
+
+#---------------------------- build_aggregates ------------------------------
+# This function writes the aggregates of the typed dataset: the grid
+# aggregates, the KD-trees of the near search, the municipality points,
+# the bitmap index of the filters, the canton cube of the comparison, the
+# quantile sketches of the summary statistics and the top lists and
+# company totals of the leaderboards
+def build_aggregates(artifacts_dir):
+    with open(os.path.join(artifacts_dir, 'dataset.pkl'), 'rb') as file:
+        energy_df = pickle.load(file)
+    aggregates = {
+        'grid_aggregates': grd.give_grid_aggregates(energy_df),
+        'near_index': dict(utl.build_near_index(energy_df)),
+        'municipality_points': utl.give_municipality_points(energy_df),
+        'filter_index': utl.build_filter_index(energy_df),
+        'canton_cube': utl.build_canton_cube(energy_df),
+        'sketches': skt.build_sketches(energy_df),
+        'top_lists': utl.build_top_lists(energy_df),
+        'company_totals': utl.build_company_totals(energy_df),
+    }
+    return {'aggregates.pkl': write_artifact(artifacts_dir, 'aggregates.pkl', pickle.dumps(aggregates, pickle.HIGHEST_PROTOCOL))}
+
+#---------------------------- stages ------------------------------
+# The stages of the build in order: the files an artifact is made from
+# (data and code), the stages whose artifacts it reads and the function
+# writing it. A stage is rebuilt when one of these changed
+STAGES = {
+    'dataset': {'files': DATA_PATHS + ['utils.py', 'build.py'], 'needs': [], 'build': build_dataset},
+    'geometry': {'files': [DATA_PATHS[1], 'topology.py', 'build.py'], 'needs': [], 'build': build_geometry},
+    'bounds': {'files': [DATA_PATHS[1], utl.POPULATION_FILE, 'utils.py', 'build.py'], 'needs': [], 'build': build_bounds},
+    'aggregates': {'files': ['utils.py', 'grid.py', 'sketch.py', 'build.py'], 'needs': ['dataset'], 'build': build_aggregates},
+}
+
+#---------------------------- write_manifest ------------------------------
+# This function writes the manifest of the artifacts atomically
+def write_manifest(artifacts_dir, manifest):
+    content = json.dumps(manifest, indent=1).encode()
+    write_artifact(artifacts_dir, utl.ARTIFACTS_MANIFEST, content)
+
+#---------------------------- build ------------------------------
+# This function builds the stages that are not up to date, or the given
+# stages (and the stages reading their artifacts) when forced, and
+# returns the names of the rebuilt stages
+def build(artifacts_dir=utl.ARTIFACTS_DIR, stages=None, force=False):
+    os.makedirs(artifacts_dir, exist_ok=True)
+    manifest = utl.read_manifest(artifacts_dir) or {'stages': {}}
+    manifest['stages'] = {name: stage for name, stage in manifest['stages'].items() if name in STAGES}
+    stale = set(utl.give_stale_stages(manifest, artifacts_dir))
+    rebuilt = []
+    for name, stage in STAGES.items():
+        files = {file: utl.give_files_hash([file]) for file in stage['files']}
+        needs = {output: output_hash for need in stage['needs']
+                 for output, output_hash in manifest['stages'][need]['outputs'].items()}
+        record = manifest['stages'].get(name)
+        up_to_date = (record is not None and name not in stale
+                      and record['files'] == files and record['needs'] == needs)
+        forced = force and (stages is None or name in stages)
+        if up_to_date and not forced:
+            print(f"{name}: up to date")
+            continue
+        if stages is not None and name not in stages and not any(need in rebuilt for need in stage['needs']):
+            print(f"{name}: not up to date, skipped")
+            continue
+        start = time.perf_counter()
+        outputs = stage['build'](artifacts_dir)
+        manifest['stages'][name] = {'files': files, 'needs': needs, 'outputs': outputs}
+        write_manifest(artifacts_dir, manifest)
+        rebuilt.append(name)
+        print(f"{name}: built {', '.join(outputs)} in {time.perf_counter() - start:.2f} s")
+    return rebuilt
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build the data artifacts the dashboard starts from.")
+    parser.add_argument('--out', default=utl.ARTIFACTS_DIR, help=f"artifacts directory (default: {utl.ARTIFACTS_DIR})")
+    parser.add_argument('--stage', action='append', choices=list(STAGES),
+                        help="only build this stage (repeatable), with the stages reading its artifacts")
+    parser.add_argument('--force', action='store_true', help="rebuild the stages even when they are up to date")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    rebuilt = build(args.out, args.stage, args.force)
+    print(f"Done in {time.perf_counter() - start:.1f} s, {len(rebuilt)} stage(s) rebuilt in {args.out}")
+
+
+if __name__ == '__main__':
+    main()
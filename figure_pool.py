@@ -0,0 +1,83 @@
+#***********************************************************************
+#    Pool of the figure workers, in a process of its own               #
+#    Started by snapshot.start_pool: python figure_pool.py ADDRESS N   #
+#***********************************************************************
+
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import BaseManager
+
+import snapshot as snp
+
+# Environment variable handing the key of the connections to the pool
+AUTHKEY_VARIABLE = 'FIGURE_POOL_AUTHKEY'
+# Seconds between two checks that the app process is still running
+PARENT_CHECK_SECONDS = 1.0
+
+#---------------------------- PoolManager ------------------------------
+# The manager serving the pool to the app process: the app calls
+# give_pool() for a proxy of the FigurePool and calls build_figs on it
+class PoolManager(BaseManager):
+    pass
+
+PoolManager.register('give_pool')
+
+#---------------------------- FigurePool ------------------------------
+# The worker processes building the figures of the views. They are
+# spawned from this process, whose __main__ is this module, so they never
+# run the app script. Every call of the app is served in a thread of its
+# own, so the views of several sessions are built at the same time
+class FigurePool:
+    def __init__(self, workers):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=snp.init_worker,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        # All the workers are started and have loaded the data before the
+        # pool is served
+        for future in [self.executor.submit(int) for _ in range(workers)]:
+            future.result()
+
+    # This method builds and serializes the named figures of a view
+    # concurrently and returns them in the order of the names
+    def build_figs(self, key, names, version):
+        futures = [self.executor.submit(snp.build_fig, key, name, version) for name in names]
+        return [future.result() for future in futures]
+
+#---------------------------- stop ------------------------------
+# This function stops the workers and the pool, when the pool is
+# terminated (snapshot.stop_pool) or the app process is gone
+def stop(*args):
+    for child in multiprocessing.active_children():
+        child.terminate()
+    os._exit(0)
+
+#---------------------------- watch_parent ------------------------------
+# This function stops the pool once the app process that started it is
+# gone
+def watch_parent(parent_pid):
+    while os.getppid() == parent_pid:
+        time.sleep(PARENT_CHECK_SECONDS)
+    stop()
+
+#---------------------------- serve ------------------------------
+# This function starts the workers and then serves the pool at an
+# address (the socket is created then, see snapshot.start_pool)
+def serve(address, workers, authkey):
+    signal.signal(signal.SIGTERM, stop)
+    threading.Thread(target=watch_parent, args=(os.getppid(),), daemon=True).start()
+    pool = FigurePool(workers)
+    PoolManager.register('give_pool', callable=lambda: pool)
+    PoolManager(address=address, authkey=authkey).get_server().serve_forever()
+
+#---------------------------- main ------------------------------
+def main():
+    address, workers = sys.argv[1], int(sys.argv[2])
+    serve(address, workers, bytes.fromhex(os.environ[AUTHKEY_VARIABLE]))
+
+
+if __name__ == '__main__':
+    main()
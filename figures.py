@@ -0,0 +1,475 @@
+import functools
+import json
+import sys
+
+import numpy as np
+
+import utils as utl
+import plotting as pltg
+import grid as grd
+import sketch as skt
+
+# Display names of the energy categories used in the titles
+custom_names = {
+    "All": "Total Renewable",
+    "Hydro": "Hydropower",
+    "Solar": "Solar Power",
+    "Wind": "Wind Power",
+    "Bioenergy": "Bio"
+}
+
+#---------------------------- give_energy_catags ------------------------------
+# This function returns the energy categories offered in the dashboard
+def give_energy_catags(energy_df):
+    return ['All'] + sorted(energy_df["energy_source_level_2"].dropna().unique())
+
+#---------------------------- give_canton_names ------------------------------
+# This function returns the canton names offered in the dashboard
+def give_canton_names(energy_df):
+    return ['All'] + sorted(energy_df["canton_name"].dropna().unique())
+
+#---------------------------- give_display_name ------------------------------
+# This function returns the display name of a filter value, the names
+# of several selected values joined by sep
+def give_display_name(value, names=custom_names, sep=' + '):
+    if isinstance(value, str):
+        return names.get(value, value)
+    return sep.join(names.get(name, name) for name in value)
+
+#---------------------------- give_canton_label ------------------------------
+# This function returns the cantons of a filter value as used in texts
+def give_canton_label(canton_name):
+    if canton_name=='All':
+        return 'Switzerland'
+    if isinstance(canton_name, str):
+        return f"the canton of {canton_name}"
+    return f"the cantons of {', '.join(canton_name)}"
+
+#---------------------------- give_other_catags ------------------------------
+# This function returns the energy categories not selected by a filter
+# value, shown next to the selection for comparison
+def give_other_catags(energy_catags, energy_catg):
+    selected = utl.give_filter_values(energy_catg) or ['All']
+    return [x for x in energy_catags if x not in selected]
+
+#---------------------------- run_jobs ------------------------------
+# This function builds the figures of a dictionary of figure jobs. A job
+# is a function without arguments returning the figure, or None when
+# there is no figure. The jobs of a view are independent of each other,
+# so they can also be run concurrently (see snapshot.give_figs)
+def run_jobs(jobs):
+    return {name: None if job is None else job() for name, job in jobs.items()}
+
+#---------------------------- give_overview_jobs ------------------------------
+# This function returns the jobs of the maps and bar plots of the
+# overview tab for an energy category and a period. The maps are also
+# given per inhabitant and per km² of the cantons (see utils.NORMALIZATIONS)
+def give_overview_jobs(energy_df, geojsn_data, canton_metrics, energy_catg, filter_index=None, period='All'):
+    sources_per_canton = utl.give_canton_summary(energy_df, energy_catg, filter_index, period)
+    sources_per_canton = utl.give_normalized_summary(sources_per_canton, canton_metrics)
+    display_catg = give_display_name(energy_catg)
+    jobs = {}
+    for suffix in [''] + list(utl.NORMALIZATIONS):
+        jobs['map_count' + suffix] = functools.partial(pltg.give_fig,sources_per_canton,geojsn_data,"count" + suffix,display_catg)
+        jobs['map_capacity' + suffix] = functools.partial(pltg.give_fig,sources_per_canton,geojsn_data,"electrical_capacity" + suffix)
+        jobs['map_production' + suffix] = functools.partial(pltg.give_fig,sources_per_canton,geojsn_data,"production" + suffix)
+
+    sources_per_canton_sorted = sources_per_canton.sort_values(by='count', ascending=False)
+    jobs['bar_count'] = functools.partial(pltg.give_bar_fig,sources_per_canton_sorted,'count','electrical_capacity','Number of Sources', "Electrical capacity<br>(in MW)")
+    sources_per_canton_sorted = sources_per_canton.sort_values(by='electrical_capacity', ascending=False)
+    jobs['bar_capacity'] = functools.partial(pltg.give_bar_fig,sources_per_canton_sorted,'electrical_capacity','production','Electrical Capacity (in MW)', "Production<br>(in MWh)")
+    sources_per_canton_sorted = sources_per_canton.sort_values(by='production', ascending=False)
+    jobs['bar_production'] = functools.partial(pltg.give_bar_fig,sources_per_canton_sorted,'production','count','Production (in MWh)', "Number of<br>Sources")
+    return jobs
+
+#---------------------------- give_overview_figs ------------------------------
+# This function returns the maps and bar plots of the overview tab
+# for an energy category
+def give_overview_figs(energy_df, geojsn_data, canton_metrics, energy_catg, filter_index=None, period='All'):
+    return run_jobs(give_overview_jobs(energy_df, geojsn_data, canton_metrics, energy_catg, filter_index, period))
+
+#---------------------------- give_grid_jobs ------------------------------
+# This function returns the jobs of the grid maps of the overview tab for
+# an energy category at a geohash precision, read from the precomputed
+# aggregates. The cells of a period are summed from its rows
+def give_grid_jobs(grid_aggregates, energy_catg, precision, energy_df=None, filter_index=None, period='All'):
+    precision = int(precision)
+    if period=='All':
+        cells = grd.give_grid_cells(grid_aggregates, energy_catg, precision)
+    else:
+        cells = grd.give_selection_cells(utl.give_selection(energy_df, 'All', energy_catg, filter_index, period), precision)
+    display_catg = give_display_name(energy_catg)
+    grid_geojson = grid_aggregates[precision]['geojson']
+    cell_size = grd.GRID_PRECISIONS[precision]
+    return {variable: functools.partial(pltg.give_grid_fig, cells, grid_geojson, variable, display_catg, cell_size)
+            for variable in ['count', 'electrical_capacity', 'production']}
+
+#---------------------------- give_grid_figs ------------------------------
+# This function returns the grid maps of the overview tab for an energy
+# category at a geohash precision
+def give_grid_figs(grid_aggregates, energy_catg, precision, energy_df=None, filter_index=None, period='All'):
+    return run_jobs(give_grid_jobs(grid_aggregates, energy_catg, precision, energy_df, filter_index, period))
+
+#---------------------------- give_location_jobs ------------------------------
+# This function returns the jobs of the map, bar plot and pie charts of
+# the source location tab for a canton, an energy category and a period.
+# The map is None when there are no sources for the selection. A map of
+# several cantons is zoomed to the bounds of all of them
+def give_location_jobs(energy_df, geojsn_data, canton_bounds, canton_name, energy_catg, filter_index=None, period='All'):
+    df_temp = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period)
+    df_temp2 = utl.give_selection(energy_df, canton_name, 'All', filter_index, period)
+    jobs = {}
+    if len(df_temp)==0:
+        jobs['map'] = None
+    elif canton_name=='All':
+        jobs['map'] = functools.partial(pltg.give_swiss_fig,df_temp,geojsn_data,46.8,8.3,6.4)
+    else:
+        bounds = np.array([canton_bounds[name] for name in utl.give_filter_values(canton_name)])
+        lat_cntr, lon_cntr, zoom = utl.give_bounds_zoom((*bounds[:, :2].min(axis=0), *bounds[:, 2:].max(axis=0)))
+        jobs['map'] = functools.partial(pltg.give_canton_fig,df_temp,geojsn_data,lat_cntr,lon_cntr,zoom)
+    jobs['bar_sources'] = functools.partial(pltg.give_bar_fig2,df_temp2, 'Number of Sources')
+    jobs['pie_capacity'] = functools.partial(pltg.give_pie_fig2,df_temp2,'electrical_capacity')
+    jobs['pie_production'] = functools.partial(pltg.give_pie_fig2,df_temp2,'production')
+    return jobs
+
+#---------------------------- give_location_figs ------------------------------
+# This function returns the map, bar plot and pie charts of the source
+# location tab for a canton and an energy category
+def give_location_figs(energy_df, geojsn_data, canton_bounds, canton_name, energy_catg, filter_index=None, period='All'):
+    return run_jobs(give_location_jobs(energy_df, geojsn_data, canton_bounds, canton_name, energy_catg, filter_index, period))
+
+# Columns of the sources listed by the near search
+NEAR_COLUMNS = ['municipality', 'canton_name', 'energy_source_level_2', 'technology', 'company',
+                'address', 'lat', 'lon', 'electrical_capacity', 'production']
+
+#---------------------------- give_near_view ------------------------------
+# This function returns the sources of an energy category commissioned
+# in a period found by the near search around a point (the k nearest or
+# all within radius_km), nearest first with their distance, and the map
+# showing them
+def give_near_view(energy_df, near_index, energy_catg, lat, lon, place, k=None, radius_km=None,
+                   filter_index=None, period='All'):
+    row_bounds = None if period=='All' else utl.give_period_bounds(filter_index, period)
+    rows, distances = utl.give_nearest(near_index, energy_catg, lat, lon, k=k, radius_km=radius_km, row_bounds=row_bounds)
+    df_near = energy_df.iloc[rows][NEAR_COLUMNS].assign(distance_km=distances)
+    return df_near, pltg.give_near_fig(df_near, lat, lon, place)
+
+#---------------------------- give_map_rows ------------------------------
+# This function returns the row positions in energy_df of the points of
+# every scatter trace of a location map (its JSON text as served), by
+# trace number. Plotly Express makes one trace per energy type, keeping
+# the order of the rows
+def give_map_rows(map_spec, energy_df, filter_index, canton_name, energy_catg, period='All'):
+    positions = utl.give_filter_rows(filter_index, canton_name, energy_catg, period)
+    energy = energy_df['energy_source_level_2'].astype(str).to_numpy()[positions]
+    return {number: positions[energy == trace.get('name')]
+            for number, trace in enumerate(json.loads(map_spec)['data']) if trace.get('type') == 'scattermap'}
+
+#---------------------------- give_selected_rows ------------------------------
+# This function returns the row positions of the points selected on a
+# location map
+def give_selected_rows(points, map_rows):
+    return np.array([map_rows[point['curve_number']][point['point_index']]
+                     for point in points if point.get('curve_number') in map_rows], dtype='int64')
+
+#---------------------------- give_selection_figs ------------------------------
+# This function returns the bar plot and pie charts of the source
+# location tab for the rows selected on the map, with their totals
+def give_selection_figs(energy_df, rows):
+    summary = utl.give_rows_summary(energy_df, rows)
+    figs = {}
+    figs['bar_sources'] = pltg.give_energy_bar_fig(summary, 'Number of Sources')
+    figs['pie_capacity'] = pltg.give_energy_pie_fig(summary, 'electrical_capacity')
+    figs['pie_production'] = pltg.give_energy_pie_fig(summary, 'production')
+    totals = {'count': int(summary['Number of Sources'].sum()),
+              'electrical_capacity': round(float(summary['electrical_capacity'].sum()), 2),
+              'production': round(float(summary['production'].sum()), 2)}
+    return figs, totals
+
+#---------------------------- give_sketch_quantiles ------------------------------
+# This function returns quantiles of variables of a selection read from
+# the quantile sketches, or None when there are no sketches or a period
+# is selected, the sketches covering the whole range: the plots then take
+# the exact quantiles of their rows
+def give_sketch_quantiles(sketches, variables, canton_name, energy_catg, quantiles, period='All'):
+    if sketches is None or period!='All':
+        return None
+    return {variable: skt.give_sketch_quantiles(sketches, variable, canton_name, energy_catg, quantiles)
+            for variable in variables}
+
+#---------------------------- give_ratio_medians ------------------------------
+# This function returns the median production to capacity ratio of every
+# energy category of Switzerland read from the quantile sketches, or None
+# when they do not apply (see give_sketch_quantiles)
+def give_ratio_medians(sketches, energy_catags, period='All'):
+    if sketches is None or period!='All':
+        return None
+    return {energy: skt.give_sketch_quantiles(sketches, 'ratio', 'All', energy, [0.5])[0] for energy in energy_catags}
+
+#---------------------------- give_distribution_jobs ------------------------------
+# This function returns the jobs of the violin plots of the summary
+# statistics tab. The main plots are keyed by the variable, the
+# supplementary plots of the other energy types by the variable and the
+# energy type. A plot is None when there are no sources for it. The
+# quartiles of the outlier fences are read from the quantile sketches
+def give_distribution_jobs(energy_df, canton_name, energy_catg, outlier_zoom, filter_index=None, period='All', sketches=None):
+    df_temp = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period)
+    df_temp1 = utl.give_selection(energy_df, canton_name, 'All', filter_index, period)
+    energy_arr = give_other_catags(give_energy_catags(energy_df), energy_catg)
+    variables = ['production', 'electrical_capacity']
+    quartiles = give_sketch_quantiles(sketches, variables, canton_name, energy_catg, [0.25, 0.75], period) or {}
+    jobs = {}
+    for variable in variables:
+        if len(df_temp)==0:
+            jobs[variable] = None
+        else:
+            jobs[variable] = functools.partial(pltg.give_violin_fig, df_temp, variable, 300, give_display_name(energy_catg, {}), outlier_zoom,
+                                               quartiles.get(variable))
+        for energy in energy_arr:
+            df_other = utl.give_selection(df_temp1, 'All', energy)
+            if len(df_other)==0:
+                jobs[(variable, energy)] = None
+            else:
+                other_quartiles = give_sketch_quantiles(sketches, [variable], canton_name, energy, [0.25, 0.75], period) or {}
+                jobs[(variable, energy)] = functools.partial(pltg.give_violin_fig, df_other, variable, 150, energy, outlier_zoom,
+                                                             other_quartiles.get(variable))
+    return jobs
+
+#---------------------------- give_distribution_figs ------------------------------
+# This function returns the violin plots of the summary statistics tab
+def give_distribution_figs(energy_df, canton_name, energy_catg, outlier_zoom, filter_index=None, period='All', sketches=None):
+    return run_jobs(give_distribution_jobs(energy_df, canton_name, energy_catg, outlier_zoom, filter_index, period, sketches))
+
+#---------------------------- give_efficiency_jobs ------------------------------
+# This function returns the job of the scatter plot of production
+# against capacity of the summary statistics tab. The quartiles of the
+# outlier fences and the median ratios are read from the quantile sketches
+def give_efficiency_jobs(energy_df, canton_name, energy_catg, outlier_zoom, filter_index=None, period='All', sketches=None):
+    df_temp = utl.give_selection(energy_df, 'All', 'All', filter_index, period)
+    df_temp = df_temp.assign(ratio=df_temp["production"]/df_temp["electrical_capacity"])
+    df_temp1 = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period)
+    df_temp1 = df_temp1.assign(ratio=df_temp1["production"]/df_temp1["electrical_capacity"])
+    quartiles = give_sketch_quantiles(sketches, ['production', 'electrical_capacity'], canton_name, energy_catg, [0.25, 0.75], period)
+    medians = give_ratio_medians(sketches, give_energy_catags(energy_df)[1:], period)
+    return {'scatter': functools.partial(pltg.give_scatter_fig,df_temp1,df_temp,energy_catg,outlier_zoom,quartiles,medians)}
+
+#---------------------------- give_efficiency_figs ------------------------------
+# This function returns the scatter plot of production against
+# capacity of the summary statistics tab
+def give_efficiency_figs(energy_df, canton_name, energy_catg, outlier_zoom, filter_index=None, period='All', sketches=None):
+    return run_jobs(give_efficiency_jobs(energy_df, canton_name, energy_catg, outlier_zoom, filter_index, period, sketches))
+
+#---------------------------- give_hist_jobs ------------------------------
+# This function returns the job of the histogram of the production to
+# capacity ratio of all of Switzerland in a period, with the median
+# ratios read from the quantile sketches
+def give_hist_jobs(energy_df, filter_index=None, period='All', sketches=None):
+    df_temp = utl.give_selection(energy_df, 'All', 'All', filter_index, period)
+    df_temp = df_temp.assign(ratio=df_temp["production"]/df_temp["electrical_capacity"])
+    medians = give_ratio_medians(sketches, give_energy_catags(energy_df)[1:], period)
+    return {'hist': functools.partial(pltg.give_hist_fig, df_temp, medians)}
+
+#---------------------------- give_hist_figs ------------------------------
+# This function returns the histogram of the production to capacity
+# ratio of all of Switzerland in a period
+def give_hist_figs(energy_df, filter_index=None, period='All', sketches=None):
+    return run_jobs(give_hist_jobs(energy_df, filter_index, period, sketches))
+
+#---------------------------- give_growth_jobs ------------------------------
+# This function returns the jobs of the cumulative growth plots of the
+# summary statistics tab. The plots are None when there are no sources.
+# The rows are in the order of their commissioning date
+def give_growth_jobs(energy_df, canton_name, energy_catg, filter_index=None, period='All'):
+    df_temp1 = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period)
+    jobs = {}
+    for variable in ['count', 'electrical_capacity', 'production']:
+        if len(df_temp1)==0:
+            jobs[variable] = None
+        else:
+            df_plot = df_temp1.assign(count=int(1))
+            jobs[variable] = functools.partial(pltg.give_time_fig,df_plot,variable,energy_catg)
+    return jobs
+
+#---------------------------- give_growth_figs ------------------------------
+# This function returns the cumulative growth plots of the summary
+# statistics tab
+def give_growth_figs(energy_df, canton_name, energy_catg, filter_index=None, period='All'):
+    return run_jobs(give_growth_jobs(energy_df, canton_name, energy_catg, filter_index, period))
+
+#---------------------------- give_animation_jobs ------------------------------
+# This function returns the jobs of the animated maps of the build-out of
+# a selection, one per variable. The maps are None when there are no
+# sources for the selection
+def give_animation_jobs(energy_df, geojsn_data, canton_name, energy_catg, filter_index=None, period='All'):
+    df_temp = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period)
+    variables = ['count', 'electrical_capacity', 'production']
+    if len(df_temp)==0:
+        return {variable: None for variable in variables}
+    years, cantons, totals = utl.give_yearly_totals(df_temp)
+    display_catg = give_display_name(energy_catg)
+    return {variable: functools.partial(pltg.give_animated_fig, df_temp, years, cantons, totals[variable],
+                                        geojsn_data, variable, display_catg)
+            for variable in variables}
+
+#---------------------------- give_animation_figs ------------------------------
+# This function returns the animated maps of the build-out of a selection
+def give_animation_figs(energy_df, geojsn_data, canton_name, energy_catg, filter_index=None, period='All'):
+    return run_jobs(give_animation_jobs(energy_df, geojsn_data, canton_name, energy_catg, filter_index, period))
+
+#---------------------------- give_compare_data ------------------------------
+# This function returns what the canton comparison shows, read in one
+# pass from the canton cube: the totals per canton, the energy mix per
+# canton and energy type and, for every variable, the totals per year
+# (rows) and canton (columns) up to the end of the year
+def give_compare_data(canton_cube, canton_names, energy_catg, period='All'):
+    cube = utl.give_cube_selection(canton_cube, canton_names, energy_catg, period)
+    variables = ['count', 'electrical_capacity', 'production']
+    cube = cube.assign(canton_name=cube['canton_name'].astype(str), energy_source_level_2=cube['energy_source_level_2'].astype(str))
+    totals = cube.groupby('canton_name')[variables].sum().reindex(list(canton_names), fill_value=0)
+    mix = cube.groupby(['canton_name', 'energy_source_level_2'], as_index=False)[variables].sum()
+    years = range(int(cube['year'].min()), int(cube['year'].max()) + 1) if len(cube) else []
+    yearly = cube.groupby(['year', 'canton_name'])[variables].sum()
+    growth = {variable: yearly[variable].unstack('canton_name').reindex(index=years, columns=list(canton_names))
+                        .fillna(0).cumsum()
+              for variable in variables}
+    return {'totals': totals.rename_axis('canton_name').reset_index(), 'mix': mix, 'growth': growth}
+
+#---------------------------- give_compare_table ------------------------------
+# This function returns the totals of the compared cantons with their
+# difference to and ratio of the first canton
+def give_compare_table(totals):
+    names = {'count': 'Number of Sources', 'electrical_capacity': 'Capacity (MW)', 'production': 'Production (MWh)'}
+    table = totals.rename(columns={'canton_name': 'Canton'})
+    for variable, name in names.items():
+        reference = totals[variable].iloc[0]
+        table[f"{name} vs {totals['canton_name'].iloc[0]}"] = totals[variable] - reference
+        table[f"{name} ratio"] = totals[variable] / reference if reference else np.nan
+    return table.rename(columns=names)
+
+#---------------------------- give_compare_jobs ------------------------------
+# This function returns the jobs of the canton comparison: bar plots of
+# the totals and growth curves side by side for every variable, and the
+# energy mix of the capacity of every canton (None when it has no sources)
+def give_compare_jobs(canton_cube, canton_names, energy_catg, period='All'):
+    compare = give_compare_data(canton_cube, canton_names, energy_catg, period)
+    jobs = {}
+    for variable in ['count', 'electrical_capacity', 'production']:
+        jobs[('bar', variable)] = functools.partial(pltg.give_compare_bar_fig, compare['totals'], variable)
+        jobs[('growth', variable)] = functools.partial(pltg.give_compare_time_fig, compare['growth'][variable], variable)
+    for canton_name in canton_names:
+        mix = compare['mix'][compare['mix']['canton_name']==canton_name]
+        if len(mix)==0:
+            jobs[('pie', canton_name)] = None
+        else:
+            jobs[('pie', canton_name)] = functools.partial(pltg.give_energy_pie_fig, mix, 'electrical_capacity')
+    return jobs
+
+#---------------------------- give_compare_figs ------------------------------
+# This function returns the figures of the canton comparison
+def give_compare_figs(canton_cube, canton_names, energy_catg, period='All'):
+    return run_jobs(give_compare_jobs(canton_cube, canton_names, energy_catg, period))
+
+# Names of the columns of the leaderboards
+leaderboard_names = {'municipality': 'Municipality', 'canton_name': 'Canton', 'energy_source_level_2': 'Energy Category',
+                     'technology': 'Technology', 'company': 'Company', 'count': 'Number of Sources',
+                     'electrical_capacity': 'Capacity (MW)', 'production': 'Production (MWh)',
+                     'commissioning_date': 'Commissioning Date'}
+
+#---------------------------- give_top_installations ------------------------------
+# This function returns the n largest installations of a selection by a
+# variable, merged from the top lists of its cantons and energy
+# categories, or ranked from its rows when the lists do not hold them
+def give_top_installations(energy_df, top_lists, canton_name, energy_catg, variable, n, filter_index=None, period='All'):
+    positions = utl.give_top_rows(top_lists, filter_index, variable, canton_name, energy_catg, n, period)
+    if positions is None:
+        df_top = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period).nlargest(n, variable)
+    else:
+        df_top = energy_df.iloc[positions]
+    columns = ['company', 'municipality', 'canton_name', 'energy_source_level_2', 'technology',
+               'electrical_capacity', 'production', 'commissioning_date']
+    df_top = df_top[columns].astype({col: str for col in ['company', 'municipality', 'canton_name', 'energy_source_level_2', 'technology']})
+    df_top = df_top.rename(columns=leaderboard_names)
+    df_top.index = np.arange(1, len(df_top) + 1)
+    return df_top
+
+#---------------------------- give_top_companies ------------------------------
+# This function returns the n companies of a selection with the largest
+# totals of a variable, summed from the company totals of its cantons and
+# energy categories, or from its rows in a period
+def give_top_companies(energy_df, company_totals, canton_name, energy_catg, variable, n, filter_index=None, period='All'):
+    variables = ['count', 'electrical_capacity', 'production']
+    if period=='All':
+        totals = utl.give_cube_selection(company_totals, canton_name, energy_catg)
+    else:
+        totals = utl.give_selection(energy_df, canton_name, energy_catg, filter_index, period).assign(count=1)
+    totals = totals.groupby('company', observed=True)[variables].sum().nlargest(n, variable).reset_index()
+    totals['company'] = totals['company'].astype(str)
+    totals.index = np.arange(1, len(totals) + 1)
+    return totals.rename(columns=leaderboard_names)
+
+# Names of the columns of the energy hierarchy tables
+hierarchy_names = {'canton_name': 'Canton', 'energy_source_level_2': 'Energy Category',
+                   'energy_source_level_3': 'Subcategory', 'technology': 'Technology', 'count': 'Number of Sources',
+                   'electrical_capacity': 'Capacity (MW)', 'production': 'Production (MWh)'}
+
+#---------------------------- give_hierarchy_data ------------------------------
+# This function returns the totals of a selection per canton at every
+# level of the energy hierarchy, rolled up from the canton cube
+def give_hierarchy_data(canton_cube, canton_name, energy_catg, period='All'):
+    return utl.give_cube_rollup(utl.give_cube_selection(canton_cube, canton_name, energy_catg, period))
+
+#---------------------------- give_hierarchy_options ------------------------------
+# This function returns the categories found below a category of the
+# energy hierarchy, the energy categories for 'All'
+def give_hierarchy_options(rollup, level2='All'):
+    if level2=='All':
+        return ['All'] + list(rollup['energy_source_level_2'].index.unique('energy_source_level_2').astype(str))
+    level3 = rollup['energy_source_level_3'].xs(level2, level='energy_source_level_2')
+    return ['All'] + list(level3.index.unique('energy_source_level_3').astype(str))
+
+#---------------------------- give_hierarchy_table ------------------------------
+# This function returns the drill-down table of the energy hierarchy per
+# canton: the energy categories, the subcategories of an energy category
+# or the technologies of one of its subcategories
+def give_hierarchy_table(rollup, level2='All', level3='All'):
+    if level2=='All':
+        table = rollup['energy_source_level_2']
+    elif level3=='All':
+        table = rollup['energy_source_level_3'].xs(level2, level='energy_source_level_2')
+    else:
+        table = rollup['technology'].xs((level2, level3), level=['energy_source_level_2', 'energy_source_level_3'])
+    table = table.reset_index()
+    for col in table.columns[:table.columns.get_loc('count')]:
+        table[col] = table[col].astype(str)
+    return table.rename(columns=hierarchy_names)
+
+#---------------------------- give_hierarchy_jobs ------------------------------
+# This function returns the jobs of the sunburst charts of the energy
+# hierarchy of a selection, one per variable (None when it has no sources)
+def give_hierarchy_jobs(canton_cube, canton_name, energy_catg, period='All'):
+    rollup = give_hierarchy_data(canton_cube, canton_name, energy_catg, period)
+    variables = ['count', 'electrical_capacity', 'production']
+    technologies = rollup['technology'].groupby(level=utl.ENERGY_LEVELS, observed=True).sum().reset_index()
+    if len(technologies)==0:
+        return {variable: None for variable in variables}
+    return {variable: functools.partial(pltg.give_hierarchy_fig, technologies, variable) for variable in variables}
+
+#---------------------------- give_hierarchy_figs ------------------------------
+# This function returns the sunburst charts of the energy hierarchy
+def give_hierarchy_figs(canton_cube, canton_name, energy_catg, period='All'):
+    return run_jobs(give_hierarchy_jobs(canton_cube, canton_name, energy_catg, period))
+
+#---------------------------- is_mpl_figure ------------------------------
+# This function tells whether a figure is a matplotlib figure. There is
+# none before matplotlib was imported, so it is not imported here
+def is_mpl_figure(fig):
+    mpl_figure = sys.modules.get('matplotlib.figure')
+    return mpl_figure is not None and isinstance(fig, mpl_figure.Figure)
+
+#---------------------------- close_figs ------------------------------
+# This function releases the matplotlib figures of a dictionary of figures
+def close_figs(figs):
+    for fig in figs.values():
+        if is_mpl_figure(fig):
+            import matplotlib.pyplot as plt
+            plt.close(fig)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+# Geohash precisions offered by the grid maps, with the approximate size
+# of their cells in Switzerland
+GRID_PRECISIONS = {4: '~39 x 20 km', 5: '~4.9 x 4.9 km', 6: '~1.2 x 0.6 km'}
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+#---------------------------- give_geohash_codes ------------------------------
+# This function returns the geohash cells of points as integers of
+# 5 * precision bits (longitude and latitude bits interleaved, longitude
+# first). The code of a coarser cell is the code of a finer cell shifted
+# right by 5 bits per character, as a geohash is a prefix of finer ones
+def give_geohash_codes(lat, lon, precision):
+    n_bits = 5 * precision
+    lon_bits, lat_bits = (n_bits + 1) // 2, n_bits // 2
+    lon_idx = np.clip(((np.asarray(lon, dtype='float64') + 180) / 360 * 2**lon_bits).astype('int64'), 0, 2**lon_bits - 1)
+    lat_idx = np.clip(((np.asarray(lat, dtype='float64') + 90) / 180 * 2**lat_bits).astype('int64'), 0, 2**lat_bits - 1)
+    codes = np.zeros(len(lon_idx), dtype='int64')
+    for bit in range(n_bits):
+        # Bits are taken from the most significant one, even bits from the longitude
+        if bit % 2 == 0:
+            value = (lon_idx >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_idx >> (lat_bits - 1 - bit // 2)) & 1
+        codes = (codes << 1) | value
+    return codes.astype('uint32')
+
+#---------------------------- give_geohash_bounds ------------------------------
+# This function returns the bounds (min lon, min lat, max lon, max lat)
+# of geohash cells given by their integer codes
+def give_geohash_bounds(codes, precision):
+    n_bits = 5 * precision
+    lon_bits, lat_bits = (n_bits + 1) // 2, n_bits // 2
+    codes = np.asarray(codes, dtype='int64')
+    lon_idx = np.zeros(len(codes), dtype='int64')
+    lat_idx = np.zeros(len(codes), dtype='int64')
+    for bit in range(n_bits):
+        value = (codes >> (n_bits - 1 - bit)) & 1
+        if bit % 2 == 0:
+            lon_idx = (lon_idx << 1) | value
+        else:
+            lat_idx = (lat_idx << 1) | value
+    lon_size, lat_size = 360 / 2**lon_bits, 180 / 2**lat_bits
+    min_lon, min_lat = lon_idx * lon_size - 180, lat_idx * lat_size - 90
+    return min_lon, min_lat, min_lon + lon_size, min_lat + lat_size
+
+#---------------------------- give_geohash_names ------------------------------
+# This function returns the geohash strings of integer codes
+def give_geohash_names(codes, precision):
+    codes = np.asarray(codes, dtype='int64')
+    chars = [(codes >> (5 * (precision - 1 - i))) & 31 for i in range(precision)]
+    return [''.join(BASE32[c[j]] for c in chars) for j in range(len(codes))]
+
+#---------------------------- give_grid_geojson ------------------------------
+# This function returns the geojson of the rectangles of geohash cells,
+# with the geohash as the feature id
+def give_grid_geojson(codes, precision):
+    min_lon, min_lat, max_lon, max_lat = give_geohash_bounds(codes, precision)
+    features = []
+    for name, x0, y0, x1, y1 in zip(give_geohash_names(codes, precision), min_lon, min_lat, max_lon, max_lat):
+        ring = [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+        features.append({'type': 'Feature', 'id': name, 'properties': {},
+                         'geometry': {'type': 'Polygon', 'coordinates': [ring]}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+#---------------------------- give_grid_aggregates ------------------------------
+# This function returns the number of sources, the electrical capacity
+# and the production per geohash cell and energy category (with 'All')
+# at every grid precision. The raw rows are aggregated once at the finest
+# precision, the coarser ones are rolled up from it. Each precision holds
+# the cells as compact integer codes and the geojson of its cells
+def give_grid_aggregates(energy_df, precisions=tuple(GRID_PRECISIONS)):
+    finest = max(precisions)
+    located = energy_df[energy_df['lat'].notna() & energy_df['lon'].notna()]
+    cells = pd.DataFrame({
+        'cell': give_geohash_codes(located['lat'], located['lon'], finest),
+        'energy_source_level_2': located['energy_source_level_2'].astype(str).to_numpy(),
+        'count': np.ones(len(located), dtype='int32'),
+        'electrical_capacity': located['electrical_capacity'].to_numpy(),
+        'production': located['production'].to_numpy(),
+    })
+    cells = cells.groupby(['cell', 'energy_source_level_2'], as_index=False).sum()
+    totals = cells.groupby('cell', as_index=False)[['count', 'electrical_capacity', 'production']].sum()
+    cells = pd.concat([cells, totals.assign(energy_source_level_2='All')], ignore_index=True)
+    grid = {}
+    for precision in sorted(precisions, reverse=True):
+        rolled = cells.assign(cell=(cells['cell'] >> np.uint32(5 * (finest - precision))).astype('uint32'))
+        rolled = rolled.groupby(['energy_source_level_2', 'cell'], as_index=False).sum()
+        rolled['energy_source_level_2'] = rolled['energy_source_level_2'].astype('category')
+        rolled['geohash'] = pd.Categorical(give_geohash_names(rolled['cell'], precision))
+        grid[precision] = {
+            'cells': rolled,
+            'geojson': give_grid_geojson(np.unique(rolled['cell']), precision),
+        }
+        cells = rolled[['cell', 'energy_source_level_2', 'count', 'electrical_capacity', 'production']]
+        cells = cells.assign(energy_source_level_2=cells['energy_source_level_2'].astype(str))
+        finest = precision
+    return grid
+
+#---------------------------- give_grid_cells ------------------------------
+# This function returns the cells of an energy category at a precision.
+# For several energy categories the cells of each of them are summed
+def give_grid_cells(grid, energy_catg, precision):
+    cells = grid[precision]['cells']
+    if isinstance(energy_catg, str):
+        return cells[cells['energy_source_level_2'] == energy_catg]
+    cells = cells[cells['energy_source_level_2'].isin(energy_catg)]
+    return cells.groupby(['cell', 'geohash'], as_index=False, observed=True)[
+        ['count', 'electrical_capacity', 'production']].sum()
+
+#---------------------------- give_selection_cells ------------------------------
+# This function returns the number of sources, the electrical capacity
+# and the production per geohash cell at a precision of the rows of a
+# selection, for a selection the precomputed aggregates do not cover.
+# Its cells are a part of the cells of all the rows
+def give_selection_cells(df, precision):
+    located = df[df['lat'].notna() & df['lon'].notna()]
+    cells = pd.DataFrame({
+        'cell': give_geohash_codes(located['lat'], located['lon'], precision),
+        'count': np.ones(len(located), dtype='int32'),
+        'electrical_capacity': located['electrical_capacity'].to_numpy(),
+        'production': located['production'].to_numpy(),
+    })
+    cells = cells.groupby('cell', as_index=False).sum()
+    cells['geohash'] = pd.Categorical(give_geohash_names(cells['cell'], precision))
+    return cells
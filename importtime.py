@@ -0,0 +1,65 @@
+#***********************************************************************
+#    Import time of the dashboard modules                              #
+#    Run: python importtime.py [--repeat 5] [module ...]               #
+#***********************************************************************
+
+import argparse
+import subprocess
+import sys
+
+# The modules of the dashboard, 'app' stands for the modules app.py imports
+MODULES = ['app', 'utils', 'plotting', 'figures', 'snapshot', 'grid', 'sketch', 'topology']
+APP_IMPORTS = ['streamlit', 'utils', 'figures', 'snapshot', 'grid']
+# Libraries whose import time is reported separately
+HEAVY = ['streamlit', 'pandas', 'numpy', 'plotly', 'scipy', 'shapely', 'geopandas', 'matplotlib', 'seaborn']
+
+#---------------------------- give_import_times ------------------------------
+# This function imports modules in a fresh interpreter and returns the
+# import time in ms of every package, as reported by python -X importtime:
+# the cumulative time of its modules not imported by another of its modules
+# (a package imported by another package counts in both)
+def give_import_times(modules):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+                            capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or not line.split('|')[1].strip().isdigit():
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1000))
+    # A module is listed after the modules it imports, one level deeper
+    times, ancestors = {}, []
+    for depth, name, cumulative in reversed(entries):
+        ancestors = ancestors[:depth]
+        package = name.split('.')[0]
+        if all(ancestor.split('.')[0] != package for ancestor in ancestors):
+            times[package] = times.get(package, 0) + cumulative
+        ancestors.append(name)
+    return times
+
+#---------------------------- give_report ------------------------------
+# This function returns the import time of a module (best of repeat
+# runs) and of the heavy libraries it brings in
+def give_report(module, repeat):
+    imports = APP_IMPORTS if module == 'app' else [module]
+    runs = [give_import_times(imports) for _ in range(repeat)]
+    best = min(runs, key=lambda times: sum(times.get(name, 0) for name in imports))
+    total = sum(best.get(name, 0) for name in imports)
+    heavy = {name: best[name] for name in HEAVY if name in best}
+    return total, heavy
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the dashboard modules.")
+    parser.add_argument('modules', nargs='*', default=MODULES, help=f"modules to measure (default: {' '.join(MODULES)})")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per module, the best is kept (default: 5)")
+    args = parser.parse_args()
+    for module in args.modules:
+        total, heavy = give_report(module, args.repeat)
+        libraries = ', '.join(f"{name} {ms:.0f}" for name, ms in heavy.items()) or '-'
+        print(f"{module:<10} {total:7.0f} ms   loads: {libraries}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#***********************************************************************
+#    Canton check of the installations against their coordinates      #
+#    Usage: python ingest.py [--out canton_check.csv]                  #
+#***********************************************************************
+#
+#  Locates every installation in the canton polygons from its lat/lon
+#  and writes the rows whose canton is missing, can not be located or
+#  differs from the canton of the coordinates. The dashboard fills in
+#  missing cantons the same way when it loads the data.
+
+import argparse
+import time
+
+import utils as utl
+
+DATA_PATH = './data/swiss_clean_energy.csv'
+GEOJSON_PATH = './data/georef-switzerland-kanton.geojson'
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Check the canton of every installation against its coordinates.")
+    parser.add_argument('--data', default=DATA_PATH, help="csv data of the installations")
+    parser.add_argument('--geojson', default=GEOJSON_PATH, help="geojson of the canton polygons")
+    parser.add_argument('--out', default='canton_check.csv', help="csv file of the report (default: canton_check.csv)")
+    args = parser.parse_args()
+    energy_df = utl.load_compact_data(path=args.data)
+    geopd_data = utl.load_geopanda_data(args.geojson)
+    start = time.perf_counter()
+    check = utl.give_canton_check(energy_df, geopd_data)
+    elapsed = time.perf_counter() - start
+    check.rename_axis('row').to_csv(args.out)
+    print(f"Checked {len(energy_df)} installations in {elapsed:.2f} s")
+    for status, count in check['status'].value_counts().items():
+        print(f"  {status}: {count}")
+    if len(check):
+        mismatches = check[check['status'] == 'mismatch']
+        pairs = mismatches.groupby(['canton_name', 'geo_canton']).size().sort_values(ascending=False)
+        print("Most frequent mismatches (given canton -> canton of the coordinates):")
+        for (given, located), count in pairs.head(10).items():
+            print(f"  {given} -> {located}: {count}")
+    print(f"Report written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#***********************************************************************
+#    Concurrent-session load test of the dashboard                     #
+#    Usage: python loadtest.py [--sessions 1 2 4 8] [--steps 5]        #
+#***********************************************************************
+#
+#  Every simulated session runs app.py in-process with Streamlit's app
+#  test runner and then changes a random widget of one of the three tabs
+#  per step, the way a user clicks through the dashboard. The sessions of
+#  a level run concurrently in one process, sharing its caches like the
+#  sessions of a single server instance do.
+
+import argparse
+import csv
+import datetime
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from unittest.mock import MagicMock
+
+import numpy as np
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+import utils as utl
+
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+# The widgets a session interacts with, by tab: (widget type, key) and the
+# values to choose from when the widget shows them formatted or, for the
+# sliders, a few representative ones. The periods are within the
+# commissioning dates of the data (July 2004 to December 2018)
+WIDGETS = [
+    ('slider', 'slider_period', [(datetime.date(2010, 1, 1), datetime.date(2010, 12, 31)),
+                                 (datetime.date(2012, 3, 10), datetime.date(2014, 8, 20)),
+                                 (datetime.date(2016, 1, 1), datetime.date(2018, 12, 12)),
+                                 (datetime.date(2004, 7, 1), datetime.date(2018, 12, 12))]),
+    ('multiselect', 'select_energy1'),
+    ('radio', 'radio_norm', ['', '_per_capita', '_per_km2']),
+    ('multiselect', 'select_canton'),
+    ('multiselect', 'select_energy'),
+    ('select_slider', 'slider_grid', [4, 5, 6]),
+    ('multiselect', 'select_canton2'),
+    ('multiselect', 'select_energy2'),
+    ('selectbox', 'select_municipality'),
+    ('radio', 'radio_near'),
+    ('slider', 'slider_near_k', [1, 10, 50, 100]),
+    ('slider', 'slider_near_radius', [1, 5, 20, 50]),
+    ('radio', 'radio_view'),
+    ('radio', 'radio_leaderboard', utl.TOP_VARIABLES),
+    ('slider', 'slider_top_n', [5, 10, 25, 50]),
+    ('radio', 'radio_hierarchy', ['count', 'electrical_capacity', 'production']),
+    ('selectbox', 'select_level2'),
+    ('selectbox', 'select_level3'),
+    ('multiselect', 'select_canton3'),
+    ('multiselect', 'select_energy3'),
+    ('radio', 'radio_view3'),
+    ('multiselect', 'select_canton4'),
+    ('multiselect', 'select_energy4'),
+    ('radio', 'radio_animation', ['count', 'electrical_capacity', 'production']),
+    ('multiselect', 'select_compare'),
+    ('multiselect', 'select_energy5'),
+]
+
+#---------------------------- share_runtime ------------------------------
+# The app test runner installs a mock Streamlit runtime for the duration
+# of a script run and removes it at the end, under the feet of the runs of
+# the other sessions. This function gives the runs that find no runtime
+# installed a shared one, like the sessions of a server share its runtime
+def share_runtime():
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared_runtime)
+
+#---------------------------- run_session ------------------------------
+# This function simulates one session: a first page load followed by
+# a number of widget changes. It returns the duration of every script
+# run and the number of runs that raised an exception
+def run_session(steps, seed, timeout):
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    latencies = []
+    errors = 0
+    for step in range(steps + 1):
+        if step > 0:
+            # The radius slider only shows in the radius search
+            shown = [widget for widget in WIDGETS
+                     if any(element.key == widget[1] for element in getattr(at, widget[0]))]
+            kind, key, *values = rng.choice(shown)
+            widget = getattr(at, kind)(key)
+            options = values[0] if values else list(widget.options)
+            if kind == 'multiselect':
+                widget.set_value(rng.sample(options, rng.randint(0, 3)))
+            else:
+                widget.set_value(rng.choice(options))
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        errors += len(at.exception) > 0
+    return latencies, errors
+
+#---------------------------- run_level ------------------------------
+# This function runs a number of concurrent sessions and returns the
+# throughput, latency percentiles, CPU use and memory of the process
+def run_level(sessions, steps, seed, timeout):
+    cpu_start = os.times()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(run_session, [steps] * sessions,
+                                    [seed + i for i in range(sessions)], [timeout] * sessions))
+    wall = time.perf_counter() - start
+    cpu_end = os.times()
+    latencies = np.array([latency for result in results for latency in result[0]])
+    cpu = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+    return {
+        'sessions': sessions,
+        'runs': len(latencies),
+        'errors': sum(result[1] for result in results),
+        'runs_per_s': round(len(latencies) / wall, 3),
+        'p50_s': round(float(np.percentile(latencies, 50)), 3),
+        'p90_s': round(float(np.percentile(latencies, 90)), 3),
+        'p99_s': round(float(np.percentile(latencies, 99)), 3),
+        'max_s': round(float(latencies.max()), 3),
+        'cpu_cores': round(cpu / wall, 2),
+        'rss_mb': round(utl.give_rss_mb(), 1),
+        'peak_rss_mb': round(utl.give_peak_rss_mb(), 1),
+    }
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent simulated sessions.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="numbers of concurrent sessions to test (default: 1 2 4 8)")
+    parser.add_argument('--steps', type=int, default=5, help="widget changes per session (default: 5)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random widget changes")
+    parser.add_argument('--timeout', type=float, default=600, help="timeout of a script run in seconds")
+    parser.add_argument('--csv', help="also write the results to this csv file")
+    args = parser.parse_args()
+    os.chdir(APP_DIR)
+    share_runtime()
+
+    # Warm the process-wide caches so the first level is not a cold start
+    run_session(0, args.seed, args.timeout)
+    rows = []
+    for sessions in args.sessions:
+        row = run_level(sessions, args.steps, args.seed, args.timeout)
+        rows.append(row)
+        print('  '.join(f"{key}={value}" for key, value in row.items()), flush=True)
+    if args.csv:
+        with open(args.csv, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
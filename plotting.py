@@ -1,71 +1,166 @@
 import plotly.express as px
 import plotly.graph_objects as go
-import seaborn as sns
-import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
+
+import utils as utl
+
+# Labels of the variables of the canton choropleths
+choropleth_labels = {"canton_name": "Canton",
+                     "count": "Number of Sources",
+                     "electrical_capacity": "Electrical Capacity (MW)",
+                     "production": "Energy Production (MWh)",
+                     "count_per_capita": "Number of Sources per 1,000 Inhabitants",
+                     "electrical_capacity_per_capita": "Electrical Capacity (kW per Inhabitant)",
+                     "production_per_capita": "Energy Production (kWh per Inhabitant)",
+                     "count_per_km2": "Number of Sources per km²",
+                     "electrical_capacity_per_km2": "Electrical Capacity (kW per km²)",
+                     "production_per_km2": "Energy Production (MWh per km²)"}
+# Base choropleths by geometry, see give_choropleth_template
+choropleth_templates = {}
+
+#---------------------------- give_choropleth_template ------------------------------
+# This function returns the base choropleth of the cantons of a geojson
+# (or of the url of one): the figure of give_fig without values, as a
+# dict. It is built once per geometry; its geojson is frozen, so the
+# figures made from the template share it instead of copying it
+def give_choropleth_template(geo_data):
+    key = id(geo_data)
+    if key not in choropleth_templates:
+        fig = px.choropleth_map(
+            pd.DataFrame({"canton_name": pd.Series(dtype=object), "value": pd.Series(dtype=float)}),
+            color="value",
+            geojson=geo_data,
+            locations="canton_name",
+            featureidkey="properties.kan_name",
+            center={"lat": 46.8, "lon": 8.3},
+            map_style="open-street-map",
+            zoom=5.6,
+            opacity=0.5,
+            width=900,
+            height=400,
+            color_continuous_scale="viridis"
+        )
+        fig.update_layout(
+            margin={"r":0,"t":140,"l":0,"b":0},
+            #font={"family":"Sans", "color":"maroon"},
+            title={"font_size":22, "xanchor":"center", "x":0.5, "yanchor":"top"},
+            hoverlabel={"bgcolor":"white", "font_size":12, "font_family":"Sans"},
+            coloraxis_colorbar=dict(
+                title=dict(
+                    side="top",
+                    font=dict(size=15, family="Arial"),
+                ),
+                orientation="h",
+                x=0.5,            # center horizontally (0=left, 1=right)
+                y=1.0,           # place below plot
+                xanchor="center",
+                yanchor="bottom",
+                tickfont=dict(size=15, family="Arial"),
+                ticklen=5,
+                thickness=15,
+                len=1.0,
+                bgcolor="rgba(0,0,0,0)",
+                outlinewidth=0
+            )
+        )
+        template = fig.to_dict()
+        template['data'][0]['geojson'] = utl.give_frozen(geo_data)
+        # The geojson is kept with the template, so its id is not reused
+        choropleth_templates[key] = (geo_data, template)
+    return choropleth_templates[key][1]
 
 #---------------------------- give_fig ------------------------------
 # This function returns the plotly figure with cantons color coded
-# by the variable in the category of energy_catg
+# by the variable in the category of energy_catg. Only the values,
+# hover text and titles are set on the base choropleth of the geometry
 def give_fig(df, geo_data, variable, energy_catg=None):
     # Map variable names to figure titles
     figure_titles = {
         "count": f"Number of {energy_catg} Energy Sources",
         "electrical_capacity": "Electrical Capacity in MW",
-        "production": "Energy Production per year in MWh"
+        "production": "Energy Production per year in MWh",
+        "count_per_capita": f"{energy_catg} Energy Sources per 1,000 Inhabitants",
+        "electrical_capacity_per_capita": "Electrical Capacity in kW per Inhabitant",
+        "production_per_capita": "Energy Production per year in kWh per Inhabitant",
+        "count_per_km2": f"{energy_catg} Energy Sources per km²",
+        "electrical_capacity_per_km2": "Electrical Capacity in kW per km²",
+        "production_per_km2": "Energy Production per year in MWh per km²"
     }
     # Map variable names to colorbar titles
     colorbar_titles = {
         "count": "Number of Sources",
         "electrical_capacity": "MW",
-        "production": "MWh"
+        "production": "MWh",
+        "count_per_capita": "per 1,000<br>inhabitants",
+        "electrical_capacity_per_capita": "kW per<br>inhabitant",
+        "production_per_capita": "kWh per<br>inhabitant",
+        "count_per_km2": "per km²",
+        "electrical_capacity_per_km2": "kW per km²",
+        "production_per_km2": "MWh per km²"
     }
     # Pick titles based on the variable
     figure_title = figure_titles.get(variable, variable.title())
     colorbar_title = colorbar_titles.get(variable, variable.title())
-    # Create the choropleth map
+    template = give_choropleth_template(geo_data)
+    label = choropleth_labels.get(variable, variable)
+    trace = dict(template['data'][0],
+                 locations=df["canton_name"].astype(str).to_numpy(),
+                 z=df[variable].to_numpy(),
+                 hovertemplate=f"Canton=%{{location}}<br>{label}=%{{z}}<extra></extra>")
+    layout = dict(template['layout'], title=dict(template['layout']['title'], text=figure_title))
+    layout['coloraxis'] = dict(layout['coloraxis'], colorbar=dict(
+        layout['coloraxis']['colorbar'], title=dict(layout['coloraxis']['colorbar']['title'], text=colorbar_title)))
+    return go.Figure({'data': [trace], 'layout': layout}, _validate=False)
+
+#---------------------------- give_grid_fig ------------------------------
+# This function returns the plotly figure with the grid cells color coded
+# by the variable in the category of energy_catg. The color scale ends at
+# the 95th percentile, so a few large plants do not wash out the rest
+def give_grid_fig(cells, grid_geojson, variable, energy_catg=None, cell_size=None):
+    figure_titles = {
+        "count": f"Number of {energy_catg} Energy Sources",
+        "electrical_capacity": "Electrical Capacity in MW",
+        "production": "Energy Production per year in MWh"
+    }
+    colorbar_titles = {
+        "count": "Number of Sources",
+        "electrical_capacity": "MW",
+        "production": "MWh"
+    }
+    figure_title = figure_titles.get(variable, variable.title())
+    if cell_size:
+        figure_title += f"<br><span style='font-size:14px'>per cell of {cell_size}</span>"
+    upper = float(cells[variable].quantile(0.95)) if len(cells) else 1.0
     fig = px.choropleth_map(
-        df,
+        cells,
         color=variable,
-        geojson=geo_data,
-        locations="canton_name",
-        featureidkey="properties.kan_name",
+        geojson=grid_geojson,
+        locations="geohash",
+        featureidkey="id",
         center={"lat": 46.8, "lon": 8.3},
         map_style="open-street-map",
-        zoom=5.6,
-        opacity=0.5,
-        width=900,
-        height=400,
-        labels={"canton_name": "Canton",
+        zoom=6.4,
+        opacity=0.6,
+        height=600,
+        range_color=(0, max(upper, 1e-9)),
+        labels={"geohash": "Cell",
                 "count": "Number of Sources",
                 "electrical_capacity": "Electrical Capacity (MW)",
                 "production": "Energy Production (MWh)"},
+        hover_data={"count": True, "electrical_capacity": ':.2f', "production": ':.2f'},
         title=figure_title,
         color_continuous_scale="viridis"
     )
-    # Update layout: colorbar title and fonts
+    fig.update_traces(marker_line_width=0)
     fig.update_layout(
-        margin={"r":0,"t":140,"l":0,"b":0},
-        #font={"family":"Sans", "color":"maroon"},
+        margin={"r":0,"t":80,"l":0,"b":0},
         title={"font_size":22, "xanchor":"center", "x":0.5, "yanchor":"top"},
         hoverlabel={"bgcolor":"white", "font_size":12, "font_family":"Sans"},
         coloraxis_colorbar=dict(
-            title=dict(
-                text=colorbar_title,
-                side="top",
-                font=dict(size=15, family="Arial"),
-            ),
-            orientation="h",
-            x=0.5,            # center horizontally (0=left, 1=right)
-            y=1.0,           # place below plot
-            xanchor="center",
-            yanchor="bottom",
+            title=dict(text=colorbar_titles.get(variable, variable.title()), font=dict(size=15, family="Arial")),
             tickfont=dict(size=15, family="Arial"),
-            ticklen=5,
             thickness=15,
-            len=1.0,
-            bgcolor="rgba(0,0,0,0)",
-            outlinewidth=0
         )
     )
     return fig
@@ -205,6 +300,100 @@ def give_canton_fig(df,geo_data,lat_cntr,lon_cntr,zoom):
     fig_.data[0].showlegend = False
     return fig_
 
+#---------------------------- give_animated_fig ------------------------------
+# This function returns the animated map of the build-out: the cantons of
+# give_fig color coded by the variable up to the end of a year and the
+# sources commissioned until then, one frame per year. The sources of a
+# year are one trace added once, a frame only sets the values of the
+# cantons and which years are shown, so the frames carry no copy of them
+def give_animated_fig(df, years, cantons, totals, geo_data, variable, energy_catg=None):
+    energy_colors = ["#FF0000", "#218BEF", "#07FF03", "#FFF200"]
+    energy_order = ["Solar", "Hydro", "Bioenergy", "Wind"]
+    fig_ = give_fig(pd.DataFrame({"canton_name": cantons, variable: totals[0]}), geo_data, variable, energy_catg)
+    # The rows are in the order of their commissioning date, a year is a slice
+    row_years = df['commissioning_date'].dt.year.to_numpy()
+    bounds = np.searchsorted(row_years, years + [years[-1] + 1])
+    energy = pd.Categorical(df['energy_source_level_2'].astype(str), categories=energy_order).codes
+    for i, year in enumerate(years):
+        rows = slice(bounds[i], bounds[i + 1])
+        fig_.add_trace(go.Scattermap(
+            lat=df['lat'].to_numpy()[rows].astype('float64').round(4),
+            lon=df['lon'].to_numpy()[rows].astype('float64').round(4),
+            mode='markers',
+            marker=dict(size=5, color=energy[rows], cmin=0, cmax=len(energy_order) - 1, showscale=False,
+                        colorscale=[[j / (len(energy_order) - 1), color] for j, color in enumerate(energy_colors)]),
+            text=df['municipality'].astype(str).to_numpy()[rows],
+            customdata=df['electrical_capacity'].to_numpy()[rows].round(3),
+            hovertemplate="%{text}<br>Electrical Capacity (MW)=%{customdata}<extra>" + str(year) + "</extra>",
+            name=str(year),
+            showlegend=False,
+            visible=(i == 0)))
+    traces = list(range(len(years) + 1))
+    fig_.frames = [go.Frame(name=str(year), traces=traces,
+                            data=[go.Choroplethmap(z=totals[i])] + [go.Scattermap(visible=(j <= i)) for j in range(len(years))])
+                   for i, year in enumerate(years)]
+    fig_.update_layout(
+        height=650,
+        coloraxis=dict(cmin=0, cmax=max(float(totals[-1].max()), 1e-9)),
+        updatemenus=[dict(
+            type="buttons", direction="left", x=0.0, y=0.0, xanchor="left", yanchor="top", pad={"t": 10},
+            buttons=[dict(label="Play", method="animate",
+                          args=[None, dict(frame=dict(duration=700, redraw=True), fromcurrent=True, transition=dict(duration=0))]),
+                     dict(label="Pause", method="animate",
+                          args=[[None], dict(frame=dict(duration=0, redraw=False), mode="immediate")])])],
+        sliders=[dict(
+            active=0, x=0.15, y=0.0, len=0.85, xanchor="left", yanchor="top", pad={"t": 10},
+            currentvalue=dict(prefix="Commissioned until the end of ", font=dict(size=15, family="Arial")),
+            steps=[dict(label=str(year), method="animate",
+                        args=[[str(year)], dict(mode="immediate", frame=dict(duration=0, redraw=True), transition=dict(duration=0))])
+                   for year in years])]
+    )
+    return fig_
+
+#---------------------------- give_near_fig ------------------------------
+# This function returns the plotly figure with the sources found by the
+# near search around a point, zoomed to the farthest of them
+def give_near_fig(df, lat, lon, place):
+    custom_colors = ["#FF0000", "#218BEF", "#07FF03", "#FFF200"]
+    max_dist = max(df['distance_km'].max() if len(df) else 0.0, 0.5)
+    fig_ = px.scatter_map(df,
+                        lat='lat',
+                        lon='lon',
+                        color='energy_source_level_2',
+                        map_style="open-street-map",
+                        hover_name='municipality',
+                        labels={'energy_source_level_2': 'Energy Type',
+                            'company': 'Company',
+                            'address': 'Address',
+                            'distance_km': 'Distance (km)',
+                            "electrical_capacity": "Electrical Capacity (MW)",
+                            "production": "Energy Production (MWh)"},
+                        hover_data={
+                            'energy_source_level_2': True,
+                            'lat': False,      # hide lat
+                            'lon': False,      # hide lon
+                            'company': True,
+                            'address': True,
+                            'distance_km': ':.2f',
+                            'electrical_capacity': ':.2f',  # format number
+                            'production': ':.2f'    # format number
+                        },
+                        center={"lat": lat, "lon": lon},
+                        zoom=float(np.clip(np.log2(20000 / max_dist) - 1.5, 5, 14)),
+                        color_discrete_sequence=custom_colors,
+                        category_orders={"energy_source_level_2": ["Solar", "Hydro", "Bioenergy", "Wind"]},
+                        opacity=1)
+    fig_.add_trace(go.Scattermap(lat=[lat], lon=[lon], mode='markers', name=place,
+                                 marker=dict(size=14, color='black'), hoverinfo='name'))
+    fig_.update_layout(
+                        hoverlabel={"bgcolor":"white", "font_size":12, "font_family":"Sans"},
+                        height=500,
+                        margin=dict(l=0, r=0, t=0, b=0),
+                        hovermode='closest',
+                        legend_title_text='Energy Type'
+    )
+    return fig_
+
 #---------------------------- give_bar_fig ------------------------------
 # This function returns the plotly figure with a colorcoded barplot 
 def give_bar_fig(sources_per_canton_sorted, yvar, cvar, yax, cax):
@@ -322,13 +511,19 @@ def give_pie_fig(df, variable):
 #---------------------------- give_pie_fig ------------------------------
 # This function returns the plotly figure for piechart with doughnut shape
 def give_pie_fig2(df, variable):
+    df_plot = df.groupby("energy_source_level_2", observed=True)[variable].sum().reset_index()
+    return give_energy_pie_fig(df_plot, variable)
+
+#---------------------------- give_energy_pie_fig ------------------------------
+# This function returns the plotly figure for pie chart of a variable
+# already summed per energy type
+def give_energy_pie_fig(df_plot, variable):
     figure_titles = {
     "electrical_capacity": "Electrical Capacity",
         "production": "Energy Production per year"
     }
     figure_title = figure_titles.get(variable, variable.title())
 
-    df_plot = df.groupby("energy_source_level_2")[variable].sum().reset_index()
     # Desired order (important!)
     #desired_order = ["Solar", "Hydro", "Bioenergy", "Wind"]
     # Custom colors
@@ -357,9 +552,9 @@ def give_pie_fig2(df, variable):
         ]
     )
     if variable == 'electrical_capacity':
-        text_t=f"<b>Total<br>{df[variable].sum():,.0f}</b><br>MW"
+        text_t=f"<b>Total<br>{df_plot[variable].sum():,.0f}</b><br>MW"
     else:
-        text_t=f"<b>Total<br>{df[variable].sum():,.0f}</b><br>MWh"
+        text_t=f"<b>Total<br>{df_plot[variable].sum():,.0f}</b><br>MWh"
     
     # Add center text
     fig.update_layout(
@@ -390,9 +585,15 @@ def give_pie_fig2(df, variable):
 # This function returns the plotly figure for bar plot
 def give_bar_fig2(df_org, variable):
     if variable == 'Number of Sources':
-        df = df_org.groupby('energy_source_level_2').size().reset_index(name='Number of Sources')
+        df = df_org.groupby('energy_source_level_2', observed=True).size().reset_index(name='Number of Sources')
     else:
-        df = df_org.groupby('energy_source_level_2')[variable].sum.reset_index(name=variable)
+        df = df_org.groupby('energy_source_level_2', observed=True)[variable].sum().reset_index(name=variable)
+    return give_energy_bar_fig(df, variable)
+
+#---------------------------- give_energy_bar_fig ------------------------------
+# This function returns the plotly figure for bar plot of a variable
+# already counted per energy type
+def give_energy_bar_fig(df, variable):
     ymaximum = df[variable].max()
     ymaximum = ymaximum + (0.25 * ymaximum)
     fig_ = px.bar(
@@ -436,12 +637,121 @@ def give_bar_fig2(df_org, variable):
     )
     return fig_
 
+#---------------------------- give_compare_bar_fig ------------------------------
+# This function returns the plotly figure for bar plot of a variable of
+# the compared cantons
+def give_compare_bar_fig(totals, variable):
+    figure_titles = {
+        "count": "Number of Sources",
+        "electrical_capacity": "Electrical Capacity (in MW)",
+        "production": "Production (in MWh)"
+    }
+    fig_ = px.bar(
+        totals,
+        x='canton_name',
+        y=variable,
+        text=variable,
+        color='canton_name',
+        color_discrete_sequence=px.colors.qualitative.Safe,
+        labels={"canton_name": "Canton", variable: figure_titles.get(variable, variable)},
+    )
+    fig_.update_traces(textposition='outside', texttemplate="%{text:,.0f}", textfont_size=14)
+    fig_.update_xaxes(tickfont=dict(size=14))
+    fig_.update_yaxes(tickfont=dict(size=14), range=[0, 1.25 * max(float(totals[variable].max()), 1e-9)])
+    fig_.update_layout(
+        title=dict(
+            text=figure_titles.get(variable, variable),
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            y=0.95,
+            font=dict(size=16, color='black', family="Arial")
+        ),
+        xaxis_title="",
+        yaxis_title="",
+        height=350,
+        margin=dict(l=20, r=20, t=40, b=20),
+        showlegend=False
+    )
+    return fig_
+
+#---------------------------- give_compare_time_fig ------------------------------
+# This function returns the plotly figure for the cumulative growth of a
+# variable of the compared cantons, one line per canton
+def give_compare_time_fig(growth, variable):
+    axis_titles = {
+        "count": "Total Number of Sources",
+        "electrical_capacity": "Total Electrical Capacity (MW)",
+        "production": "Total Production (MWh)"
+    }
+    fig_ = go.Figure()
+    for i, canton_name in enumerate(growth.columns):
+        fig_.add_trace(go.Scatter(
+            x=list(growth.index),
+            y=growth[canton_name].to_numpy(),
+            mode='lines+markers',
+            name=canton_name,
+            line=dict(width=2, color=px.colors.qualitative.Safe[i % len(px.colors.qualitative.Safe)]),
+        ))
+    fig_.update_layout(
+        xaxis_title="Year",
+        yaxis_title=axis_titles.get(variable, variable),
+        plot_bgcolor="#dce7f4",
+        height=350,
+        margin=dict(l=20, r=20, t=30, b=20),
+        legend=dict(x=0.01, y=0.99, xanchor='left', yanchor='top')
+    )
+    return fig_
+
+#---------------------------- give_hierarchy_fig ------------------------------
+# This function returns the plotly sunburst chart of a variable over the
+# energy hierarchy: energy category, subcategory and technology. A click
+# on a category drills down into it
+def give_hierarchy_fig(df, variable):
+    figure_titles = {
+        "count": "Number of Sources",
+        "electrical_capacity": "Electrical Capacity (in MW)",
+        "production": "Production (in MWh)"
+    }
+    color_map = {
+        "Solar": "#FF0000",
+        "Hydro": "#218BEF",
+        "Bioenergy": "#07FF03",
+        "Wind": "#FFF200"
+    }
+    df = df.astype({col: str for col in utl.ENERGY_LEVELS})
+    fig_ = px.sunburst(
+        df,
+        path=utl.ENERGY_LEVELS,
+        values=variable,
+        color='energy_source_level_2',
+        color_discrete_map=color_map,
+        branchvalues='total',
+    )
+    fig_.update_traces(
+        hovertemplate=f"%{{label}}<br>{figure_titles.get(variable, variable)}=%{{value:,.2f}}<br>%{{percentRoot:.1%}} of the total<extra></extra>",
+        insidetextorientation='radial'
+    )
+    fig_.update_layout(
+        title=dict(
+            text=figure_titles.get(variable, variable),
+            x=0.5,
+            xanchor='center',
+            font=dict(size=16, color='black', family="Arial")
+        ),
+        height=450,
+        margin=dict(l=10, r=10, t=40, b=10)
+    )
+    return fig_
+
 #---------------------------- give_violin_fig ------------------------------
-# This function returns the plotly figure for violin plot
-def give_violin_fig(cl_en, variable, height, titl, zoom):
+# This function returns the plotly figure for violin plot. The quartiles
+# of the outlier fences are taken from the rows when they are not given
+def give_violin_fig(cl_en, variable, height, titl, zoom, quartiles=None):
     if zoom == 'Yes':
-        Q1 = cl_en[variable].quantile(0.25)
-        Q3 = cl_en[variable].quantile(0.75)
+        if quartiles is None:
+            quartiles = cl_en[variable].quantile([0.25, 0.75]).tolist()
+        Q1, Q3 = quartiles
         IQR = Q3 - Q1
         UF = Q3 + 1.5 * IQR
         LF = Q1 - 1.5 * IQR
@@ -487,6 +797,7 @@ def give_violin_fig(cl_en, variable, height, titl, zoom):
 #---------------------------- give_sns ------------------------------
 # This function returns seaborn histogram axes
 def give_sns(df,ax,col,bin_size,lab):
+    import seaborn as sns
     sns.histplot(data=df,
                  x="ratio",
                  color=col,
@@ -499,17 +810,23 @@ def give_sns(df,ax,col,bin_size,lab):
                  ax=ax)
 
 #---------------------------- give_hist_fig ------------------------------
-# This function returns histogram plots with seaborn and matplotlib
-def give_hist_fig(df):
+# This function returns histogram plots with seaborn and matplotlib. The
+# median ratios per energy type are taken from the rows when not given
+def give_hist_fig(df, medians=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     df_clean = df.dropna(subset=["ratio"])
     df_plot1=df_clean[df_clean['energy_source_level_2']=='Solar']
     df_plot2=df_clean[df_clean['energy_source_level_2']=='Hydro']
     df_plot3=df_clean[df_clean['energy_source_level_2']=='Bioenergy']
     df_plot4=df_clean[df_clean['energy_source_level_2']=='Wind']
-    median_solar = df_plot1["ratio"].median()
-    median_hydro = df_plot2["ratio"].median()
-    median_bio = df_plot3["ratio"].median()
-    median_wind = df_plot4["ratio"].median()
+    if medians is None:
+        medians = {energy: df_plot["ratio"].median() for energy, df_plot in
+                   zip(['Solar', 'Hydro', 'Bioenergy', 'Wind'], [df_plot1, df_plot2, df_plot3, df_plot4])}
+    median_solar = medians['Solar']
+    median_hydro = medians['Hydro']
+    median_bio = medians['Bioenergy']
+    median_wind = medians['Wind']
     sns.set_style("darkgrid", {"axes.facecolor": "0.9"})
     plt.rcParams['axes.facecolor'] = "#dce7f4ff"
 
@@ -543,19 +860,23 @@ def give_hist_fig(df):
     return fig
 
 #---------------------------- give_scatter_fig ------------------------------
-# This function returns scatter plots with seaborn and matplotlib
-def give_scatter_fig(df,df1,en_cat,zoom):
+# This function returns scatter plots with seaborn and matplotlib. The
+# quartiles of the outlier fences and the median ratios per energy type
+# are taken from the rows when they are not given
+def give_scatter_fig(df,df1,en_cat,zoom,quartiles=None,medians=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     df_ = df.dropna(subset=["ratio"])
     df_clean1 = df1.dropna(subset=["ratio"])
 
     if zoom == 'Yes':
-        Q1 = df_["production"].quantile(0.25)
-        Q3 = df_["production"].quantile(0.75)
+        if quartiles is None:
+            quartiles = {variable: df_[variable].quantile([0.25, 0.75]).tolist() for variable in ['production', 'electrical_capacity']}
+        Q1, Q3 = quartiles['production']
         IQR = Q3 - Q1
         UF = Q3 + 1.5 * IQR
         LF = Q1 - 1.5 * IQR
-        EQ1 = df_["electrical_capacity"].quantile(0.25)
-        EQ3 = df_["electrical_capacity"].quantile(0.75)
+        EQ1, EQ3 = quartiles['electrical_capacity']
         EIQR = EQ3 - EQ1
         EUF = EQ3 + 1.5 * EIQR
         ELF = EQ1 - 1.5 * EIQR
@@ -567,15 +888,18 @@ def give_scatter_fig(df,df1,en_cat,zoom):
     df_plot2=df_clean[df_clean['energy_source_level_2']=='Hydro']
     df_plot3=df_clean[df_clean['energy_source_level_2']=='Bioenergy']
     df_plot4=df_clean[df_clean['energy_source_level_2']=='Wind']
-    median_solar = df_clean1[df_clean1['energy_source_level_2']=='Solar']["ratio"].median()
-    median_hydro = df_clean1[df_clean1['energy_source_level_2']=='Hydro']["ratio"].median()
-    median_bio = df_clean1[df_clean1['energy_source_level_2']=='Bioenergy']["ratio"].median()
-    median_wind = df_clean1[df_clean1['energy_source_level_2']=='Wind']["ratio"].median()
+    if medians is None:
+        medians = {energy: df_clean1[df_clean1['energy_source_level_2']==energy]["ratio"].median()
+                   for energy in ['Solar', 'Hydro', 'Bioenergy', 'Wind']}
+    median_solar = medians['Solar']
+    median_hydro = medians['Hydro']
+    median_bio = medians['Bioenergy']
+    median_wind = medians['Wind']
     sns.set_style("darkgrid", {"axes.facecolor": "0.9"})
     plt.rcParams['axes.facecolor'] = "#dce7f4ff"
 
     fig, ax = plt.subplots(figsize=(5, 5))
-    if (en_cat=="All")or(en_cat=="Solar"):
+    if utl.is_selected("Solar", en_cat):
         sns.scatterplot(data=df_plot1,
                         x="electrical_capacity", 
                         y="production",
@@ -584,7 +908,7 @@ def give_scatter_fig(df,df1,en_cat,zoom):
                         color="#E20202",
                         legend='auto')
         ax.axline((0, 0), slope=median_solar, color="#F6A3A3", alpha=1.0, linestyle='--', linewidth=1.2)
-    if (en_cat=="All")or(en_cat=="Hydro"):
+    if utl.is_selected("Hydro", en_cat):
         sns.scatterplot(data=df_plot2,
                         x="electrical_capacity", 
                         y="production",
@@ -592,7 +916,7 @@ def give_scatter_fig(df,df1,en_cat,zoom):
                         size=10,
                         color="#1F75C6")
         ax.axline((0, 0), slope=median_hydro, color="#80A8CD", alpha=1.0, linestyle='--', linewidth=1.2)
-    if (en_cat=="All")or(en_cat=="Bioenergy"):
+    if utl.is_selected("Bioenergy", en_cat):
         sns.scatterplot(data=df_plot3,
                         x="electrical_capacity", 
                         y="production",
@@ -600,7 +924,7 @@ def give_scatter_fig(df,df1,en_cat,zoom):
                         size=10,
                         color="#07BA04")
         ax.axline((0, 0), slope=median_bio, color="#85C384", alpha=1.0, linestyle='--', linewidth=1.2)
-    if (en_cat=="All")or(en_cat=="Wind"):
+    if utl.is_selected("Wind", en_cat):
         sns.scatterplot(data=df_plot4,
                         x="electrical_capacity", 
                         y="production",
@@ -621,16 +945,8 @@ def give_scatter_fig(df,df1,en_cat,zoom):
     
     ax.legend()
     handles, labels  =  ax.get_legend_handles_labels()
-    if en_cat=="All":
-        ax.legend(handles, ['Solar', 'Hydro', 'Bioenergy', 'Wind'], prop = {"size": 8}, loc='upper left')
-    elif en_cat=="Solar":
-        ax.legend(handles, ['Solar'], prop = {"size": 8}, loc='upper left')
-    elif en_cat=="Hydro":
-        ax.legend(handles, ['Hydro'], prop = {"size": 8}, loc='upper left')
-    elif en_cat=="Bioenergy":
-        ax.legend(handles, ['Bioenergy'], prop = {"size": 8}, loc='upper left')
-    elif en_cat=="Wind":
-        ax.legend(handles, ['Wind'], prop = {"size": 8}, loc='upper left')
+    labels = [x for x in ['Solar', 'Hydro', 'Bioenergy', 'Wind'] if utl.is_selected(x, en_cat)]
+    ax.legend(handles, labels, prop = {"size": 8}, loc='upper left')
     # for text in ax.legend().get_texts():
     #     text.set_fontsize(7)
     #     text.set_family("Arial")
@@ -638,11 +954,11 @@ def give_scatter_fig(df,df1,en_cat,zoom):
     #plt.setp(leg.get_title(), fontsize=16, family="Arial", fontweight="bold")
     return fig
 
-#---------------------------- give_scatter_fig ------------------------------
-# This function returns line plots with matplotlib
+#---------------------------- give_time_fig ------------------------------
+# This function returns line plots with matplotlib. The rows are in the
+# order of their commissioning date, which is already parsed
 def give_time_fig(df,variable,en_cat):
-    time_ = pd.to_datetime(df.commissioning_date)
-    df['commissioning_date']=time_.sort_values(ascending=True)
+    import matplotlib.pyplot as plt
     df1=df[df['energy_source_level_2']=='Solar']
     df2=df[df['energy_source_level_2']=='Hydro']
     df3=df[df['energy_source_level_2']=='Bioenergy']
@@ -658,13 +974,13 @@ def give_time_fig(df,variable,en_cat):
     if en_cat=='All':
         #sns.lineplot(data=df, x='commissioning_date', y='cumsum',ax=ax)
         ax.plot(df['commissioning_date'],df['cumsum'],color="#000000", alpha=1.0, linestyle='-', linewidth=1.5)
-    if (en_cat=="All")or(en_cat=="Solar"):
+    if utl.is_selected("Solar", en_cat):
         ax.plot(df1['commissioning_date'],df1['cumsum'],color="#E20202", alpha=1.0, linestyle='-', linewidth=1.5)
-    if (en_cat=="All")or(en_cat=="Hydro"):
+    if utl.is_selected("Hydro", en_cat):
         ax.plot(df2['commissioning_date'],df2['cumsum'],color="#1F75C6", alpha=1.0, linestyle='-', linewidth=1.5)
-    if (en_cat=="All")or(en_cat=="Bioenergy"):
+    if utl.is_selected("Bioenergy", en_cat):
         ax.plot(df3['commissioning_date'],df3['cumsum'],color="#07BA04", alpha=1.0, linestyle='-', linewidth=1.5)
-    if (en_cat=="All")or(en_cat=="Wind"):
+    if utl.is_selected("Wind", en_cat):
         ax.plot(df4['commissioning_date'],df4['cumsum'],color="#E7AB06", alpha=1.0, linestyle='-', linewidth=1.5)
     
     plt.xlabel("Year",
@@ -686,14 +1002,9 @@ def give_time_fig(df,variable,en_cat):
     #handles, labels  =  ax.get_legend_handles_labels()
     if en_cat=="All":
         plt.legend(['All', 'Solar', 'Hydro', 'Bioenergy', 'Wind'], prop = {"size": 10}, loc='upper left')
-    elif en_cat=="Solar":
-        ax.legend(['Solar'], prop = {"size": 10}, loc='upper left')
-    elif en_cat=="Hydro":
-        ax.legend(['Hydro'], prop = {"size": 10}, loc='upper left')
-    elif en_cat=="Bioenergy":
-        ax.legend(['Bioenergy'], prop = {"size": 10}, loc='upper left')
-    elif en_cat=="Wind":
-        ax.legend(['Wind'], prop = {"size": 10}, loc='upper left')
+    else:
+        labels = [x for x in ['Solar', 'Hydro', 'Bioenergy', 'Wind'] if utl.is_selected(x, en_cat)]
+        ax.legend(labels, prop = {"size": 10}, loc='upper left')
     return fig
 #------------------------------------------------------------------------------------------------------------------------------------------
 
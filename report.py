@@ -0,0 +1,194 @@
+#***********************************************************************
+#    Static reports for all cantons and energy categories              #
+#    Usage: python report.py [--out reports] [--png] [--force]         #
+#***********************************************************************
+
+import argparse
+import html
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import utils as utl
+import figures as figs_
+import snapshot as snp
+
+DATA_PATH, GEOJSON_PATH = snp.DATA_PATHS
+# The figures depend on the sources of the snapshots (see snapshot.CODE_FILES) and this
+# script, and on the data files; a change in one of them renders everything again
+CODE_FILES = snp.CODE_FILES + ['report.py']
+
+# Data of the worker process, loaded once by init_worker
+_data = {}
+
+#---------------------------- give_jobs ------------------------------
+# This function returns one job per report page: an overview page per
+# energy category and a page per canton and energy category. Every job
+# carries the fingerprint of the rows its figures are made of
+def give_jobs(energy_df, inputs_hash, formats):
+    energy_catags = figs_.give_energy_catags(energy_df)
+    canton_names = figs_.give_canton_names(energy_df)
+    ratio = energy_df["production"]/energy_df["electrical_capacity"]
+    medians = ratio.groupby(energy_df["energy_source_level_2"], observed=True).median().round(6).to_json()
+    common = inputs_hash + ','.join(formats)
+    jobs = []
+    for energy_catg in energy_catags:
+        rows = utl.give_selection(energy_df, 'All', energy_catg)
+        jobs.append({
+            'kind': 'overview',
+            'canton_name': 'All',
+            'energy_catg': energy_catg,
+            'fingerprint': common + utl.give_fingerprint(rows),
+        })
+    for canton_name in canton_names:
+        rows = utl.give_fingerprint(utl.give_selection(energy_df, canton_name, 'All'))
+        for energy_catg in energy_catags:
+            jobs.append({
+                'kind': 'selection',
+                'canton_name': canton_name,
+                'energy_catg': energy_catg,
+                'fingerprint': common + rows + medians,
+            })
+    for job in jobs:
+        job['id'] = f"{job['kind']}/{utl.give_slug(job['canton_name'])}/{utl.give_slug(job['energy_catg'])}"
+    return jobs
+
+#---------------------------- init_worker ------------------------------
+# This function loads the data once in every worker process
+def init_worker(data_path, geojson_path):
+    _data['energy_df'] = utl.load_checked_data(data_path, geojson_path)
+    _data['geojsn_data'] = utl.load_geojsn_data(geojson_path)
+    geopd_data = utl.load_geopanda_data(geojson_path)
+    _data['canton_bounds'] = utl.give_canton_bounds(geopd_data)
+    _data['canton_metrics'] = utl.give_canton_metrics(geopd_data)
+
+#---------------------------- give_job_figs ------------------------------
+# This function returns the named figures of a job
+def give_job_figs(job):
+    energy_df = _data['energy_df']
+    canton_name = job['canton_name']
+    energy_catg = job['energy_catg']
+    if job['kind'] == 'overview':
+        figs = figs_.give_overview_figs(energy_df, _data['geojsn_data'], _data['canton_metrics'], energy_catg)
+        if energy_catg == 'All':
+            figs.update(figs_.give_hist_figs(energy_df))
+        return figs
+    figs = {}
+    location = figs_.give_location_figs(energy_df, _data['geojsn_data'], _data['canton_bounds'], canton_name, energy_catg)
+    for name, fig in location.items():
+        figs['location_' + name] = fig
+    distribution = figs_.give_distribution_figs(energy_df, canton_name, energy_catg, 'No')
+    for name, fig in distribution.items():
+        if isinstance(name, tuple):
+            name = '_'.join([name[0], utl.give_slug(name[1])])
+        figs['violin_' + name] = fig
+    efficiency = figs_.give_efficiency_figs(energy_df, canton_name, energy_catg, 'No')
+    figs['efficiency_scatter'] = efficiency['scatter']
+    growth = figs_.give_growth_figs(energy_df, canton_name, energy_catg)
+    for name, fig in growth.items():
+        figs['growth_' + name] = fig
+    return figs
+
+#---------------------------- render_job ------------------------------
+# This function renders the figures of a job to HTML (Plotly) and
+# PNG (matplotlib, and Plotly with --png) and returns the written files
+def render_job(job, out_dir, formats):
+    job_dir = os.path.join(out_dir, job['id'])
+    os.makedirs(job_dir, exist_ok=True)
+    figs = give_job_figs(job)
+    files = []
+    for name, fig in figs.items():
+        if fig is None:
+            continue
+        path = os.path.join(job_dir, name)
+        if isinstance(fig, plt.Figure):
+            fig.savefig(path + '.png', dpi=120, bbox_inches='tight')
+            files.append(path + '.png')
+            continue
+        if 'html' in formats:
+            fig.write_html(path + '.html', include_plotlyjs='cdn')
+            files.append(path + '.html')
+        if 'png' in formats:
+            fig.write_image(path + '.png')
+            files.append(path + '.png')
+    figs_.close_figs(figs)
+    return job['id'], [os.path.relpath(file, out_dir) for file in files]
+
+#---------------------------- write_index ------------------------------
+# This function writes the index page linking all reports
+def write_index(out_dir, jobs, manifest):
+    lines = ["<!DOCTYPE html>", "<html><head><meta charset='utf-8'>",
+             "<title>Clean Renewable Energy in Switzerland - Reports</title></head><body>",
+             "<h1>Clean Renewable Energy in Switzerland (commissioned between 2004-2018)</h1>"]
+    kind = None
+    for job in jobs:
+        if job['kind'] != kind:
+            kind = job['kind']
+            title = 'Overview per Energy Category' if kind == 'overview' else 'Cantons and Energy Categories'
+            lines.append(f"<h2>{title}</h2>")
+        label = html.escape(f"{job['canton_name']} - {job['energy_catg']}")
+        links = ', '.join(
+            f"<a href='{html.escape(file)}'>{html.escape(os.path.splitext(os.path.basename(file))[0])}</a>"
+            for file in manifest[job['id']]['files']
+        )
+        lines.append(f"<p><b>{label}</b>: {links}</p>")
+    lines.append("</body></html>")
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as index:
+        index.write('\n'.join(lines))
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Render the dashboard figures of all cantons and energy categories.")
+    parser.add_argument('--out', default='reports', help="output directory (default: reports)")
+    parser.add_argument('--png', action='store_true', help="also export the Plotly figures to PNG (needs kaleido)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes (default: one per core)")
+    parser.add_argument('--force', action='store_true', help="render unchanged combinations again")
+    args = parser.parse_args()
+    formats = ['html', 'png'] if args.png else ['html']
+    if args.png:
+        if importlib.util.find_spec('kaleido') is None:
+            parser.error("PNG export of the Plotly figures needs the kaleido package")
+
+    start = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path) and not args.force:
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    energy_df = utl.load_checked_data(DATA_PATH, GEOJSON_PATH)
+    inputs_hash = utl.give_files_hash(CODE_FILES) + utl.give_files_version(snp.DATA_PATHS)
+    jobs = give_jobs(energy_df, inputs_hash, formats)
+    todo = []
+    for job in jobs:
+        done = manifest.get(job['id'])
+        if (done and done['fingerprint'] == job['fingerprint']
+                and all(os.path.exists(os.path.join(args.out, file)) for file in done['files'])):
+            continue
+        todo.append(job)
+    print(f"{len(jobs) - len(todo)} of {len(jobs)} reports unchanged, rendering {len(todo)} with {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(DATA_PATH, GEOJSON_PATH)) as executor:
+        futures = {executor.submit(render_job, job, args.out, formats): job for job in todo}
+        for future in as_completed(futures):
+            job = futures[future]
+            job_id, files = future.result()
+            manifest[job_id] = {'fingerprint': job['fingerprint'], 'files': files}
+            # Save after every job so an interrupted run resumes where it stopped
+            with open(manifest_path, 'w') as file:
+                json.dump(manifest, file, indent=1)
+
+    write_index(args.out, jobs, manifest)
+    print(f"Done in {time.perf_counter() - start:.1f} s, index at {os.path.join(args.out, 'index.html')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import types
+
+import numpy as np
+import pandas as pd
+
+# Relative accuracy of the quantiles read from the sketches: a quantile is
+# within 1% of a value of the data of that rank
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Smallest magnitude kept apart, smaller values count as 0. There is no
+# largest one: the keys are not bounded, so the accuracy holds for any value
+MIN_VALUE = 1e-4
+# The variables sketched per canton and energy category
+SKETCH_VARIABLES = ['ratio', 'production', 'electrical_capacity']
+
+#---------------------------- give_sketch_keys ------------------------------
+# This function returns the keys of values in a sketch: the values of
+# magnitude in (MIN_VALUE * GAMMA**(k-1), MIN_VALUE * GAMMA**k] have the
+# key k, -k for negative values and 0 for values close to 0, so the keys
+# are in the order of the values
+def give_sketch_keys(values):
+    values = np.asarray(values, dtype='float64')
+    magnitude = np.maximum(np.abs(values), MIN_VALUE)
+    keys = np.maximum(np.ceil(np.log(magnitude / MIN_VALUE) / np.log(GAMMA)), 1).astype('int64')
+    return np.where(np.abs(values) <= MIN_VALUE, 0, np.sign(values).astype('int64') * keys)
+
+#---------------------------- give_key_values ------------------------------
+# This function returns the value standing for every key of a sketch,
+# within RELATIVE_ACCURACY of the values counted with it
+def give_key_values(keys):
+    keys = np.asarray(keys, dtype='int64')
+    values = MIN_VALUE * 2 * GAMMA**np.abs(keys) / (GAMMA + 1)
+    return np.where(keys == 0, 0.0, np.sign(keys) * values)
+
+#---------------------------- give_merged_store ------------------------------
+# This function returns the store of a sketch cell with the counts of
+# other stores added. A store is the key of its first count and the
+# counts of the keys from there to its last non-empty key (as DDSketch
+# stores them), so it only spans the values of its cell
+def give_merged_store(stores):
+    stores = [(offset, counts) for offset, counts in stores if len(counts)]
+    if not stores:
+        return (0, np.zeros(0, dtype='int32'))
+    start = min(offset for offset, _ in stores)
+    end = max(offset + len(counts) for offset, counts in stores)
+    merged = np.zeros(end - start, dtype='int32')
+    for offset, counts in stores:
+        merged[offset - start:offset - start + len(counts)] += counts
+    return (start, merged)
+
+#---------------------------- give_store ------------------------------
+# This function returns the store of the counts of keys
+def give_store(keys):
+    if len(keys) == 0:
+        return (0, np.zeros(0, dtype='int32'))
+    start = int(keys.min())
+    return (start, np.bincount(keys - start).astype('int32'))
+
+#---------------------------- give_empty_sketches ------------------------------
+# This function returns sketches without values: for every variable, the
+# stores of its cells by canton and energy category
+def give_empty_sketches(cantons=(), energies=()):
+    sketches = {'cantons': list(cantons), 'energies': list(energies)}
+    for variable in SKETCH_VARIABLES:
+        sketches[variable] = {}
+    return sketches
+
+#---------------------------- update_sketches ------------------------------
+# This function adds the values of new rows to the sketches, with new
+# cantons and energy categories added as they are found. The counts are
+# only added to, so the sketches of a dataset can be kept up to date with
+# the rows appended to it instead of being built again
+def update_sketches(sketches, df):
+    df = df[df['canton_name'].notna() & df['energy_source_level_2'].notna()]
+    cantons = df['canton_name'].astype(str).to_numpy()
+    energies = df['energy_source_level_2'].astype(str).to_numpy()
+    sketches['cantons'] += [name for name in dict.fromkeys(cantons) if name not in sketches['cantons']]
+    sketches['energies'] += [name for name in dict.fromkeys(energies) if name not in sketches['energies']]
+    columns = {
+        'ratio': df['production'].to_numpy() / df['electrical_capacity'].to_numpy(),
+        'production': df['production'].to_numpy(),
+        'electrical_capacity': df['electrical_capacity'].to_numpy(),
+    }
+    cells = pd.DataFrame({'canton': cantons, 'energy': energies}).groupby(['canton', 'energy']).indices
+    for variable in SKETCH_VARIABLES:
+        values = np.asarray(columns[variable], dtype='float64')
+        stores = sketches[variable]
+        for cell, rows in cells.items():
+            cell_values = values[rows]
+            keys = give_sketch_keys(cell_values[np.isfinite(cell_values)])
+            if len(keys):
+                stores[cell] = give_merged_store([stores.get(cell, (0, [])), give_store(keys)])
+    return sketches
+
+#---------------------------- build_sketches ------------------------------
+# This function returns the quantile sketches of the production to
+# capacity ratio, the production and the capacity per canton and energy
+# category of the rows
+def build_sketches(df):
+    cantons = sorted(df['canton_name'].dropna().astype(str).unique())
+    energies = sorted(df['energy_source_level_2'].dropna().astype(str).unique())
+    return update_sketches(give_empty_sketches(cantons, energies), df)
+
+#---------------------------- give_frozen_sketches ------------------------------
+# This function returns sketches whose counts cannot be changed, to be
+# shared by the sessions
+def give_frozen_sketches(sketches):
+    frozen = dict(sketches)
+    for variable in SKETCH_VARIABLES:
+        stores = {}
+        for cell, (offset, counts) in sketches[variable].items():
+            counts = counts.copy()
+            counts.setflags(write=False)
+            stores[cell] = (offset, counts)
+        frozen[variable] = types.MappingProxyType(stores)
+    return frozen
+
+#---------------------------- give_merged_counts ------------------------------
+# This function returns the store of a variable for the union of the
+# selected cantons and energy categories (a value, a tuple of values or
+# 'All'). Sketches are merged by adding their counts
+def give_merged_counts(sketches, variable, canton_name, energy_catg):
+    selected = [None if value == 'All' else ({value} if isinstance(value, str) else set(value))
+                for value in (canton_name, energy_catg)]
+    return give_merged_store([store for (canton, energy), store in sketches[variable].items()
+                              if (selected[0] is None or canton in selected[0])
+                              and (selected[1] is None or energy in selected[1])])
+
+#---------------------------- give_quantiles ------------------------------
+# This function returns quantiles of a store (NaN when there are no
+# values), interpolated between the values of the two nearest ranks as
+# pandas does
+def give_quantiles(store, quantiles):
+    offset, counts = store
+    cumulative = np.cumsum(counts)
+    if len(cumulative)==0 or cumulative[-1]==0:
+        return [np.nan for _ in quantiles]
+    ranks = np.asarray(quantiles, dtype='float64') * (cumulative[-1] - 1)
+    lower = give_key_values(offset + np.searchsorted(cumulative, np.floor(ranks), side='right'))
+    upper = give_key_values(offset + np.searchsorted(cumulative, np.ceil(ranks), side='right'))
+    return [float(x) for x in lower + (upper - lower) * (ranks - np.floor(ranks))]
+
+#---------------------------- give_sketch_quantiles ------------------------------
+# This function returns approximate quantiles of a variable for the union
+# of the selected cantons and energy categories
+def give_sketch_quantiles(sketches, variable, canton_name, energy_catg, quantiles):
+    return give_quantiles(give_merged_counts(sketches, variable, canton_name, energy_catg), quantiles)
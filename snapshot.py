@@ -0,0 +1,322 @@
+#***********************************************************************
+#    Pre-rendered snapshots of every filter combination                #
+#    Build: python snapshot.py [--cache cache] [--workers N]           #
+#***********************************************************************
+
+import argparse
+import atexit
+import functools
+import hashlib
+import io
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import plotly.graph_objects as go
+
+import utils as utl
+import figures as figs_
+import grid as grd
+
+CACHE_DIR = './cache'
+DATA_PATHS = ['./data/swiss_clean_energy.csv', './data/georef-switzerland-kanton.geojson']
+# The snapshots depend on these sources, a change in one of them starts a new version
+CODE_FILES = ['plotting.py', 'utils.py', 'figures.py', 'grid.py', 'sketch.py', 'topology.py', 'build.py', 'snapshot.py', utl.POPULATION_FILE]
+OUTLIER_MODES = ['No', 'Yes']
+# Worker processes building the figures of a view concurrently on a miss.
+# Every worker holds its own copy of the dataset (about as much memory as
+# the app process), so the pool is off unless set
+FIGURE_WORKERS = int(os.environ.get('FIGURE_WORKERS', 1))
+# The pool of the figure workers (a proxy of figure_pool.FigurePool) and
+# its process, started once per process by start_pool
+_pool = None
+_pool_process = None
+_pool_dir = None
+# Views built on a miss (a period, several values in a filter ...) kept
+# in memory for all the sessions, the least recently used dropped first
+LIVE_CACHE_SIZE = 32
+_live_figs = OrderedDict()
+_live_lock = threading.Lock()
+
+#---------------------------- views ------------------------------
+# The views of the dashboard and the jobs of the figures they are built
+# from. A view is addressed by its name and the values of its filters,
+# a tuple for several values selected in a filter, and the period of
+# commissioning when it is not the whole range (see give_key)
+VIEWS = {
+    'overview': lambda data, energy_catg, period='All': figs_.give_overview_jobs(
+        data['energy_df'], data['geojsn_url'], data['canton_metrics'], energy_catg, data['filter_index'], period),
+    'location': lambda data, canton_name, energy_catg, period='All': figs_.give_location_jobs(
+        data['energy_df'], data['geojsn_url'], data['canton_bounds'], canton_name, energy_catg,
+        data['filter_index'], period),
+    'distribution': lambda data, canton_name, energy_catg, outlier_zoom, period='All': figs_.give_distribution_jobs(
+        data['energy_df'], canton_name, energy_catg, outlier_zoom, data['filter_index'], period, data['sketches']),
+    'efficiency': lambda data, canton_name, energy_catg, outlier_zoom, period='All': figs_.give_efficiency_jobs(
+        data['energy_df'], canton_name, energy_catg, outlier_zoom, data['filter_index'], period, data['sketches']),
+    'grid': lambda data, energy_catg, precision, period='All': figs_.give_grid_jobs(
+        data['grid_aggregates'], energy_catg, precision, data['energy_df'], data['filter_index'], period),
+    'hist': lambda data, period='All': figs_.give_hist_jobs(data['energy_df'], data['filter_index'], period,
+                                                              data['sketches']),
+    'growth': lambda data, canton_name, energy_catg, period='All': figs_.give_growth_jobs(
+        data['energy_df'], canton_name, energy_catg, data['filter_index'], period),
+    'animation': lambda data, canton_name, energy_catg, period='All': figs_.give_animation_jobs(
+        data['energy_df'], data['geojsn_url'], canton_name, energy_catg, data['filter_index'], period),
+    'compare': lambda data, canton_names, energy_catg, period='All': figs_.give_compare_jobs(
+        data['canton_cube'], canton_names, energy_catg, period),
+    'hierarchy': lambda data, canton_name, energy_catg, period='All': figs_.give_hierarchy_jobs(
+        data['canton_cube'], canton_name, energy_catg, period),
+}
+
+# Data of the build worker processes, loaded once by init_worker
+_data = {}
+
+#---------------------------- give_version ------------------------------
+# This function returns the cache version for a version of the data
+# files (utils.give_files_version), of the artifacts the data was read
+# from (None when it was prepared from the files) and the url of the
+# geometry the maps refer to: a hash of them and of the code the figures
+# are made with. A snapshot so only refers to a geometry file written for
+# its version
+@functools.lru_cache(maxsize=None)
+def give_version(data_version, artifacts_version=None, geojsn_url=''):
+    inputs = [data_version, str(artifacts_version), geojsn_url, utl.give_files_hash(CODE_FILES)]
+    return hashlib.sha256('|'.join(inputs).encode()).hexdigest()[:16]
+
+#---------------------------- give_data_version ------------------------------
+# This function returns the cache version of a dataset
+def give_data_version(data):
+    return give_version(data['version'], data['artifacts_version'], data['geojsn_url'])
+
+#---------------------------- give_key ------------------------------
+# This function returns the key of a view for the values of its filters
+# and a period. The key of the whole range has no period, so it is the
+# key of the snapshot built for it
+def give_key(*key, period='All'):
+    return key if period=='All' else key + (period,)
+
+#---------------------------- give_keys ------------------------------
+# This function returns the keys (view name and filter values) of every
+# filter combination offered in the dashboard
+def give_keys(energy_df):
+    energy_catags = figs_.give_energy_catags(energy_df)
+    canton_names = figs_.give_canton_names(energy_df)
+    keys = [('hist',)]
+    keys += [('overview', energy_catg) for energy_catg in energy_catags]
+    keys += [('grid', energy_catg, str(precision)) for energy_catg in energy_catags for precision in grd.GRID_PRECISIONS]
+    for canton_name in canton_names:
+        for energy_catg in energy_catags:
+            keys.append(('location', canton_name, energy_catg))
+            keys.append(('growth', canton_name, energy_catg))
+            keys.append(('animation', canton_name, energy_catg))
+            keys.append(('hierarchy', canton_name, energy_catg))
+            for outlier_zoom in OUTLIER_MODES:
+                keys.append(('distribution', canton_name, energy_catg, outlier_zoom))
+                keys.append(('efficiency', canton_name, energy_catg, outlier_zoom))
+    return keys
+
+#---------------------------- give_path ------------------------------
+# This function returns the file of a snapshot
+def give_path(cache_dir, version, key):
+    names = ['+'.join(utl.give_slug(v) for v in k) if isinstance(k, tuple) else utl.give_slug(k) for k in key[1:]]
+    return os.path.join(cache_dir, version, key[0], '_'.join(names) + '.pkl')
+
+#---------------------------- give_served ------------------------------
+# This function turns the figures of a view into what the dashboard
+# sends to the browser: the JSON text of the Plotly figures (shown by
+# utils.show_fig without building the figures again) and the PNG image
+# of the matplotlib figures (as st.pyplot would)
+def give_served(figs):
+    served = {}
+    for name, fig in figs.items():
+        if figs_.is_mpl_figure(fig):
+            import matplotlib.pyplot as plt
+            image = io.BytesIO()
+            fig.savefig(image, format='png', dpi=200, bbox_inches='tight')
+            plt.close(fig)
+            served[name] = image.getvalue()
+        elif isinstance(fig, go.Figure):
+            served[name] = fig.to_json()
+        else:
+            served[name] = fig
+    return served
+
+#---------------------------- dump_figs ------------------------------
+# This function serializes the served figures of a view. They are
+# already text and bytes, so reading them back is a copy
+def dump_figs(served):
+    return pickle.dumps(served, protocol=pickle.HIGHEST_PROTOCOL)
+
+#---------------------------- read_figs ------------------------------
+# This function reads the served figures of a view from a snapshot
+@functools.lru_cache(maxsize=64)
+def read_figs(path):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+#---------------------------- write_snapshot ------------------------------
+# This function writes a snapshot atomically, so readers never see a
+# partly written file
+def write_snapshot(path, blob):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(blob)
+    os.replace(tmp_path, path)
+
+#---------------------------- start_pool ------------------------------
+# This function starts the pool of worker processes building figures on
+# a miss when FIGURE_WORKERS is above 1. It is called once per process
+# when the data store is created (utils.load_data_store). The pool runs
+# in a process of its own started from figure_pool.py: the workers are
+# spawned from there and not from the server, whose __main__ module is
+# the app script of the running sessions. It returns once the workers
+# have loaded the data
+def start_pool(workers=FIGURE_WORKERS):
+    global _pool, _pool_process, _pool_dir
+    if workers < 2 or _pool is not None:
+        return _pool
+    import figure_pool
+    _pool_dir = tempfile.mkdtemp(prefix='figure-pool-')
+    address = os.path.join(_pool_dir, 'socket')
+    authkey = os.urandom(16)
+    env = dict(os.environ, **{figure_pool.AUTHKEY_VARIABLE: authkey.hex()})
+    _pool_process = subprocess.Popen([sys.executable, figure_pool.__file__, address, str(workers)], env=env)
+    atexit.register(stop_pool)
+    # The socket of the pool is created once its workers are up
+    while not os.path.exists(address):
+        if _pool_process.poll() is not None:
+            code = _pool_process.returncode
+            stop_pool()
+            raise RuntimeError(f"the figure pool could not be started (exit code {code})")
+        time.sleep(0.1)
+    manager = figure_pool.PoolManager(address=address, authkey=authkey)
+    manager.connect()
+    _pool = manager.give_pool()
+    return _pool
+
+#---------------------------- stop_pool ------------------------------
+# This function stops the pool of figure workers, the figures are then
+# built in the app process
+def stop_pool():
+    global _pool, _pool_process, _pool_dir
+    if _pool_process is not None:
+        _pool_process.terminate()
+        _pool_process.wait()
+    if _pool_dir is not None:
+        shutil.rmtree(_pool_dir, ignore_errors=True)
+    _pool, _pool_process, _pool_dir = None, None, None
+
+#---------------------------- build_fig ------------------------------
+# This function builds and serializes one figure of a view in a worker,
+# after loading the data again when it has another version than the
+# data of the caller
+def build_fig(key, name, version):
+    if _data.get('version') != version:
+        _data.update(utl.give_dataset(*DATA_PATHS))
+    job = VIEWS[key[0]](_data, *key[1:])[name]
+    return give_served({name: job()})[name]
+
+#---------------------------- build_figs ------------------------------
+# This function builds the served figures of a view. When the process
+# pool was started the independent figures are built and serialized
+# concurrently in it, so a view takes about as long as its slowest
+# figure; the figures are returned in the order of the view
+def build_figs(data, key):
+    global _pool
+    jobs = VIEWS[key[0]](data, *key[1:])
+    names = [name for name, job in jobs.items() if job is not None]
+    if _pool is None or len(names) < 2:
+        return give_served(figs_.run_jobs(jobs))
+    try:
+        built = dict(zip(names, _pool.build_figs(key, names, data['version'])))
+        return {name: built.get(name) for name in jobs}
+    except (BrokenProcessPool, OSError, EOFError):
+        # A worker or the pool died, the figures are built in the app
+        # process from now on
+        _pool = None
+        return give_served(figs_.run_jobs(jobs))
+
+#---------------------------- give_live_figs ------------------------------
+# This function returns the served figures of a view without a snapshot,
+# from the in-memory cache keyed by version and key, building them on a
+# miss. Two sessions missing the same view at once may both build it
+def give_live_figs(data, version, key):
+    with _live_lock:
+        if (version, key) in _live_figs:
+            _live_figs.move_to_end((version, key))
+            return _live_figs[(version, key)]
+    served = build_figs(data, key)
+    with _live_lock:
+        _live_figs[(version, key)] = served
+        while len(_live_figs) > LIVE_CACHE_SIZE:
+            _live_figs.popitem(last=False)
+    return served
+
+#---------------------------- give_figs ------------------------------
+# This function returns the served figures of a view (see give_served).
+# It reads the snapshot of the current version and falls back to the
+# views built in memory on a miss
+def give_figs(data, key, cache_dir=CACHE_DIR):
+    version = give_data_version(data)
+    path = give_path(cache_dir, version, key)
+    if os.path.exists(path):
+        return read_figs(path)
+    return give_live_figs(data, version, key)
+
+#---------------------------- init_worker ------------------------------
+# This function loads the data once in every build worker process
+def init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    _data.update(utl.give_dataset(*DATA_PATHS))
+
+#---------------------------- build_snapshot ------------------------------
+# This function builds and writes the snapshot of a view
+def build_snapshot(key, path):
+    served = give_served(figs_.run_jobs(VIEWS[key[0]](_data, *key[1:])))
+    write_snapshot(path, dump_figs(served))
+    return key
+
+#---------------------------- build ------------------------------
+# This function builds the snapshots of all filter combinations that are
+# missing from the current version and removes older versions
+def build(cache_dir=CACHE_DIR, workers=None):
+    data = utl.give_dataset(*DATA_PATHS)
+    version = give_data_version(data)
+    todo = []
+    for key in give_keys(data['energy_df']):
+        path = give_path(cache_dir, version, key)
+        if not os.path.exists(path):
+            todo.append((key, path))
+    print(f"Cache version {version}: building {len(todo)} snapshots")
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(build_snapshot, key, path) for key, path in todo]
+        for future in as_completed(futures):
+            future.result()
+    for name in os.listdir(cache_dir):
+        if name != version and os.path.isdir(os.path.join(cache_dir, name)):
+            shutil.rmtree(os.path.join(cache_dir, name))
+    return version
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the dashboard figures of every filter combination.")
+    parser.add_argument('--cache', default=CACHE_DIR, help="cache directory (default: ./cache)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes (default: one per core)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    os.makedirs(args.cache, exist_ok=True)
+    version = build(args.cache, args.workers)
+    print(f"Done in {time.perf_counter() - start:.1f} s, snapshots in {os.path.join(args.cache, version)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import pytest
+
+import api
+
+ETAG = '"0123456789abcdef0123"'
+
+@pytest.mark.parametrize('header, expected', [
+    (None, False),
+    ('', False),
+    (ETAG, True),
+    ('W/' + ETAG, True),
+    ('"other", ' + ETAG, True),
+    ('"other",W/' + ETAG + ' , "more"', True),
+    ('*', True),
+    (' * ', True),
+    ('"other"', False),
+    ('W/"other", "0123456789abcdef012"', False),
+    (ETAG[1:-1], False),
+])
+def test_etag_matches(header, expected):
+    assert api.give_etag_matches(header, ETAG) is expected
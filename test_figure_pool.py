@@ -0,0 +1,30 @@
+import pytest
+
+import utils as utl
+import snapshot as snp
+
+# Views with several figures: Plotly figures, matplotlib images and
+# missing figures
+KEYS = [('overview', 'Solar'), ('distribution', 'Bern', 'All', 'No'), ('growth', 'Uri', 'Hydro')]
+
+@pytest.fixture(scope='module')
+def data():
+    return utl.give_shared_dataset(*snp.DATA_PATHS, utl.give_files_version(snp.DATA_PATHS))
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = snp.start_pool(2)
+    yield pool
+    snp.stop_pool()
+
+@pytest.mark.parametrize('key', KEYS)
+def test_pool_figures_in_order(data, pool, key):
+    served = snp.build_figs(data, key)
+    # The pool is dropped when it fails, the figures are then built in the app process
+    assert snp._pool is pool
+    expected = snp.give_served(snp.figs_.run_jobs(snp.VIEWS[key[0]](data, *key[1:])))
+    assert list(served) == list(expected)
+    for name in expected:
+        assert type(served[name]) is type(expected[name])
+        if isinstance(expected[name], str):
+            assert served[name] == expected[name]
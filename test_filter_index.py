@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils as utl
+
+CANTONS = ['Bern', 'Uri', 'Zug']
+ENERGIES = ['Solar', 'Hydro', 'Wind']
+
+#---------------------------- give_rows ------------------------------
+# This function returns rows sorted by commissioning date as the dataset
+# is, sources without a date last, a number of rows that does not fill
+# the last byte of the bitmaps and a category without any row
+def give_rows(n=1003, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.integers(0, 365 * 20, n), unit='D')
+    df = pd.DataFrame({
+        'canton_name': pd.Categorical(rng.choice(CANTONS[:2], n), categories=CANTONS),
+        'energy_source_level_2': pd.Categorical(rng.choice(ENERGIES, n), categories=ENERGIES),
+        'commissioning_date': dates,
+    })
+    df.loc[rng.choice(n, 10, replace=False), 'commissioning_date'] = pd.NaT
+    return df.sort_values('commissioning_date', kind='stable', na_position='last', ignore_index=True)
+
+#---------------------------- give_mask_rows ------------------------------
+# This function returns the row positions of a selection with plain
+# pandas masks
+def give_mask_rows(df, canton_name, energy_catg, period='All'):
+    mask = pd.Series(True, index=df.index)
+    for col, value in zip(utl.FILTER_COLUMNS, [canton_name, energy_catg]):
+        if value != 'All':
+            mask &= df[col].isin([value] if isinstance(value, str) else list(value))
+    if period != 'All':
+        dates = df['commissioning_date']
+        mask &= (dates >= pd.Timestamp(period[0])) & (dates < pd.Timestamp(period[1]) + pd.Timedelta(days=1))
+    return np.flatnonzero(mask.to_numpy())
+
+@pytest.fixture(scope='module')
+def rows():
+    return give_rows()
+
+@pytest.fixture(scope='module', params=['built', 'frozen'])
+def filter_index(rows, request):
+    filter_index = utl.build_filter_index(rows)
+    return filter_index if request.param == 'built' else utl.give_frozen_filter_index(filter_index)
+
+PERIODS = ['All', ('2005-03-01', '2011-08-31'), ('2000-01-01', '2000-01-31'), ('2010-06-15', '2010-06-15'),
+           ('1990-01-01', '2030-12-31'), ('2030-01-01', '2030-12-31')]
+
+@pytest.mark.parametrize('period', PERIODS)
+@pytest.mark.parametrize('canton_name, energy_catg', [
+    ('All', 'All'),
+    ('Bern', 'All'),
+    ('All', 'Hydro'),
+    ('Uri', 'Solar'),
+    (('Bern', 'Uri'), 'All'),
+    (('Bern', 'Uri'), ('Solar', 'Wind')),
+    ('Zug', 'All'),
+    ('Geneva', 'Solar'),
+    ((), 'All'),
+])
+def test_filter_rows_match_masks(rows, filter_index, canton_name, energy_catg, period):
+    selected = utl.give_filter_rows(filter_index, canton_name, energy_catg, period)
+    np.testing.assert_array_equal(selected, give_mask_rows(rows, canton_name, energy_catg, period))
+
+@pytest.mark.parametrize('period', PERIODS)
+def test_period_bounds_match_masks(rows, filter_index, period):
+    first, last = utl.give_period_bounds(filter_index, period)
+    expected = give_mask_rows(rows, 'All', 'All', period)
+    if period == 'All':
+        assert (first, last) == (0, len(rows))
+    else:
+        # The period is one slice of the rows, the sources without a date
+        # are after every period
+        np.testing.assert_array_equal(np.arange(first, last), expected)
+
+def test_period_bounds_of_first_and_last_day(rows, filter_index):
+    dates = rows['commissioning_date'].dropna()
+    first_day, last_day = dates.iloc[0].date().isoformat(), dates.iloc[-1].date().isoformat()
+    assert utl.give_period_bounds(filter_index, (first_day, last_day)) == (0, len(dates))
+    first, last = utl.give_period_bounds(filter_index, (first_day, first_day))
+    assert last - first == (dates == dates.iloc[0]).sum()
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+import utils as utl
+
+#---------------------------- give_frame ------------------------------
+# This function returns a read-only frame and the copy it is compared to
+def give_frame():
+    df = pd.DataFrame({'canton_name': ['Bern', 'Uri'], 'production': [1.0, 2.0]})
+    return utl.give_read_only(df), df.copy()
+
+# The in-place changes the shared frame blocks, none of them may change it
+BLOCKED = {
+    'set column': lambda df: df.__setitem__('production', 0.0),
+    'new column': lambda df: df.__setitem__('count', 1),
+    'attribute column': lambda df: setattr(df, 'production', 0.0),
+    'delete column': lambda df: df.__delitem__('production'),
+    'insert': lambda df: df.insert(0, 'count', 1),
+    'pop': lambda df: df.pop('production'),
+    'loc': lambda df: df.loc.__setitem__((0, 'production'), 0.0),
+    'iloc': lambda df: df.iloc.__setitem__((0, 1), 0.0),
+    'at': lambda df: df.at.__setitem__((0, 'production'), 0.0),
+    'iat': lambda df: df.iat.__setitem__((0, 1), 0.0),
+    'columns': lambda df: setattr(df, 'columns', ['a', 'b']),
+    'index': lambda df: setattr(df, 'index', [5, 6]),
+    'rename': lambda df: df.rename(columns={'production': 'p'}, inplace=True),
+    'rename index': lambda df: df.rename(index={0: 5}, inplace=True),
+    'rename_axis': lambda df: df.rename_axis('rows', inplace=True),
+    'set_index': lambda df: df.set_index('canton_name', inplace=True),
+    'reset_index': lambda df: df.reset_index(drop=True, inplace=True),
+    'sort_values': lambda df: df.sort_values('production', ascending=False, inplace=True),
+    'drop': lambda df: df.drop(columns='production', inplace=True),
+    'fillna': lambda df: df.fillna(0, inplace=True),
+    'update': lambda df: df.update(pd.DataFrame({'production': [5.0, 6.0]})),
+}
+
+@pytest.mark.parametrize('name', list(BLOCKED))
+def test_blocked(name):
+    df, original = give_frame()
+    with pytest.raises(utl.ReadOnlyError):
+        BLOCKED[name](df)
+    pd.testing.assert_frame_equal(pd.DataFrame(df), original)
+
+def test_derived_frames_are_writable():
+    df, original = give_frame()
+    df_new = df.assign(count=1).rename(columns={'production': 'p'})
+    df_new['p'] = 0.0
+    df_new.columns = ['a', 'b', 'c']
+    pd.testing.assert_frame_equal(pd.DataFrame(df), original)
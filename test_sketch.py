@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sketch as skt
+
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+#---------------------------- give_rows ------------------------------
+# This function returns rows of two cantons and energy categories, with
+# values from below MIN_VALUE to far above a million and negative ones
+def give_rows(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    production = rng.lognormal(3, 6, n) * rng.choice([-1, 1], n, p=[0.05, 0.95])
+    return pd.DataFrame({
+        'canton_name': rng.choice(['Bern', 'Uri'], n),
+        'energy_source_level_2': rng.choice(['Solar', 'Hydro'], n),
+        'production': production,
+        'electrical_capacity': rng.lognormal(0, 4, n),
+    })
+
+#---------------------------- assert_within_accuracy ------------------------------
+# This function checks that quantiles read from the sketches are within
+# the relative accuracy of the values of the same ranks
+def assert_within_accuracy(approximate, values):
+    values = np.sort(values)
+    for quantile, value in zip(QUANTILES, approximate):
+        rank = quantile * (len(values) - 1)
+        low, high = values[int(np.floor(rank))], values[int(np.ceil(rank))]
+        bounds = sorted([low * (1 - np.sign(low) * skt.RELATIVE_ACCURACY), high * (1 + np.sign(high) * skt.RELATIVE_ACCURACY)])
+        assert bounds[0] - skt.MIN_VALUE <= value <= bounds[1] + skt.MIN_VALUE
+
+@pytest.mark.parametrize('variable', skt.SKETCH_VARIABLES)
+@pytest.mark.parametrize('canton_name, energy_catg', [('All', 'All'), ('Bern', 'Solar'), (('Bern', 'Uri'), 'Hydro')])
+def test_quantiles_within_accuracy(variable, canton_name, energy_catg):
+    df = give_rows()
+    sketches = skt.build_sketches(df)
+    rows = df
+    if canton_name != 'All':
+        rows = rows[rows['canton_name'].isin([canton_name] if isinstance(canton_name, str) else canton_name)]
+    if energy_catg != 'All':
+        rows = rows[rows['energy_source_level_2'] == energy_catg]
+    values = {'ratio': rows['production'] / rows['electrical_capacity']}.get(variable, rows.get(variable))
+    assert_within_accuracy(skt.give_sketch_quantiles(sketches, variable, canton_name, energy_catg, QUANTILES), values.to_numpy())
+
+def test_large_values_keep_accuracy():
+    values = np.array([1e3, 2e6, 5e8, 3e10, 7e12])
+    store = skt.give_store(skt.give_sketch_keys(values))
+    assert np.allclose(skt.give_quantiles(store, [0, 0.25, 0.5, 0.75, 1]), values, rtol=skt.RELATIVE_ACCURACY)
+
+def test_updated_equals_built():
+    df = give_rows()
+    updated = skt.update_sketches(skt.build_sketches(df.iloc[:2000]), df.iloc[2000:])
+    built = skt.build_sketches(df)
+    for variable in skt.SKETCH_VARIABLES:
+        assert set(updated[variable]) == set(built[variable])
+        for cell, (offset, counts) in built[variable].items():
+            assert updated[variable][cell][0] == offset
+            assert np.array_equal(updated[variable][cell][1], counts)
+
+def test_frozen_sketches_are_read_only():
+    frozen = skt.give_frozen_sketches(skt.build_sketches(give_rows()))
+    offset, counts = frozen['production'][('Bern', 'Solar')]
+    with pytest.raises(ValueError):
+        counts[0] = 1
+    with pytest.raises(TypeError):
+        frozen['production'][('Bern', 'Solar')] = (0, counts)
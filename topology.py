@@ -0,0 +1,239 @@
+#***********************************************************************
+#    Quantized topology of the canton boundaries                       #
+#    Build: python topology.py [--quantization N] [--tolerance T]      #
+#***********************************************************************
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+GEOJSON_PATH = './data/georef-switzerland-kanton.geojson'
+# Number of steps of the quantized coordinates along each axis
+QUANTIZATION = 100000
+# Decimals of the decoded coordinates, below the size of a step
+DECIMALS = 5
+# Tolerance of the simplified arcs in quantized steps (~20-35 m), the
+# geometry the maps are drawn with
+SIMPLIFY_TOLERANCE = 10
+# Content hashes of the geojson files by path, with the fingerprint of
+# the file they were computed for, see give_source_hash
+_source_hashes = {}
+
+#---------------------------- give_topology_path ------------------------------
+# This function returns the path of the topology built from a geojson file
+def give_topology_path(geojson_file):
+    return os.path.splitext(geojson_file)[0] + '.topojson'
+
+#---------------------------- give_source_hash ------------------------------
+# This function returns the content hash of the geojson file a topology
+# is built from (the same hash as utils.give_files_hash). The file is only
+# read again when its fingerprint (modification time and size) changed
+def give_source_hash(geojson_file):
+    stat = os.stat(geojson_file)
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+    path = os.path.abspath(geojson_file)
+    if path not in _source_hashes or _source_hashes[path][0] != fingerprint:
+        with open(geojson_file, 'rb') as file:
+            _source_hashes[path] = (fingerprint, hashlib.sha256(file.read()).hexdigest()[:16])
+    return _source_hashes[path][1]
+
+#---------------------------- give_polygons ------------------------------
+# This function returns the polygons of a geojson geometry
+def give_polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    return geometry['coordinates']
+
+#---------------------------- give_quantized_ring ------------------------------
+# This function returns a ring as a closed list of integer points, without
+# the consecutive duplicates made by the quantization
+def give_quantized_ring(ring, translate, scale):
+    points = np.rint((np.asarray(ring, dtype='float64')[:, :2] - translate) / scale).astype('int64')
+    ring_ = [tuple(points[0])]
+    for point in map(tuple, points[1:]):
+        if point != ring_[-1]:
+            ring_.append(point)
+    if ring_[-1] != ring_[0]:
+        ring_.append(ring_[0])
+    return ring_
+
+#---------------------------- give_junctions ------------------------------
+# This function returns the points where the boundaries of rings meet or
+# part: the points reached from different neighbours in different rings
+def give_junctions(rings):
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        open_ring = ring[:-1]
+        for i, point in enumerate(open_ring):
+            pair = frozenset((open_ring[i - 1], open_ring[(i + 1) % len(open_ring)]))
+            if neighbours.setdefault(point, pair) != pair:
+                junctions.add(point)
+    return junctions
+
+#---------------------------- give_ring_arcs ------------------------------
+# This function splits a closed ring at its junctions. A ring without
+# junctions is a single arc, started at its smallest point so that rings
+# shared by two cantons (enclaves) give the same arc
+def give_ring_arcs(ring, junctions):
+    open_ring = ring[:-1]
+    cuts = [i for i, point in enumerate(open_ring) if point in junctions]
+    if not cuts:
+        start = open_ring.index(min(open_ring))
+        return [open_ring[start:] + open_ring[:start + 1]]
+    rotated = open_ring[cuts[0]:] + open_ring[:cuts[0]] + [open_ring[cuts[0]]]
+    cuts = [i - cuts[0] for i in cuts] + [len(open_ring)]
+    return [rotated[start:end + 1] for start, end in zip(cuts[:-1], cuts[1:])]
+
+#---------------------------- give_topology ------------------------------
+# This function converts a geojson feature collection to a topology: the
+# boundaries are quantized and split into arcs at the junctions, every
+# border shared by two cantons is stored once, and the polygons refer to
+# their arcs by index (~index for an arc taken in reverse). The points of
+# an arc are stored as differences to the previous one
+def give_topology(geojson, quantization=QUANTIZATION):
+    features = geojson['features']
+    points = np.concatenate([np.asarray(ring, dtype='float64')[:, :2]
+                             for feature in features
+                             for polygon in give_polygons(feature['geometry'])
+                             for ring in polygon])
+    translate = points.min(axis=0)
+    scale = np.maximum(points.max(axis=0) - translate, 1e-12) / (quantization - 1)
+    shapes = [[[give_quantized_ring(ring, translate, scale) for ring in polygon]
+               for polygon in give_polygons(feature['geometry'])] for feature in features]
+    junctions = give_junctions([ring for shape in shapes for polygon in shape for ring in polygon])
+
+    arcs, arc_index = [], {}
+    def give_arc_ref(arc):
+        key = tuple(arc)
+        if key in arc_index:
+            return arc_index[key]
+        if key[::-1] in arc_index:
+            return ~arc_index[key[::-1]]
+        arc_index[key] = len(arcs)
+        arcs.append(arc)
+        return arc_index[key]
+
+    geometries = []
+    for feature, shape in zip(features, shapes):
+        refs = [[[give_arc_ref(arc) for arc in give_ring_arcs(ring, junctions)] for ring in polygon]
+                for polygon in shape]
+        geometry = {'type': feature['geometry']['type'],
+                    'arcs': refs[0] if feature['geometry']['type'] == 'Polygon' else refs,
+                    'properties': feature.get('properties', {})}
+        geometries.append(geometry)
+
+    encoded = []
+    for arc in arcs:
+        arc = np.asarray(arc, dtype='int64')
+        encoded.append(np.concatenate([arc[:1], np.diff(arc, axis=0)]).tolist())
+    return {'type': 'Topology',
+            'transform': {'scale': scale.tolist(), 'translate': translate.tolist()},
+            'objects': {'cantons': {'type': 'GeometryCollection', 'geometries': geometries}},
+            'arcs': encoded}
+
+#---------------------------- give_simplified ------------------------------
+# This function returns a topology with its arcs simplified (Douglas-
+# Peucker, tolerance in quantized steps). The ends of the arcs are kept,
+# so the borders shared by two cantons stay shared. Closed arcs that
+# would collapse are kept as they are
+def give_simplified(topology, tolerance):
+    import shapely
+    arcs = []
+    for arc in topology['arcs']:
+        points = np.cumsum(np.asarray(arc, dtype='int64'), axis=0)
+        simplified = shapely.get_coordinates(
+            shapely.simplify(shapely.linestrings(points), tolerance, preserve_topology=False)).astype('int64')
+        if (points[0] == points[-1]).all() and len(simplified) < 4:
+            simplified = points
+        arcs.append(np.concatenate([simplified[:1], np.diff(simplified, axis=0)]).tolist())
+    return dict(topology, arcs=arcs)
+
+#---------------------------- give_features ------------------------------
+# This function decodes a topology back to a geojson feature collection,
+# with the coordinates rounded to DECIMALS
+def give_features(topology, decimals=DECIMALS):
+    scale = np.asarray(topology['transform']['scale'])
+    translate = np.asarray(topology['transform']['translate'])
+    # The arcs are decoded together: one cumulative sum over all their
+    # points, less the sum reached at the start of each arc
+    lengths = np.array([len(arc) for arc in topology['arcs']])
+    values = itertools.chain.from_iterable(itertools.chain.from_iterable(topology['arcs']))
+    deltas = np.fromiter(values, dtype='int64', count=2 * lengths.sum()).reshape(-1, 2)
+    points = np.cumsum(deltas, axis=0)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    points -= np.repeat(points[starts] - deltas[starts], lengths, axis=0)
+    points = (points * scale + translate).round(decimals).tolist()
+    arcs = [points[start:start + length] for start, length in zip(starts, lengths)]
+
+    def give_ring(refs):
+        ring = []
+        for ref in refs:
+            arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+            ring.extend(arc if not ring else arc[1:])
+        return ring
+
+    features = []
+    for geometry in topology['objects']['cantons']['geometries']:
+        if geometry['type'] == 'Polygon':
+            coordinates = [give_ring(refs) for refs in geometry['arcs']]
+        else:
+            coordinates = [[give_ring(refs) for refs in polygon] for polygon in geometry['arcs']]
+        features.append({'type': 'Feature',
+                         'geometry': {'type': geometry['type'], 'coordinates': coordinates},
+                         'properties': geometry['properties']})
+    return {'type': 'FeatureCollection', 'features': features}
+
+#---------------------------- read_topology ------------------------------
+# This function returns the features of the topology built from a geojson
+# file (simplified, as the maps are drawn), or None when it is missing or
+# was built from another version
+def read_topology(geojson_file):
+    topology_file = give_topology_path(geojson_file)
+    if not os.path.exists(topology_file):
+        return None
+    with open(topology_file) as file:
+        topology = json.load(file)
+    if topology.get('source_hash') != give_source_hash(geojson_file):
+        return None
+    return give_features(topology)
+
+#---------------------------- build ------------------------------
+# This function writes the topology of a geojson file next to it, with
+# its arcs simplified (not with a tolerance of 0)
+def build(geojson_file=GEOJSON_PATH, quantization=QUANTIZATION, tolerance=SIMPLIFY_TOLERANCE):
+    with open(geojson_file) as file:
+        topology = give_topology(json.load(file), quantization)
+    if tolerance > 0:
+        topology = give_simplified(topology, tolerance)
+    topology['source_hash'] = give_source_hash(geojson_file)
+    topology_file = give_topology_path(geojson_file)
+    with open(topology_file, 'w') as file:
+        json.dump(topology, file, separators=(',', ':'))
+    return topology_file
+
+#---------------------------- main ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build the quantized topology of the canton boundaries.")
+    parser.add_argument('--geojson', default=GEOJSON_PATH, help=f"geojson file (default: {GEOJSON_PATH})")
+    parser.add_argument('--quantization', type=int, default=QUANTIZATION,
+                        help=f"steps of the quantized coordinates per axis (default: {QUANTIZATION})")
+    parser.add_argument('--tolerance', type=float, default=SIMPLIFY_TOLERANCE,
+                        help=f"tolerance of the simplified arcs in quantized steps, 0 to keep them all (default: {SIMPLIFY_TOLERANCE})")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    topology_file = build(args.geojson, args.quantization, args.tolerance)
+    with open(topology_file) as file:
+        topology = json.load(file)
+    print(f"Wrote {topology_file} ({len(topology['arcs'])} arcs): "
+          f"{os.path.getsize(args.geojson) / 1e6:.2f} MB -> {os.path.getsize(topology_file) / 1e6:.2f} MB "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,876 @@
 import streamlit as st
+from streamlit.logger import get_logger
 import pandas as pd
 import numpy as np
-import geopandas as gpd
+import functools
 import json
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+import types
+import unicodedata
 
+import grid as grd
+import sketch as skt
+import topology as topo
+
+# Frames derived from the shared dataset never write through to it
+pd.set_option("mode.copy_on_write", True)
+
+logger = get_logger(__name__)
+
+
+# The loaders below are cached by their arguments. Their version argument
+# (the version of the files, see give_files_version) is only part of the
+# cache key, so that a replaced file is loaded again. Two entries are
+# kept: the current version and the one being loaded
 
 #------------------- load_data -------------------------
 # This function loads the csv data to a pandas DataFrame
-@st.cache_data
-def load_data(path):
+@st.cache_data(max_entries=2)
+def load_data(path, version=None):
     df = pd.read_csv(path)
     return df
 
+# Columns of the csv data used by the dashboard and their compact types:
+# repeated strings become categoricals and coordinates single floats.
+# Capacity and production stay double floats so the totals do not change
+COMPACT_DTYPES = {
+    'electrical_capacity': 'float64',
+    'energy_source_level_2': 'category',
+    'energy_source_level_3': 'category',
+    'technology': 'category',
+    'lon': 'float32',
+    'lat': 'float32',
+    'municipality': 'category',
+    'address': 'object',
+    'company': 'category',
+    'production': 'float64',
+    'canton_name': 'category',
+}
+
+#------------------- load_compact_data -------------------------
+# This function loads only the columns of the csv data used by the
+# dashboard to a pandas DataFrame with compact types
+@st.cache_data(max_entries=2)
+def load_compact_data(path, version=None):
+    df = pd.read_csv(path,
+                     usecols=list(COMPACT_DTYPES) + ['commissioning_date'],
+                     dtype=COMPACT_DTYPES,
+                     parse_dates=['commissioning_date'])
+    return df
+
+#------------------- give_memory_report -------------------------
+# This function returns the memory in MB per column of the csv data
+# loaded in full and with load_compact_data, and the saving in total
+def give_memory_report(path):
+    full = pd.read_csv(path).memory_usage(deep=True, index=False) / 1e6
+    compact = load_compact_data(path).memory_usage(deep=True, index=False) / 1e6
+    report = pd.DataFrame({'full_MB': full, 'compact_MB': compact}).fillna(0.0)
+    report.loc['total'] = report.sum()
+    report['saved_MB'] = report['full_MB'] - report['compact_MB']
+    return report.round(3)
+
 #------------------- load_geojsn_data -------------------------
-# This function loads the geojson data 
-@st.cache_data
-def load_geojsn_data(file):
+# This function loads the geojson data, decoded from the quantized
+# topology built from the file (python topology.py) when it is up to date
+@st.cache_data(max_entries=2)
+def load_geojsn_data(file, version=None):
+    geojson = topo.read_topology(file)
+    if geojson is not None:
+        return geojson
     with open(file) as response:
         df  = json.load(response)
     return df
 
 #------------------- load_geopanda_data -------------------------
 # This function loads the geojson data to a geopanda file
-@st.cache_data
-def load_geopanda_data(file):
+@st.cache_data(max_entries=2)
+def load_geopanda_data(file, version=None):
+    import geopandas as gpd
     df = gpd.read_file(file)
     return df
 
+#------------------- give_geo_cantons -------------------------
+# This function returns the name of the canton polygon containing each
+# point (None for missing coordinates and points outside of all cantons).
+# The points go in an STRtree that is queried once per prepared canton
+# polygon, so the test runs in bulk instead of row by row
+def give_geo_cantons(lat, lon, geopd_data, name_col='kan_name'):
+    import shapely
+    lat = np.asarray(lat, dtype='float64')
+    lon = np.asarray(lon, dtype='float64')
+    located = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    tree = shapely.STRtree(shapely.points(lon[located], lat[located]))
+    polygons = np.asarray(geopd_data.geometry.values)
+    shapely.prepare(polygons)
+    polygon_idx, point_idx = tree.query(polygons, predicate='intersects')
+    # A point on a shared border goes to the first canton
+    point_idx, first = np.unique(point_idx, return_index=True)
+    geo_cantons = np.full(len(lat), None, dtype=object)
+    geo_cantons[located[point_idx]] = geopd_data[name_col].values[polygon_idx[first]]
+    return geo_cantons
+
+#------------------- give_canton_check -------------------------
+# This function compares the canton of each installation with the canton
+# of its coordinates and returns the rows that do not agree: 'assigned'
+# when the canton is missing but located, 'unlocated' when it cannot be
+# located and 'mismatch' when the two cantons differ
+def give_canton_check(df, geopd_data):
+    geo_cantons = give_geo_cantons(df['lat'], df['lon'], geopd_data)
+    check = pd.DataFrame({'canton_name': df['canton_name'].astype(object),
+                          'geo_canton': geo_cantons,
+                          'lat': df['lat'],
+                          'lon': df['lon']}, index=df.index)
+    given = check['canton_name'].notna()
+    located = check['geo_canton'].notna()
+    check['status'] = np.select([~given & located, ~located, check['canton_name'] != check['geo_canton']],
+                                ['assigned', 'unlocated', 'mismatch'], default='')
+    return check[check['status'] != '']
+
+#------------------- assign_cantons -------------------------
+# This function fills in the missing cantons of the installations from
+# their coordinates, so they are not dropped from the maps. The given
+# cantons are kept, mismatches are only reported
+def assign_cantons(df, geopd_data):
+    check = give_canton_check(df, geopd_data)
+    counts = check['status'].value_counts()
+    if len(check):
+        logger.info("canton check: %s", ", ".join(f"{n} {status}" for status, n in counts.items()))
+    assigned = check[check['status'] == 'assigned']
+    if len(assigned) == 0:
+        return df
+    canton_names = df['canton_name'].astype(object)
+    canton_names.loc[assigned.index] = assigned['geo_canton']
+    return df.assign(canton_name=canton_names.astype('category'))
+
+#------------------- load_checked_data -------------------------
+# This function loads the compact csv data with the missing cantons
+# assigned from the coordinates, with the rows sorted once by
+# commissioning date (see give_period_bounds)
+@st.cache_data(max_entries=2)
+def load_checked_data(path, geojson_file, version=None):
+    df = assign_cantons(load_compact_data(path, version), load_geopanda_data(geojson_file, version))
+    return df.sort_values('commissioning_date', kind='stable', na_position='last', ignore_index=True)
+
+#------------------- ReadOnlyError -------------------------
+# This exception is raised when the shared dataset is modified
+class ReadOnlyError(TypeError):
+    pass
+
+READ_ONLY_MESSAGE = "the shared dataset is read-only, modify a copy instead (df.copy())"
+
+#------------------- FrozenDict -------------------------
+# A dict (and its nested values) that can not be modified. Deep copies,
+# as made by plotly for every figure, share it like they share a tuple,
+# so the geometry of a map is not copied per figure. Shallow copies
+# and unpickled copies are ordinary mutable objects
+class FrozenDict(dict):
+    def _read_only(self, *args, **kwargs):
+        raise ReadOnlyError(READ_ONLY_MESSAGE)
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (dict, (give_thawed(self),))
+
+#------------------- give_frozen -------------------------
+# This function returns a read-only version of json data:
+# dicts become FrozenDict and lists tuples
+def give_frozen(obj):
+    if isinstance(obj, FrozenDict):
+        return obj
+    if isinstance(obj, dict):
+        return FrozenDict((key, give_frozen(value)) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(give_frozen(value) for value in obj)
+    return obj
+
+#------------------- give_thawed -------------------------
+# This function returns a mutable copy of frozen json data
+def give_thawed(obj):
+    if isinstance(obj, dict):
+        return {key: give_thawed(value) for key, value in obj.items()}
+    if isinstance(obj, tuple):
+        return [give_thawed(value) for value in obj]
+    return obj
+
+#------------------- ReadOnlyIndexer -------------------------
+# A loc/iloc/at/iat indexer that reads but does not write
+class ReadOnlyIndexer:
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        raise ReadOnlyError(READ_ONLY_MESSAGE)
+
+#------------------- ReadOnlyMixin -------------------------
+# This mixin blocks the ways of modifying a (Geo)DataFrame in place.
+# Frames derived from it (selections, assign, copy ...) are ordinary
+# frames, and with copy-on-write they never write through to it
+class ReadOnlyMixin:
+    def _read_only(self, *args, **kwargs):
+        if self.__dict__.get('_frozen'):
+            raise ReadOnlyError(READ_ONLY_MESSAGE)
+
+    # The axes are set through here (df.columns = ..., df.index = ..., and
+    # the in-place rename, set_axis ...), before any change is applied, and
+    # so are the columns set as attributes (df.production = ...)
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen') and (name in ('columns', 'index') or name in self.columns):
+            self._read_only()
+        super().__setattr__(name, value)
+
+    def _set_axis(self, *args, **kwargs):
+        self._read_only()
+        return super()._set_axis(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        self._read_only()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._read_only()
+        super().__delitem__(key)
+
+    def insert(self, *args, **kwargs):
+        self._read_only()
+        return super().insert(*args, **kwargs)
+
+    def pop(self, *args, **kwargs):
+        self._read_only()
+        return super().pop(*args, **kwargs)
+
+    def _update_inplace(self, *args, **kwargs):
+        self._read_only()
+        return super()._update_inplace(*args, **kwargs)
+
+    @property
+    def loc(self):
+        return ReadOnlyIndexer(super().loc)
+
+    @property
+    def iloc(self):
+        return ReadOnlyIndexer(super().iloc)
+
+    @property
+    def at(self):
+        return ReadOnlyIndexer(super().at)
+
+    @property
+    def iat(self):
+        return ReadOnlyIndexer(super().iat)
+
+class ReadOnlyFrame(ReadOnlyMixin, pd.DataFrame):
+    pass
+
+#------------------- give_read_only_geo_class -------------------------
+# This function returns the read-only GeoDataFrame class. It is defined
+# on first use, geopandas is only imported where geometry is read
+@functools.lru_cache(maxsize=None)
+def give_read_only_geo_class():
+    import geopandas as gpd
+    class ReadOnlyGeoFrame(ReadOnlyMixin, gpd.GeoDataFrame):
+        pass
+    return ReadOnlyGeoFrame
+
+#------------------- give_read_only -------------------------
+# This function returns a read-only view of a (Geo)DataFrame. A
+# GeoDataFrame can only exist once geopandas was imported
+def give_read_only(df):
+    geopandas = sys.modules.get('geopandas')
+    if geopandas is not None and isinstance(df, geopandas.GeoDataFrame):
+        df_out = give_read_only_geo_class()(df)
+    else:
+        df_out = ReadOnlyFrame(df)
+    df_out.__dict__['_frozen'] = True
+    return df_out
+
+EARTH_RADIUS_KM = 6371.0
+
+#------------------- give_unit_vectors -------------------------
+# This function returns the points on the unit sphere of coordinates in
+# degrees. The straight line (chord) distance between two such points
+# grows with their great-circle distance, so nearest neighbours in 3D
+# are the nearest installations on the ground
+def give_unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype='float64'))
+    lon = np.radians(np.asarray(lon, dtype='float64'))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+#------------------- build_near_index -------------------------
+# This function builds the KD-trees of the near search: one over the
+# located installations of every energy category, with the row
+# positions of the points in the DataFrame
+def build_near_index(df):
+    from scipy.spatial import cKDTree
+    located = df['lat'].notna().to_numpy() & df['lon'].notna().to_numpy()
+    energy = df['energy_source_level_2'].to_numpy()
+    near_index = {}
+    for energy_catg in ['All'] + sorted(df['energy_source_level_2'].dropna().unique()):
+        rows = np.flatnonzero(located if energy_catg == 'All' else located & (energy == energy_catg))
+        points = give_unit_vectors(df['lat'].to_numpy()[rows], df['lon'].to_numpy()[rows])
+        near_index[energy_catg] = (cKDTree(points), rows)
+    return types.MappingProxyType(near_index)
+
+#------------------- give_nearest -------------------------
+# This function returns the row positions and great-circle distances in
+# km of the k nearest installations of an energy category to a point,
+# or of all installations within radius_km of it, nearest first. For
+# several energy categories the results of their trees are merged. With
+# row_bounds only the rows between these positions are found, the k
+# nearest are then searched among a growing number of neighbours
+def give_nearest(near_index, energy_catg, lat, lon, k=None, radius_km=None, row_bounds=None):
+    if not isinstance(energy_catg, str):
+        found = [give_nearest(near_index, energy, lat, lon, k=k, radius_km=radius_km, row_bounds=row_bounds)
+                 for energy in energy_catg]
+        rows = np.concatenate([energy_rows for energy_rows, _ in found])
+        distances = np.concatenate([energy_distances for _, energy_distances in found])
+        order = np.argsort(distances, kind='stable')[:k]
+        return rows[order], distances[order]
+    tree, rows = near_index[energy_catg]
+    point = give_unit_vectors([lat], [lon])[0]
+    if radius_km is not None:
+        chord = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+        found = np.asarray(tree.query_ball_point(point, chord), dtype='int64')
+        chords = np.linalg.norm(tree.data[found] - point, axis=1)
+        order = np.argsort(chords, kind='stable')
+        found, chords = found[order], chords[order]
+    else:
+        k = min(k, len(rows))
+        if k == 0:
+            return rows[:0], np.zeros(0)
+        n_query = k
+        while True:
+            chords, found = tree.query(point, k=n_query)
+            chords, found = np.atleast_1d(chords), np.atleast_1d(found)
+            if row_bounds is None or n_query == len(rows):
+                break
+            if np.count_nonzero((rows[found] >= row_bounds[0]) & (rows[found] < row_bounds[1])) >= k:
+                break
+            n_query = min(4 * n_query, len(rows))
+    if row_bounds is not None:
+        kept = (rows[found] >= row_bounds[0]) & (rows[found] < row_bounds[1])
+        found, chords = found[kept][:k], chords[kept][:k]
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chords / 2, 1.0))
+    return rows[found], distances
+
+#------------------- give_municipality_points -------------------------
+# This function returns the mean location of the installations of
+# every municipality, the points offered to the near search
+def give_municipality_points(df):
+    located = df[df['lat'].notna() & df['lon'].notna()]
+    points = located.groupby('municipality', observed=True)[['lat', 'lon']].mean()
+    return points.astype('float64').sort_index()
+
+#------------------- give_frozen_grid -------------------------
+# This function returns a read-only version of the grid aggregates
+def give_frozen_grid(grid_aggregates):
+    return types.MappingProxyType({
+        precision: types.MappingProxyType({'cells': give_read_only(level['cells']),
+                                           'geojson': give_frozen(level['geojson'])})
+        for precision, level in grid_aggregates.items()})
+
+# Columns of the multi-select filters of the dashboard
+FILTER_COLUMNS = ['canton_name', 'energy_source_level_2']
+
+#------------------- build_filter_index -------------------------
+# This function builds the bitmap index of the filters: for every value
+# of a filter column, the rows having that value as a bitmap of one bit
+# per row. A selection is an OR of the bitmaps of its values within a
+# column and an AND across the columns (see give_filter_rows). The
+# commissioning dates of the rows, sorted with the rows, are kept for
+# the period filter
+def build_filter_index(df):
+    filter_index = {'n_rows': len(df), 'commissioning_date': df['commissioning_date'].to_numpy()}
+    for col in FILTER_COLUMNS:
+        values = df[col].astype('category')
+        codes = values.cat.codes.to_numpy()
+        filter_index[col] = {name: np.packbits(codes == code) for code, name in enumerate(values.cat.categories)}
+    return filter_index
+
+#------------------- give_frozen_filter_index -------------------------
+# This function returns a read-only version of the bitmap index
+def give_frozen_filter_index(filter_index):
+    filter_index['commissioning_date'].setflags(write=False)
+    frozen = {'n_rows': filter_index['n_rows'], 'commissioning_date': filter_index['commissioning_date']}
+    for col in FILTER_COLUMNS:
+        for bitmap in filter_index[col].values():
+            bitmap.setflags(write=False)
+        frozen[col] = types.MappingProxyType(dict(filter_index[col]))
+    return types.MappingProxyType(frozen)
+
+#------------------- give_period_value -------------------------
+# This function returns the value of the period filter from the dates
+# of a range slider: 'All' for the whole range of the data, otherwise
+# the first and last day as ISO strings. The slider shows months, so the
+# range is widened to whole months (within the data) and the periods of
+# the same months give the same value and the same cached views
+def give_period_value(date_range, date_bounds):
+    start = max(date_range[0].replace(day=1), date_bounds[0])
+    end = min((pd.Timestamp(date_range[1]) + pd.offsets.MonthEnd(0)).date(), date_bounds[1])
+    if (start, end)==tuple(date_bounds):
+        return 'All'
+    return (start.isoformat(), end.isoformat())
+
+#------------------- give_date_bounds -------------------------
+# This function returns the first and last commissioning day of the data
+def give_date_bounds(filter_index):
+    dates = filter_index['commissioning_date']
+    dates = dates[~np.isnat(dates)]
+    return pd.Timestamp(dates[0]).date(), pd.Timestamp(dates[-1]).date()
+
+#------------------- give_period_bounds -------------------------
+# This function returns the first and past-the-last row positions of the
+# sources commissioned in a period (both days included). The rows are
+# sorted by date, so the period is one slice found by binary search
+def give_period_bounds(filter_index, period):
+    dates = filter_index['commissioning_date']
+    if period=='All':
+        return 0, len(dates)
+    start = np.datetime64(period[0], 'ns')
+    end = np.datetime64(period[1], 'ns') + np.timedelta64(1, 'D')
+    return int(np.searchsorted(dates, start, 'left')), int(np.searchsorted(dates, end, 'left'))
+
+#------------------- give_filter_rows -------------------------
+# This function returns the row positions of a selection of cantons and
+# energy categories in a period from the bitmap index. The bitmaps are
+# combined 8 rows a byte and only the bytes of the period slice are
+# turned into row positions
+def give_filter_rows(filter_index, canton_name, energy_catg, period='All'):
+    n_rows = filter_index['n_rows']
+    first, last = give_period_bounds(filter_index, period)
+    selected = None
+    for col, value in zip(FILTER_COLUMNS, [canton_name, energy_catg]):
+        values = give_filter_values(value)
+        if values is None:
+            continue
+        empty = np.zeros((n_rows + 7) // 8, dtype='uint8')
+        bitmap = np.bitwise_or.reduce([empty] + [filter_index[col].get(name, empty) for name in values])
+        selected = bitmap if selected is None else selected & bitmap
+    if selected is None:
+        return np.arange(first, last)
+    start = first // 8 * 8
+    bits = np.unpackbits(selected[first // 8:(last + 7) // 8])[first - start:last - start]
+    return np.flatnonzero(bits) + first
+
+# The levels of the energy hierarchy, from the coarsest to the finest
+ENERGY_LEVELS = ['energy_source_level_2', 'energy_source_level_3', 'technology']
+# Name of a level of the hierarchy missing in the data
+UNSPECIFIED_LEVEL = 'Not specified'
+
+#------------------- build_canton_cube -------------------------
+# This function returns the number of sources, the electrical capacity
+# and the production per canton, energy category, level 3 category,
+# technology and month of commissioning, the aggregates the canton
+# comparison and the energy hierarchy are rolled up from. The month is
+# the finest level because the period slider selects whole months
+def build_canton_cube(df):
+    years = df['commissioning_date'].dt.year.rename('year')
+    months = df['commissioning_date'].dt.month.rename('month')
+    levels = {col: df[col].cat.add_categories(UNSPECIFIED_LEVEL).fillna(UNSPECIFIED_LEVEL) for col in ENERGY_LEVELS[1:]}
+    cube = df.assign(count=1, **levels).groupby(['canton_name'] + ENERGY_LEVELS + [years, months], observed=True)[
+        ['count', 'electrical_capacity', 'production']].sum().reset_index()
+    cube['year'] = cube['year'].astype('int16')
+    cube['month'] = cube['month'].astype('int8')
+    return cube
+
+#------------------- give_cube_rollup -------------------------
+# This function returns the totals of the rows of a canton cube per
+# canton at every level of the energy hierarchy. The totals per
+# technology are rolled up into the totals per level 3 category, and
+# these into the totals per energy category
+def give_cube_rollup(cube):
+    keys = ['canton_name'] + ENERGY_LEVELS
+    level = cube.groupby(keys, observed=True)[['count', 'electrical_capacity', 'production']].sum()
+    rollup = {}
+    for depth in range(len(ENERGY_LEVELS), 0, -1):
+        rollup[ENERGY_LEVELS[depth - 1]] = level
+        level = level.groupby(level=keys[:depth], observed=True).sum()
+    return rollup
+
+#------------------- give_cube_selection -------------------------
+# This function returns the rows of the canton cube of the selected
+# cantons and energy categories. A period is applied by months of
+# commissioning, the finest level of the cube; the periods of the slider
+# are whole months (give_period_value), so the selection is exact
+def give_cube_selection(cube, canton_name, energy_catg, period='All'):
+    mask = np.ones(len(cube), dtype=bool)
+    for col, value in zip(FILTER_COLUMNS, [canton_name, energy_catg]):
+        values = give_filter_values(value)
+        if values is not None:
+            mask &= cube[col].isin(values).to_numpy()
+    if period!='All':
+        months = cube['year'].to_numpy().astype('int32') * 12 + cube['month'].to_numpy()
+        first, last = [int(day[:4]) * 12 + int(day[5:7]) for day in period]
+        mask &= (months >= first) & (months <= last)
+    return cube[mask]
+
+# Length of the lists of the largest installations kept per canton and
+# energy category, the longest leaderboard offered
+TOP_K = 50
+# The variables the leaderboards rank by
+TOP_VARIABLES = ['electrical_capacity', 'production']
+
+#------------------- build_top_lists -------------------------
+# This function returns, for every variable, the row positions and values
+# of the TOP_K largest installations of every canton and energy category
+# (largest first)
+def build_top_lists(df, k=TOP_K):
+    groups = df.groupby(['canton_name', 'energy_source_level_2'], observed=True).indices
+    top_lists = {}
+    for variable in TOP_VARIABLES:
+        values = df[variable].to_numpy(dtype='float64')
+        top_lists[variable] = {}
+        for group, positions in groups.items():
+            positions = positions[np.argsort(-values[positions], kind='stable')[:k]]
+            top_lists[variable][tuple(str(x) for x in group)] = (positions.astype('int32'), values[positions])
+    return top_lists
+
+#------------------- give_frozen_top_lists -------------------------
+# This function returns top lists that cannot be changed, to be shared by
+# the sessions
+def give_frozen_top_lists(top_lists):
+    for lists in top_lists.values():
+        for positions, values in lists.values():
+            positions.setflags(write=False)
+            values.setflags(write=False)
+    return types.MappingProxyType({variable: types.MappingProxyType(lists) for variable, lists in top_lists.items()})
+
+#------------------- give_top_rows -------------------------
+# This function returns the row positions of the n largest installations
+# of a selection (largest first), merged from the top lists of the
+# selected cantons and energy categories. In a period the lists keep their
+# rows of the period; the result is None when a list may miss some of
+# them (it was cut at TOP_K and keeps fewer than n), the rows of the
+# selection are to be ranked instead
+def give_top_rows(top_lists, filter_index, variable, canton_name, energy_catg, n, period='All'):
+    cantons, energies = give_filter_values(canton_name), give_filter_values(energy_catg)
+    lo, hi = give_period_bounds(filter_index, period)
+    positions, values = [], []
+    for (canton, energy), (group_positions, group_values) in top_lists[variable].items():
+        if (cantons is not None and canton not in cantons) or (energies is not None and energy not in energies):
+            continue
+        in_period = (group_positions >= lo) & (group_positions < hi)
+        if in_period.sum() < n and len(group_positions) >= TOP_K:
+            return None
+        positions.append(group_positions[in_period][:n])
+        values.append(group_values[in_period][:n])
+    if not positions:
+        return np.zeros(0, dtype='int32')
+    positions, values = np.concatenate(positions), np.concatenate(values)
+    return positions[np.argsort(-values, kind='stable')[:n]]
+
+#------------------- build_company_totals -------------------------
+# This function returns the number of installations, the electrical
+# capacity and the production per canton, energy category and company
+def build_company_totals(df):
+    return df.assign(count=1).groupby(['canton_name', 'energy_source_level_2', 'company'], observed=True)[
+        ['count', 'electrical_capacity', 'production']].sum().reset_index()
+
+# Folder served by streamlit at STATIC_URL (server.enableStaticServing)
+STATIC_DIR = './static'
+STATIC_URL = 'app/static'
+
+#------------------- give_static_geojson -------------------------
+# This function writes geojson data to the static folder, named by its
+# content hash, and returns its url. Maps referencing the url instead of
+# embedding the geometry let the browser fetch it once: plotly keeps
+# fetched geojson by url for the whole page
+def give_static_geojson(geojson_data, name):
+    content = json.dumps(geojson_data, separators=(',', ':')).encode()
+    content_hash = hashlib.sha256(content).hexdigest()[:16]
+    path = os.path.join(STATIC_DIR, f"{name}-{content_hash}.json")
+    if not os.path.exists(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(content)
+        os.replace(temp_path, path)
+    return f"{STATIC_URL}/{os.path.basename(path)}"
+
+# Folder of the artifacts written by build.py, described by its manifest
+ARTIFACTS_DIR = './artifacts'
+ARTIFACTS_MANIFEST = 'manifest.json'
+
+#------------------- read_manifest -------------------------
+# This function returns the manifest of an artifacts folder, or None
+# when there is none
+def read_manifest(artifacts_dir=ARTIFACTS_DIR):
+    manifest_path = os.path.join(artifacts_dir, ARTIFACTS_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as file:
+        return json.load(file)
+
+#------------------- give_stale_stages -------------------------
+# This function returns the stages of a manifest that are not up to date:
+# a file they were built from changed (content hash), an artifact they
+# read was rebuilt since, or one of their artifacts is missing
+def give_stale_stages(manifest, artifacts_dir=ARTIFACTS_DIR):
+    outputs = {output: output_hash for stage in manifest['stages'].values()
+               for output, output_hash in stage['outputs'].items()}
+    stale = []
+    for name, stage in manifest['stages'].items():
+        files_changed = any(not os.path.exists(file) or give_files_hash([file]) != file_hash
+                            for file, file_hash in stage['files'].items())
+        needs_changed = any(outputs.get(output) != output_hash for output, output_hash in stage['needs'].items())
+        missing = any(not os.path.exists(os.path.join(artifacts_dir, output)) for output in stage['outputs'])
+        if files_changed or needs_changed or missing:
+            stale.append(name)
+    return stale
+
+#------------------- load_artifacts -------------------------
+# This function returns the dataset read from the artifacts built by
+# build.py from the csv and geojson files, or None when they are missing
+# or not up to date. Its artifacts version is a hash of the artifacts
+def load_artifacts(path, geojson_file, artifacts_dir=ARTIFACTS_DIR):
+    manifest = read_manifest(artifacts_dir)
+    if manifest is None or give_stale_stages(manifest, artifacts_dir):
+        return None
+    files = {os.path.normpath(file) for stage in manifest['stages'].values() for file in stage['files']}
+    if not {os.path.normpath(path), os.path.normpath(geojson_file)} <= files:
+        return None
+    with open(os.path.join(artifacts_dir, 'dataset.pkl'), 'rb') as file:
+        energy_df = pickle.load(file)
+    with open(os.path.join(artifacts_dir, 'aggregates.pkl'), 'rb') as file:
+        aggregates = pickle.load(file)
+    with open(os.path.join(artifacts_dir, 'geometry.json')) as file:
+        geojsn_data = json.load(file)
+    with open(os.path.join(artifacts_dir, 'bounds.json')) as file:
+        canton_bounds = {name: tuple(bounds) for name, bounds in json.load(file).items()}
+    with open(os.path.join(artifacts_dir, 'metrics.json')) as file:
+        canton_metrics = json.load(file)
+    outputs = sorted(f"{output}:{output_hash}" for stage in manifest['stages'].values()
+                     for output, output_hash in stage['outputs'].items())
+    return {
+        'artifacts_version': hashlib.sha256('|'.join(outputs).encode()).hexdigest()[:16],
+        'energy_df': energy_df,
+        'geojsn_data': geojsn_data,
+        'canton_bounds': canton_bounds,
+        'canton_metrics': canton_metrics,
+        'near_index': types.MappingProxyType(aggregates['near_index']),
+        'municipality_points': aggregates['municipality_points'],
+        'grid_aggregates': aggregates['grid_aggregates'],
+        'filter_index': aggregates['filter_index'],
+        'canton_cube': aggregates['canton_cube'],
+        'sketches': aggregates['sketches'],
+        'top_lists': aggregates['top_lists'],
+        'company_totals': aggregates['company_totals'],
+    }
+
+#------------------- give_dataset -------------------------
+# This function returns the data of the dashboard for a version of its
+# files: read from the artifacts of build.py when they are up to date,
+# prepared from the csv and geojson data otherwise. The geometry is also
+# written to the static folder, the maps refer to it by its url
+def give_dataset(path, geojson_file, version=None):
+    if version is None:
+        version = give_files_version([path, geojson_file])
+    dataset = load_artifacts(path, geojson_file)
+    if dataset is None:
+        energy_df = load_checked_data(path, geojson_file, version)
+        geopd_data = load_geopanda_data(geojson_file, version)
+        dataset = {
+            'artifacts_version': None,
+            'energy_df': energy_df,
+            'geojsn_data': load_geojsn_data(geojson_file, version),
+            'canton_bounds': give_canton_bounds(geopd_data),
+            'canton_metrics': give_canton_metrics(geopd_data),
+            'near_index': build_near_index(energy_df),
+            'municipality_points': give_municipality_points(energy_df),
+            'grid_aggregates': grd.give_grid_aggregates(energy_df),
+            'filter_index': build_filter_index(energy_df),
+            'canton_cube': build_canton_cube(energy_df),
+            'sketches': skt.build_sketches(energy_df),
+            'top_lists': build_top_lists(energy_df),
+            'company_totals': build_company_totals(energy_df),
+        }
+    name = os.path.splitext(os.path.basename(geojson_file))[0]
+    dataset['geojsn_url'] = give_static_geojson(dataset['geojsn_data'], name)
+    dataset['version'] = version
+    return dataset
+
+#------------------- give_shared_dataset -------------------------
+# This function returns the read-only dataset shared by the sessions for
+# a version of the files
+def give_shared_dataset(path, geojson_file, version):
+    dataset = give_dataset(path, geojson_file, version)
+    dataset = {
+        'energy_df': give_read_only(dataset['energy_df']),
+        'geojsn_data': give_frozen(dataset['geojsn_data']),
+        'geojsn_url': dataset['geojsn_url'],
+        'canton_bounds': types.MappingProxyType(dataset['canton_bounds']),
+        'canton_metrics': types.MappingProxyType({name: types.MappingProxyType(metrics)
+                                                  for name, metrics in dataset['canton_metrics'].items()}),
+        'near_index': dataset['near_index'],
+        'municipality_points': give_read_only(dataset['municipality_points']),
+        'grid_aggregates': give_frozen_grid(dataset['grid_aggregates']),
+        'filter_index': give_frozen_filter_index(dataset['filter_index']),
+        'canton_cube': give_read_only(dataset['canton_cube']),
+        'sketches': types.MappingProxyType(skt.give_frozen_sketches(dataset['sketches'])),
+        'top_lists': give_frozen_top_lists(dataset['top_lists']),
+        'company_totals': give_read_only(dataset['company_totals']),
+        'artifacts_version': dataset['artifacts_version'],
+        'version': version,
+    }
+    return types.MappingProxyType(dataset)
+
+# Seconds between two checks of the data files for a new version
+RELOAD_CHECK_SECONDS = float(os.environ.get('RELOAD_CHECK_SECONDS', 5))
+
+#------------------- give_watched_version -------------------------
+# This function returns the version of every file the dataset is read
+# from: the csv and geojson files, the population file and the manifest
+# of the artifacts (rewritten by every build.py run). The manifest only
+# counts once it exists, the dashboard also runs without artifacts
+def give_watched_version(path, geojson_file, artifacts_dir=ARTIFACTS_DIR):
+    manifest_path = os.path.join(artifacts_dir, ARTIFACTS_MANIFEST)
+    paths = [path, geojson_file, POPULATION_FILE] + [manifest_path] * os.path.exists(manifest_path)
+    return give_files_version(paths)
+
+#------------------- DataStore -------------------------
+# The dataset shared by the sessions, kept up to date with its files.
+# The files (give_watched_version) are checked every
+# RELOAD_CHECK_SECONDS; a new version is prepared in a background thread
+# while the sessions keep the current one, and replaces it in a single
+# assignment once it is ready. A version that fails to load is not tried
+# again
+class DataStore:
+    def __init__(self, path, geojson_file):
+        self.paths = [path, geojson_file]
+        self.lock = threading.Lock()
+        self.watched = give_watched_version(path, geojson_file)
+        self.dataset = give_shared_dataset(path, geojson_file, give_files_version(self.paths))
+        self.checked = time.monotonic()
+        self.pending = None
+        self.failed = None
+
+    def give_dataset(self):
+        if time.monotonic() - self.checked >= RELOAD_CHECK_SECONDS:
+            self.checked = time.monotonic()
+            self.check()
+        return self.dataset
+
+    def check(self):
+        try:
+            watched = give_watched_version(*self.paths)
+        except OSError:
+            # A file is being replaced, check again next time
+            return
+        with self.lock:
+            if watched in (self.watched, self.pending, self.failed):
+                return
+            self.pending = watched
+        logger.info("data version %s found, reloading", watched)
+        threading.Thread(target=self.reload, args=(watched,), daemon=True).start()
+
+    def reload(self, watched):
+        start = time.perf_counter()
+        try:
+            dataset = give_shared_dataset(*self.paths, give_files_version(self.paths))
+        except Exception:
+            logger.exception("data version %s could not be loaded, keeping %s", watched, self.watched)
+            with self.lock:
+                self.failed, self.pending = watched, None
+            return
+        with self.lock:
+            self.dataset, self.watched, self.pending = dataset, watched, None
+        logger.info("data version %s loaded in %.1f s", watched, time.perf_counter() - start)
+
+#------------------- load_data_store -------------------------
+# This function returns the data store of the files, created once per
+# process, and starts the pool of figure workers when there is one
+@st.cache_resource
+def load_data_store(path, geojson_file):
+    import snapshot as snp
+    data_store = DataStore(path, geojson_file)
+    snp.start_pool()
+    return data_store
+
+#------------------- load_shared_dataset -------------------------
+# This function returns the current read-only dataset, the same for every
+# session, without the copy st.cache_data would hand to each caller. A
+# new version of the files is picked up without a restart
+def load_shared_dataset(path, geojson_file):
+    return load_data_store(path, geojson_file).give_dataset()
+
+#------------------- give_peak_rss_mb -------------------------
+# This function returns the peak resident memory of the process in MB
+def give_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / 1e6 if os.uname().sysname == 'Darwin' else peak / 1e3
+
+#------------------- give_rss_mb -------------------------
+# This function returns the resident memory of the process in MB
+# (the peak where the current value is not available)
+def give_rss_mb():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        return give_peak_rss_mb()
+
+#------------------- give_object_size -------------------------
+# This function returns the size in bytes of an object and of what it
+# holds. The read-only frames are shared by all the sessions and are not
+# counted, nor is an object reached twice
+def give_object_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, ReadOnlyMixin):
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(give_object_size(key, seen) + give_object_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(give_object_size(item, seen) for item in obj)
+    return size
+
+# Reruns of a session between two logs of its memory
+MEMORY_LOG_RUNS = int(os.environ.get('MEMORY_LOG_RUNS', 50))
+
+#------------------- log_session_memory -------------------------
+# This function logs at debug level the memory held by the objects of
+# the current session (its session state), the largest ones first, on
+# the first run of the session and then every MEMORY_LOG_RUNS reruns.
+# The resident memory is logged too, but it is that of the whole
+# process, shared by all the sessions
+def log_session_memory(session_state, n_largest=3):
+    runs = session_state.get('memory_log_runs', 0)
+    session_state['memory_log_runs'] = runs + 1
+    if runs % MEMORY_LOG_RUNS or not logger.isEnabledFor(logging.DEBUG):
+        return None
+    sizes = {str(key): give_object_size(session_state[key]) for key in list(session_state.keys())}
+    largest = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:n_largest]
+    total = sum(sizes.values())
+    logger.debug("session memory: %.3f MB in %d session state objects (largest: %s); process memory (all sessions): %.1f MB",
+                 total / 1e6, len(sizes), ', '.join(f"{key} {size / 1e3:.1f} kB" for key, size in largest), give_rss_mb())
+    return total
+
 #------------------- give_catag -------------------------
 # This function takes a pandas DataFrame and first filters
 # the data for with a column col whose value is filter
@@ -34,7 +878,7 @@ def load_geopanda_data(file):
 # grouped DataFrame
 def give_catag(df, col, filter):
     subset=df[df[col]==filter]
-    df_out=subset.groupby('canton_name').size().reset_index(name='count')
+    df_out=subset.groupby('canton_name', observed=True).size().reset_index(name='count')
     return df_out
 
 #------------------- give_catag2 -------------------------
@@ -45,19 +889,267 @@ def give_catag2(df, col, filter):
     df_out=df[df[col]==filter]
     return df_out
 
-#------------------- give_cntr_zoom -------------------------
+#------------------- give_canton_bounds -------------------------
+# This function returns the bounds (min lon, min lat, max lon, max lat)
+# of every canton
+def give_canton_bounds(geopd_data, col='kan_name'):
+    canton_bounds = {}
+    for name, bounds in zip(geopd_data[col], geopd_data.geometry.bounds.to_numpy()):
+        canton_bounds.setdefault(name, tuple(float(x) for x in bounds))
+    return canton_bounds
+
+#------------------- give_bounds_zoom -------------------------
 # This function returns the latitude and longitude at the
 # center and also returns the zoom value needed for plotly
-# chloropeth map for a selected canton
-def give_cntr_zoom(df,col,filter):
-    df_tmp = df[df[col]==filter]
-    #df_tmp.geometry.bounds.minx.to_list()
-    lon_limit = [df_tmp.geometry.bounds.minx.to_list()[0], df_tmp.geometry.bounds.maxx.to_list()[0]]
-    lat_limit = [df_tmp.geometry.bounds.miny.to_list()[0], df_tmp.geometry.bounds.maxy.to_list()[0]]
+# chloropeth map for the bounds of a canton
+def give_bounds_zoom(bounds):
+    lon_limit = [bounds[0], bounds[2]]
+    lat_limit = [bounds[1], bounds[3]]
     lon_center= (lon_limit[0]+lon_limit[1])/2
     lat_center= (lat_limit[0]+lat_limit[1])/2
     lat_bound = abs(lat_limit[0]-lat_limit[1])
     lon_bound = abs(lon_limit[0]-lon_limit[1])
     xx = max(lon_bound, lat_bound)
     zoom = 7.8 + 3.2*np.log10(1/xx)
-    return lat_center, lon_center, zoom
\ No newline at end of file
+    return lat_center, lon_center, zoom
+
+#------------------- give_cntr_zoom -------------------------
+# This function returns the latitude and longitude at the
+# center and also returns the zoom value needed for plotly
+# chloropeth map for a selected canton
+def give_cntr_zoom(df,col,filter):
+    df_tmp = df[df[col]==filter]
+    return give_bounds_zoom(df_tmp.geometry.bounds.to_numpy()[0])
+
+#------------------- give_filter_value -------------------------
+# This function returns the value of a multi-select filter from its
+# selected options: 'All' when none is selected, the option itself when
+# there is one, and the tuple of the options in their order otherwise
+def give_filter_value(selected, options):
+    selected = [option for option in options if option in selected]
+    if len(selected)==0:
+        return 'All'
+    if len(selected)==1:
+        return selected[0]
+    return tuple(selected)
+
+#------------------- give_filter_values -------------------------
+# This function returns the list of values of a filter value, or None
+# for 'All'
+def give_filter_values(value):
+    if isinstance(value, str):
+        return None if value=='All' else [value]
+    return list(value)
+
+#------------------- is_selected -------------------------
+# This function tells whether a value is selected by a filter value
+def is_selected(value, filter_value):
+    values = give_filter_values(filter_value)
+    return values is None or value in values
+
+#------------------- give_selection -------------------------
+# This function returns the rows of the DataFrame for the
+# selected cantons and energy categories ('All' keeps every
+# value of that column) commissioned in a period. With the
+# bitmap index of the DataFrame the rows are found from its
+# bitmaps and sorted dates
+def give_selection(df, canton_name, energy_catg, filter_index=None, period='All'):
+    if canton_name=='All' and energy_catg=='All' and period=='All':
+        return df
+    if filter_index is not None:
+        return df.iloc[give_filter_rows(filter_index, canton_name, energy_catg, period)]
+    if not isinstance(canton_name, str) or not isinstance(energy_catg, str) or period!='All':
+        mask = np.ones(len(df), dtype=bool)
+        for col, value in zip(FILTER_COLUMNS, [canton_name, energy_catg]):
+            values = give_filter_values(value)
+            if values is not None:
+                mask &= df[col].isin(values).to_numpy()
+        if period!='All':
+            dates = df['commissioning_date']
+            mask &= ((dates >= period[0]) & (dates < pd.Timestamp(period[1]) + pd.Timedelta(days=1))).to_numpy()
+        return df[mask]
+    if energy_catg=='All':
+        df_out=df[df['canton_name']==canton_name]
+    elif canton_name=='All':
+        df_out=df[df["energy_source_level_2"]==energy_catg]
+    else:
+        df_out=df[(df['canton_name']==canton_name)&(df["energy_source_level_2"]==energy_catg)]
+    return df_out
+
+# Population of the cantons (FSO, end of 2018) for the per capita maps
+POPULATION_FILE = './data/canton_population.csv'
+# Equal-area projection (ETRS89 / LAEA Europe) the canton areas are computed in
+AREA_CRS = 'EPSG:3035'
+# The normalized totals of the cantons: suffix of their column, the canton
+# metric they are divided by and the scale of every variable (count per
+# 1000 inhabitants, kW and kWh per inhabitant; count, kW and MWh per km²)
+NORMALIZATIONS = {
+    '_per_capita': ('population', {'count': 1000, 'electrical_capacity': 1000, 'production': 1000}),
+    '_per_km2': ('area_km2', {'count': 1, 'electrical_capacity': 1000, 'production': 1}),
+}
+
+#------------------- give_canton_metrics -------------------------
+# This function returns the area in km² and the population of every
+# canton. The area is computed from the canton polygons projected to an
+# equal-area projection, the population read from the population file
+def give_canton_metrics(geopd_data, population_file=POPULATION_FILE, col='kan_name'):
+    areas = geopd_data.to_crs(AREA_CRS).area.groupby(geopd_data[col]).sum() / 1e6
+    population = pd.read_csv(population_file, index_col='canton_name')['population']
+    return {name: {'area_km2': float(area), 'population': int(population.get(name, 0))}
+            for name, area in areas.items()}
+
+#------------------- give_normalized_summary -------------------------
+# This function adds the totals per inhabitant and per km² to the number
+# of sources, the electrical capacity and the production per canton
+def give_normalized_summary(sources_per_canton, canton_metrics):
+    names = sources_per_canton['canton_name'].astype(str)
+    normalized = {}
+    for suffix, (metric, scales) in NORMALIZATIONS.items():
+        divisor = names.map(lambda name: canton_metrics[name][metric] if name in canton_metrics else np.nan)
+        divisor = divisor.where(divisor > 0).to_numpy(dtype='float64')
+        for variable, scale in scales.items():
+            normalized[variable + suffix] = sources_per_canton[variable].to_numpy() * scale / divisor
+    return sources_per_canton.assign(**normalized)
+
+#------------------- give_canton_summary -------------------------
+# This function returns the number of sources, the electrical
+# capacity and the production per canton for an energy category
+def give_canton_summary(df, energy_catg, filter_index=None, period='All'):
+    df_tmp = give_selection(df, 'All', energy_catg, filter_index, period)
+    sources_per_canton=df_tmp.groupby('canton_name', observed=True).size().reset_index(name='count')
+    sources_per_canton['electrical_capacity']=df_tmp.groupby('canton_name', observed=True)['electrical_capacity'].sum().reset_index(name='electrical_capacity').electrical_capacity
+    sources_per_canton['production']=df_tmp.groupby('canton_name', observed=True)['production'].sum().reset_index(name='production').production
+    return sources_per_canton
+
+#------------------- give_yearly_totals -------------------------
+# This function returns the years of commissioning of the rows, their
+# cantons and, for the number of sources, the electrical capacity and the
+# production, the totals per year (rows) and canton (columns) up to the
+# end of the year. The rows are aggregated once into the additions of
+# every year and canton; the totals are the running sums of the additions
+def give_yearly_totals(df):
+    years = df['commissioning_date'].dt.year.rename('year')
+    added = df.assign(count=1).groupby([years, 'canton_name'], observed=True)[
+        ['count', 'electrical_capacity', 'production']].sum().unstack('canton_name', fill_value=0)
+    all_years = range(int(years.min()), int(years.max()) + 1)
+    added = added.reindex(all_years, fill_value=0)
+    cantons = list(added['count'].columns.astype(str))
+    totals = {variable: added[variable].to_numpy().cumsum(axis=0)
+              for variable in ['count', 'electrical_capacity', 'production']}
+    return list(all_years), cantons, totals
+
+#------------------- give_rows_summary -------------------------
+# This function returns the number of sources, the electrical capacity
+# and the production per energy type of the rows at the given positions.
+# The sums are bincounts over the energy codes of only those rows, so the
+# cost grows with the selection and not with the DataFrame
+def give_rows_summary(df, rows):
+    energy = df['energy_source_level_2']
+    codes = energy.cat.codes.to_numpy()[rows]
+    rows = np.asarray(rows)[codes >= 0]
+    codes = codes[codes >= 0]
+    n_catgs = len(energy.cat.categories)
+    summary = pd.DataFrame({
+        'energy_source_level_2': energy.cat.categories,
+        'Number of Sources': np.bincount(codes, minlength=n_catgs),
+        'electrical_capacity': np.bincount(codes, weights=df['electrical_capacity'].to_numpy()[rows], minlength=n_catgs),
+        'production': np.bincount(codes, weights=df['production'].to_numpy()[rows], minlength=n_catgs),
+    })
+    return summary[summary['Number of Sources'] > 0].reset_index(drop=True)
+
+#------------------- give_fingerprint -------------------------
+# This function returns a short content hash of a DataFrame,
+# used to find out whether the rows behind a figure changed
+def give_fingerprint(df):
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+
+#------------------- give_files_hash -------------------------
+# This function returns a short content hash of a list of files
+def give_files_hash(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+# Fingerprint and content hash of the files by path, see
+# give_files_version. Only the latest version of a file is kept
+_file_hashes = {}
+
+#------------------- give_file_fingerprint -------------------------
+# This function returns the fingerprint of a file: its path,
+# modification time and size
+def give_file_fingerprint(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+#------------------- give_files_version -------------------------
+# This function returns the version of a list of files, a hash of their
+# contents. A file is only read again when its fingerprint changed, and
+# a file touched without a change keeps its version
+def give_files_version(paths):
+    hashes = []
+    for path in paths:
+        fingerprint = give_file_fingerprint(path)
+        if _file_hashes.get(fingerprint[0], (None,))[0] != fingerprint:
+            _file_hashes[fingerprint[0]] = (fingerprint, give_files_hash([path]))
+        hashes.append(_file_hashes[fingerprint[0]][1])
+    return hashlib.sha256(''.join(hashes).encode()).hexdigest()[:16]
+
+#------------------- give_slug -------------------------
+# This function returns a file system friendly version of a name
+def give_slug(name):
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+#------------------- show_plotly_json -------------------------
+# This function shows a Plotly figure from its JSON text, as
+# st.plotly_chart does but without building the figure again:
+# st.plotly_chart validates a figure and serializes it once more on every
+# run, up to 90 ms for the maps. The figure was validated when it was
+# built, so its JSON is sent to the browser as it is. With on_select it
+# returns the selection event as st.plotly_chart does
+def show_plotly_json(spec, use_container_width=True, key=None, on_select='ignore',
+                     selection_mode=('points', 'box', 'lasso'), config=None):
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.utils import compute_and_register_element_id, to_key
+    from streamlit.elements.plotly_chart import PlotlyChartSelectionSerde, parse_selection_mode
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+    from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+    from streamlit.runtime.state import register_widget
+    dg = st._main
+    config = dict(config or {})
+    config.setdefault('showLink', False)
+    config.setdefault('linkText', False)
+    proto = PlotlyChartProto()
+    proto.use_container_width = use_container_width
+    proto.theme = 'streamlit'
+    proto.form_id = current_form_id(dg)
+    proto.spec = spec
+    proto.config = json.dumps(config)
+    is_selection_activated = on_select != 'ignore'
+    proto.id = compute_and_register_element_id(
+        'plotly_chart', user_key=to_key(key), form_id=proto.form_id, dg=dg,
+        plotly_spec=proto.spec, plotly_config=proto.config, selection_mode=selection_mode,
+        is_selection_activated=is_selection_activated, theme='streamlit',
+        use_container_width=use_container_width)
+    if not is_selection_activated:
+        return dg._enqueue('plotly_chart', proto)
+    proto.selection_mode.extend(parse_selection_mode(selection_mode))
+    serde = PlotlyChartSelectionSerde()
+    widget_state = register_widget(proto.id, deserializer=serde.deserialize, serializer=serde.serialize,
+                                   ctx=get_script_run_ctx(), value_type='string_value')
+    dg._enqueue('plotly_chart', proto)
+    return widget_state.value
+
+#------------------- show_fig -------------------------
+# This function shows a served figure: the JSON text of a Plotly
+# figure (see snapshot.give_served), a Plotly figure or the PNG image
+# of a matplotlib figure
+def show_fig(fig, **kwargs):
+    if isinstance(fig, bytes):
+        return st.image(fig, use_container_width=True)
+    if isinstance(fig, str):
+        return show_plotly_json(fig, **kwargs)
+    return st.plotly_chart(fig, **kwargs)